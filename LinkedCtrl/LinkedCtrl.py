@@ -8,6 +8,26 @@
 #
 # 12May2025 A. Cooper v0.1
 #  - initial version
+# 17Oct2026
+#  - each device has a CtrlHealth tracker, after consecutive failures reads
+#    back off and then skip the device until a short probe finds it again
+#  - Modbus timeout reduced from 20s to comTimeout, health changes are
+#    reported in the event log
+#  - a device that cannot be opened no longer stops the remaining devices
+#    from being read
+#  - all Modbus I/O moved to a Poller thread that publishes timestamped
+#    snapshots, the display and execCtrl() use the latest snapshot and never
+#    wait on a controller, data older than staleTime counts as missing
+#  - each device is read by its own thread with one holding register block
+#    and one coil block per scan over a connection kept open between scans,
+#    instead of a transaction per register and a reconnect each scan
+#  - devices, their registers and the interlock rules are loaded from
+#    setup/linked.xml, rules are compiled into a LinkRules plan updated as
+#    each snapshot arrives so a control tick costs the same for any number
+#    of tanks, evaluation time per tick is written to the log file
+#  - the log keeps the CO2 On, Supply pH, CO2 Timer column order, a day's
+#    log file with other columns is not appended to, a new numbered file
+#    is started
 #
 #------------------------------------------------------------------------------
 verStr= 'LinkedCtrl v0.1'
@@ -17,6 +37,7 @@ logFileName= 'Control'
 logFilePath= 'log'
 libFilePath= 'lib'
 cfgFilePath= 'setup'
+cfgFileName= 'linked.xml'
 colBack=     '#BBBBBB'
 colDev=      '#999999'
 colOn=       '#ADFF8C'
@@ -25,14 +46,18 @@ colErr=      '#AAAAAA'
 verbose=     True;
 scanInterval= 1 #time between network scans
 logInterval= 60 #time between log file entries
-minTime=     10 #minimum time between valve state changes
-minPH=      7.5 #minimum allowed pH in any tank
+minTime=     10 #minimum time between valve state changes, rule default
+comTimeout=   5 #Modbus timeout in seconds
+staleTime=   10 #age in seconds before device data is treated as missing
+blockGap=    16 #largest gap in registers bridged when grouping reads
 
 #-- library -------------------------------------------------------------------
 import string
 import sys
 import os
 import time
+import queue
+import threading
 from pathlib import Path
 import urllib.request
 import datetime as     dt
@@ -47,42 +72,47 @@ localDir= os.path.dirname(os.path.realpath(__file__))
 logPath=  os.path.join(localDir,logFilePath)
 libPath=  os.path.join(localDir,libFilePath)
 cfgPath=  os.path.join(localDir,cfgFilePath)
+sys.path.append(libPath)
+
+#-- local libraries -----------------------------------------------------------
+import CtrlHealth
+from LinkRules import LinkRules
 
 #-- modbus handling ---------------------------------------------------------
 def mbStart(ipAddr,port):
-  return ModbusClient(host=ipAddr,port=port,unit_id=1,timeout=20,auto_open=False,auto_close=False)
+  return ModbusClient(host=ipAddr,port=port,unit_id=1,timeout=comTimeout,auto_open=False,auto_close=False)
 
-def mbOpen(client):
+# with a health tracker the open fails at once while the device is backing off
+def mbOpen(client,health=None):
   if client.is_open()==True:
     client.close()
-  return client.open()
+  if health==None: return client.open()
+  if not health.allow(): return False
+  client.timeout(health.timeout(comTimeout))
+  if client.open(): return True
+  health.failure()
+  return False
 
 def mbClose(client):
   if client.is_open():
     client.close()
 
-def mbRead(client,addr,typ):
+# registers each type occupies
+mbWidth= {'int':1,'hold':1,'uint':1,'dint':2,'long':2,'float':2,'str':8,'coil':1,'bool':1}
+
+# decode a value from the holding register words read for it
+def mbDecode(words,typ):
   if typ=='int' or typ=='hold':
-    val= client.read_holding_registers(addr,1)
-    if val!= None: return utils.get_list_2comp(val,16)[0]
-    return val
+    return utils.get_list_2comp(words[:1],16)[0]
   if typ=='uint':
-    val= client.read_holding_registers(addr,1)
-    if val!=None: return val[0]
-    return None
+    return words[0]
   if typ=='dint' or typ=='long':
-    val= client.read_holding_registers(addr,2)
-    if val!=None: return utils.word_list_to_long(val,big_endian=False)[0]
-    return val
+    return utils.word_list_to_long(words[:2],big_endian=False)[0]
   if typ=='float':
-    val= client.read_holding_registers(addr,2)
-    if val!=None: return utils.decode_ieee(utils.word_list_to_long(val,big_endian=False)[0])
-    return None
+    return utils.decode_ieee(utils.word_list_to_long(words[:2],big_endian=False)[0])
   if typ=='str':
     st= ''
-    arry= client.read_holding_registers(addr,8)
-    if arry==None: return None
-    for chs in arry:
+    for chs in words[:8]:
       ch= chs>>8
       if ch==0: return st
       st= st+chr(ch)
@@ -90,10 +120,43 @@ def mbRead(client,addr,typ):
       if ch==0: return st
       st= st+chr(ch)
     return st
+  return None
+
+# group (field,addr,typ) registers into block reads, blocks are
+# (coil,start,count,[(field,offset,typ)]), gaps up to blockGap are read over
+def mbPlan(regs):
+  plan= []
+  for coil in (False,True):
+    items= sorted((addr,field,typ) for field,addr,typ in regs if (typ in ('coil','bool'))==coil)
+    for addr,field,typ in items:
+      end= addr+mbWidth[typ]
+      if len(plan)>0 and plan[-1][0]==coil and addr-(plan[-1][1]+plan[-1][2])<=blockGap and end-plan[-1][1]<=100:
+        block= plan[-1]
+        plan[-1]= (coil,block[1],max(block[2],end-block[1]),block[3]+[(field,addr-block[1],typ)])
+      else:
+        plan.append((coil,addr,end-addr,[(field,0,typ)]))
+  return plan
+
+# read a plan, returns {field:value}, None for fields of a failed block
+def mbReadPlan(client,plan):
+  values= {}
+  for coil,start,count,fields in plan:
+    if coil: block= client.read_coils(start,count)
+    else:    block= client.read_holding_registers(start,count)
+    for field,offset,typ in fields:
+      if block==None or len(block)<offset+mbWidth[typ]: values[field]= None
+      elif coil: values[field]= block[offset]
+      else: values[field]= mbDecode(block[offset:],typ)
+  return values
+
+def mbRead(client,addr,typ):
+  if typ not in mbWidth: return None
   if typ=='coil' or typ=='bool':
     val= client.read_coils(addr,1)
     if val!=None: return val[0]
     return None
+  val= client.read_holding_registers(addr,mbWidth[typ])
+  if val!=None: return mbDecode(val,typ)
   return None
 
 def mbWrite(client,addr,data,typ):
@@ -132,6 +195,140 @@ def mbWrite(client,addr,data,typ):
       return True
   return False
 
+#-- configuration -------------------------------------------------------------
+
+# devices and rules from the setup file, raises ValueError with the reason
+def loadConfig(configPath,configFile):
+  try:
+    tree= xml.parse(os.path.join(configPath,configFile))
+  except Exception as err:
+    raise ValueError('Unable to load configuration file {}: {}'.format(configFile,err))
+  devices= {}
+  rules=   []
+  try:
+    for item in tree.getroot():
+      if item.tag=='device':
+        dev= {'name':item.attrib['name'],'ipAddr':item.find('address').text.strip(),'regs':[],'show':[],'log':[]}
+        for reg in item.findall('register'):
+          field= reg.attrib['field']
+          dev['regs'].append((field,int(reg.attrib['addr']),reg.attrib.get('type','float')))
+          dev[field]= None
+          if 'label' in reg.attrib:
+            dev['show'].append({'field':field,'label':reg.attrib['label'],'unit':reg.attrib.get('unit',''),
+                                'format':reg.attrib.get('format','{}'),'lamp':reg.attrib.get('lamp')})
+          if 'log' in reg.attrib:
+            dev['log'].append((field,reg.attrib['log']))
+        devices[item.attrib['key']]= dev
+      if item.tag=='rule':
+        rule= {'name':item.attrib['name'],'device':item.attrib['device'],'addr':int(item.attrib['addr']),
+               'interval':float(item.attrib.get('interval',minTime)),'terms':[],'last':0.0,'missing':False}
+        for term in item:
+          if term.tag not in ('on','off'): continue
+          rule['terms'].append({'kind':term.tag,'field':term.attrib['field'],'devices':term.attrib['devices'].split(),
+                                'below':float(term.attrib['below']) if 'below' in term.attrib else None,
+                                'above':float(term.attrib['above']) if 'above' in term.attrib else None,
+                                'when':term.attrib.get('when')})
+        rules.append(rule)
+  except (KeyError,ValueError,AttributeError) as err:
+    raise ValueError('Error in configuration file {}: {}'.format(configFile,err))
+  for rule in rules:
+    for key in [rule['device']]+[key for term in rule['terms'] for key in term['devices']]:
+      if key not in devices: raise ValueError('Rule {} uses unknown device {}'.format(rule['name'],key))
+  return devices,rules
+
+#------------------------------------------------------------------------------
+#  Device Poller
+#
+#  - owns every device connection, each device is read every scanInterval
+#    by its own thread with the block reads of its plan, a snapshot is
+#    published per device as it is read, a slow device delays only itself
+#  - latest() returns {key:{field:value,...,'time':monotonic,'stamp':datetime}}
+#    values are None when a device could not be read
+#  - write(key,addr,value,typ) queues a write, a second thread with its own
+#    connection to each device sends it at once, a slow read never holds up
+#    a write
+#  - log lines go to the log function given, it must be thread safe, onRead
+#    is called with (key,entry) on the reader thread after each publish
+#
+#  17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+class Poller():
+
+  def __init__(self,devices,log,onRead=None):
+    self.devices= devices
+    self.log=     log
+    self.onRead=  onRead
+    self.snap=    {}
+    self.lock=    threading.Lock()
+    self.writes=  queue.Queue()
+    self.stopped= threading.Event()
+    self.threads= []
+    for dev in devices.values():
+      dev['writer']= mbStart(dev['ipAddr'],502)
+      dev['plan']=   mbPlan(dev['regs'])
+
+  def start(self):
+    if len(self.threads)>0: return
+    self.stopped.clear()
+    self.threads= [threading.Thread(target=self.readLoop,args=(key,),name='LinkedCtrl {}'.format(key),daemon=True) for key in self.devices]
+    self.threads.append(threading.Thread(target=self.writeLoop,name='LinkedCtrl writer',daemon=True))
+    for thread in self.threads: thread.start()
+
+  def stop(self):
+    self.stopped.set()
+    self.writes.put(None)
+    for thread in self.threads: thread.join(comTimeout*2)
+    self.threads= []
+
+  def latest(self):
+    with self.lock:
+      return dict(self.snap)
+
+  def write(self,key,addr,value,typ):
+    self.writes.put((key,addr,value,typ))
+
+  def readLoop(self,key):
+    dev= self.devices[key]
+    due= time.monotonic()
+    while not self.stopped.is_set():
+      entry= self.read(dev)
+      with self.lock:
+        self.snap[key]= entry
+      if self.onRead!=None: self.onRead(key,entry)
+      due= max(due+scanInterval,time.monotonic())
+      self.stopped.wait(due-time.monotonic())
+
+  def writeLoop(self):
+    while not self.stopped.is_set():
+      job= self.writes.get()
+      if job!=None: self.send(*job)
+
+  def read(self,dev):
+    entry= {field:None for field,addr,typ in dev['regs']}
+    if not dev['ctrl'].is_open() and not mbOpen(dev['ctrl'],dev['health']):
+      if dev['health'].state==CtrlHealth.CLOSED:
+        self.log('Cannot open {}'.format(dev['name']))
+    else:
+      entry.update(mbReadPlan(dev['ctrl'],dev['plan']))
+      if None in entry.values():
+        dev['health'].failure()
+        mbClose(dev['ctrl'])
+      else: dev['health'].success()
+    entry['time']=  time.monotonic()
+    entry['stamp']= dt.datetime.now()
+    return entry
+
+  def send(self,key,addr,value,typ):
+    dev= self.devices[key]
+    if not dev['writer'].is_open() and not mbOpen(dev['writer'],dev['health']):
+      self.log('Cannot write to {}'.format(dev['name']))
+      return
+    if not mbWrite(dev['writer'],addr,value,typ):
+      dev['writer'].close()
+      self.log('Write to {} failed'.format(dev['name']))
+
 #------------------------------------------------------------------------------
 #  LinkedCtrl GUI
 #
@@ -143,75 +340,60 @@ def mbWrite(client,addr,data,typ):
 #------------------------------------------------------------------------------
 class Application(tk.Frame):
   device=       {}
+  rules=        []
   data=         []
   dataFields=   0
   logFile=      None
   lastLog=      dt.datetime.now()
   eventNow=     dt.datetime.min
-  lastChange=   dt.datetime.now()
   control=      False
   mbEvent=      None
   mbActive=     False
   logging=      False
-  tankCount=    4
-  device= {'carbofox':{'name':'Carbofox','ipAddr':'192.168.0.212','pH':0.0,'Valve':False,'timer':0},
-              'tank1':{'name':'X01','ipAddr':'192.168.0.254',     'pH':0.0,'temp':0.0,'co2Valve':False,'tempValve':False},
-              'tank2':{'name':'X02','ipAddr':'192.168.0.244',     'pH':0.0,'temp':0.0,'co2Valve':False,'tempValve':False},
-              'tank3':{'name':'X03','ipAddr':'192.168.0.3',       'pH':0.0,'temp':0.0,'co2Valve':False,'tempValve':False},
-              'tank4':{'name':'X04','ipAddr':'192.168.0.251',     'pH':0.0,'temp':0.0,'co2Valve':False,'tempValve':False}}
+  evalCount=    0
+  evalTotal=    0.0
+  evalMax=      0.0
 
   def __init__(self, master=None):
     tk.Frame.__init__(self, master)
     self.grid()
+    try:
+      self.device,self.rules= loadConfig(cfgPath,cfgFileName)
+    except ValueError as err:
+      messagebox.showerror(title='Startup error...',message=str(err))
+      sys.exit()
     self.createWidgets()
-    for dev in self.device.values():
+    self.events= queue.Queue()
+    for key,dev in self.device.items():
       dev['ctrl']= mbStart(dev['ipAddr'],502)
+      dev['health']= CtrlHealth.CtrlHealth(dev['name'])
+    self.linkRules= LinkRules(self.rules,staleTime)
+    CtrlHealth.setReport(self.events.put)
+    self.poller= Poller(self.device,self.events.put,self.linkRules.update)
     root.resizable(width=False, height=False)
     root.protocol("WM_DELETE_WINDOW",self.done)
-    self.logEvent('{} started'.format(verStr),True)
+    self.logEvent('{} started, {:d} devices, {:d} rules'.format(verStr,len(self.device),len(self.rules)),True)
     print('{} running...'.format(verStr))
     
   def createWidgets(self):
     spaceX= 5
     spaceY= 5
-    # carbofox
-    label= tk.Label(self,text=self.device['carbofox']['name'],width=36,anchor=tk.W,font=("Helvetica","12"),bg=colDev)
-    label.grid(column=1,row=1,columnspan=3,sticky=tk.E+tk.W)
-    label= tk.Label(self,text=self.device['carbofox']['ipAddr'],width=36,anchor=tk.E,font=("Helvetica","12"),bg=colDev)
-    label.grid(column=4,row=1,columnspan=3)
-    label= tk.Label(self,text='pH',width=12,anchor=tk.E,font=("Helvetica","12"))
-    label.grid(column=1,row=2,sticky=tk.W)
-    self.device['carbofox']['phDisp']= tk.Label(self,text='-.-',width=10,anchor=tk.W,font=("Helvetica","12"))
-    self.device['carbofox']['phDisp'].grid(column=2,row=2)
-    label= tk.Label(self,text='  ',width=8,anchor=tk.W,justify=tk.LEFT,font=("Helvetica","12"))
-    label.grid(column=3,row=2,sticky=tk.W)
-    label= tk.Label(self,text='Timer',width=12,anchor=tk.E,font=("Helvetica","12"))
-    label.grid(column=4,row=2,sticky=tk.W)
-    self.device['carbofox']['timeDisp']= tk.Label(self,text='--',width=10,anchor=tk.W,font=("Helvetica","12"))
-    self.device['carbofox']['timeDisp'].grid(column=5,row=2)
-    label= tk.Label(self,text='s',width=8,anchor=tk.W,justify=tk.LEFT,font=("Helvetica","12"))
-    label.grid(column=6,row=2,sticky=tk.W)
-    # tanks
-    row= 3
-    for tank in range(1,self.tankCount+1):
-      key= 'tank{:d}'.format(tank)
-      label= tk.Label(self,text=self.device[key]['name'],width=36,anchor=tk.W,font=("Helvetica","12"),bg=colDev)
+    row= 1
+    for dev in self.device.values():
+      label= tk.Label(self,text=dev['name'],width=36,anchor=tk.W,font=("Helvetica","12"),bg=colDev)
       label.grid(column=1,row=row,columnspan=3,sticky=tk.E+tk.W)
-      label= tk.Label(self,text=self.device[key]['ipAddr'],width=36,anchor=tk.E,font=("Helvetica","12"),bg=colDev)
+      label= tk.Label(self,text=dev['ipAddr'],width=36,anchor=tk.E,font=("Helvetica","12"),bg=colDev)
       label.grid(column=4,row=row,columnspan=3)
-      label= tk.Label(self,text='pH',width=12,anchor=tk.E,font=("Helvetica","12"))
-      row+= row
-      label.grid(column=1,row=row,sticky=tk.W)
-      self.device[key]['phDisp']= tk.Label(self,text='-.-',width=10,anchor=tk.W,font=("Helvetica","12"))
-      self.device[key]['phDisp'].grid(column=2,row=row)
-      label= tk.Label(self,text='  ',width=8,anchor=tk.W,justify=tk.LEFT,font=("Helvetica","12"))
-      label.grid(column=3,row=row,sticky=tk.W)
-      label= tk.Label(self,text='Temp',width=12,anchor=tk.E,font=("Helvetica","12"))
-      label.grid(column=4,row=row,sticky=tk.W)
-      self.device[key]['tempDisp']= tk.Label(self,text='-.-',width=10,anchor=tk.W,font=("Helvetica","12"))
-      self.device[key]['tempDisp'].grid(column=5,row=row)
-      label= tk.Label(self,text='°C',width=8,anchor=tk.W,justify=tk.LEFT,font=("Helvetica","12"))
-      label.grid(column=6,row=row,sticky=tk.W)
+      # shown values two to a row
+      for n,show in enumerate(dev['show']):
+        if n%2==0: row+= 1
+        col= 1+(n%2)*3
+        label= tk.Label(self,text=show['label'],width=12,anchor=tk.E,font=("Helvetica","12"))
+        label.grid(column=col,row=row,sticky=tk.W)
+        show['disp']= tk.Label(self,text='--',width=10,anchor=tk.W,font=("Helvetica","12"))
+        show['disp'].grid(column=col+1,row=row)
+        label= tk.Label(self,text=show['unit'] or '  ',width=8,anchor=tk.W,justify=tk.LEFT,font=("Helvetica","12"))
+        label.grid(column=col+2,row=row,sticky=tk.W)
       row+= 1
     # log window
     self.eventLog=         tk.Text(self,width=58,height=5,bg=colBack)
@@ -242,6 +424,7 @@ class Application(tk.Frame):
     if self.mbActive:
       self.mbActive= False
       root.after_cancel(self.mbEvent)
+      self.poller.stop()
       self.startButton.config(text="Stopped",bg=colOff)
       self.logButton.config(text="No Log",bg=colOff)
       self.logEvent('Scanning stopped',True)
@@ -253,6 +436,7 @@ class Application(tk.Frame):
       self.logEvent('Logging stopped',True)
     else:
       self.mbActive= True
+      self.poller.start()
       self.update();
       self.startButton.config(text="Running",bg=colOn)
       self.logEvent('Scanning started',True)
@@ -284,9 +468,11 @@ class Application(tk.Frame):
     if messagebox.askokcancel("Quit", "Do you want to quit?"):
       if self.mbActive:
         root.after_cancel(self.mbEvent)
+        self.poller.stop()
       self.quit()
 
   def update(self):
+    self.flushEvents()
     self.updateData()
     self.execCtrl()
     self.logTimer()
@@ -295,78 +481,44 @@ class Application(tk.Frame):
       
   #- Control ------------------------------------------------------------------
   
+  # evaluate the rules against the latest snapshots, outputs are written
+  # every rule interval, off while control is off
   def execCtrl(self):
-    co2On= False
-    # control enabled?
-    if self.control:
-      #ensure good data
-      if self.device['tank1']['tempValve']!=None and self.device['tank2']['tempValve']!=None and self.device['tank1']['pH']!=None and self.device['tank2']['pH']!=None:
-        # ensure DSW is flowing
-        if self.device['tank1']['tempValve'] or self.device['tank2']['tempValve']:
-          co2On= True
-        # turn off CO2 if any tank is below 7 and its DSW valve is open
-        if (self.device['tank1']['pH']<minPH and self.device['tank1']['tempValve']):
-          co2On= False
-        if (self.device['tank2']['pH']<minPH and self.device['tank2']['tempValve']):
-          co2On= False
-      else:
-        self.logEvent('Missing data! CO2 off',True)
-    # check and act on result every minTime second
-    now= dt.datetime.now()
-    if now-self.lastChange>dt.timedelta(seconds=minTime):
-      self.lastChange= now
-      mbWrite(self.device['carbofox']['ctrl'],16,co2On,'bool')
-    
+    start= time.perf_counter()
+    now=   time.monotonic()
+    results= self.linkRules.evaluate(now)
+    spent= time.perf_counter()-start
+    self.evalCount+= 1
+    self.evalTotal+= spent
+    self.evalMax=    max(self.evalMax,spent)
+    for rule,on,missing in results:
+      if not self.control: on= False
+      elif missing and not rule['missing']:
+        self.logEvent('Missing data! {} off'.format(rule['name']),True)
+      rule['missing']= missing and self.control
+      if now-rule['last']>rule['interval']:
+        rule['last']= now
+        self.poller.write(rule['device'],rule['addr'],on,'bool')
+
+  # copy the latest snapshot into the devices and display, never blocks
   def updateData(self):
-    # carbofox
-    dev= self.device['carbofox']
-    if not mbOpen(dev['ctrl']):
-      self.logEvent('Cannot open Carbfox',True)
-      dev['phDisp'].configure(bg=colErr)
-      dev['phDisp'].configure(text='-.--')
-      dev['timeDisp'].configure(text='--')
-      return
-    val= mbRead(dev['ctrl'],12,'bool')
-    dev['co2Valve']= val
-    if val==True:  dev['phDisp'].configure(bg=colOn)
-    elif val==False: dev['phDisp'].configure(bg=colOff)
-    else: dev['phDisp'].configure(bg=colErr)
-    val= mbRead(dev['ctrl'],20,'float')
-    dev['pH']= val
-    if val!=None: dev['phDisp'].configure(text='{:.2f}'.format(val))
-    else: dev['phDisp'].configure(text='-.--')
-    val= mbRead(dev['ctrl'],155,'long')
-    dev['timer']= val
-    if val!=None: dev['timeDisp'].configure(text='{:d}'.format(val))
-    else: dev['timeDisp'].configure(text='--')
-    # tank data
-    for tank in range(1,self.tankCount+1):
-      dev= self.device['tank{:d}'.format(tank)]
-      if not mbOpen(dev['ctrl']):
-        self.logEvent('Cannot open Tank 1',True)
-        dev['phDisp'].configure(text='-.--')
-        dev['tempDisp'].configure(text='-.--')
-        dev['phDisp'].configure(bg=colErr)
-        dev['tempDisp'].configure(bg=colErr)
-        return
-      val= mbRead(dev['ctrl'],20,'float')
-      dev['pH']= val
-      if val!=None: dev['phDisp'].configure(text='{:.2f}'.format(val))
-      else: dev['phDisp'].configure(text='-.--')
-      val= mbRead(dev['ctrl'],22,'float')
-      dev['temp']= val
-      if val!=None: dev['tempDisp'].configure(text='{:.2f}'.format(val))
-      else: dev['tempDisp'].configure(text='-.--')
-      val= mbRead(dev['ctrl'],12,'bool')
-      dev['co2Valve']= val
-      if val==True:  dev['phDisp'].configure(bg=colOn)
-      elif val==False: dev['phDisp'].configure(bg=colOff)
-      else: dev['phDisp'].configure(bg=colErr)
-      val= mbRead(dev['ctrl'],10,'bool')
-      dev['tempValve']= val
-      if val==True:  dev['tempDisp'].configure(bg=colOn)
-      elif val==False: dev['tempDisp'].configure(bg=colOff)
-      else: dev['tempDisp'].configure(bg=colErr)
+    snap= self.poller.latest()
+    now= time.monotonic()
+    for key,dev in self.device.items():
+      entry= snap.get(key)
+      if entry==None or now-entry['time']>staleTime:
+        entry= {}
+      for field,addr,typ in dev['regs']:
+        dev[field]= entry.get(field)
+      for show in dev['show']:
+        value= dev[show['field']]
+        if value!=None: show['disp'].configure(text=show['format'].format(value))
+        else: show['disp'].configure(text='--')
+        if show['lamp']==None: continue
+        lamp= dev[show['lamp']]
+        if lamp==True:    show['disp'].configure(bg=colOn)
+        elif lamp==False: show['disp'].configure(bg=colOff)
+        else: show['disp'].configure(bg=colErr)
 
   #- Event reporting ----------------------------------------------------------
 
@@ -383,6 +535,15 @@ class Application(tk.Frame):
     self.eventLog.insert(tk.END,event+'\n')
     self.eventLog.see(tk.END)
 
+  # log lines queued by the poller and health trackers
+  def flushEvents(self):
+    while True:
+      try:
+        event= self.events.get_nowait()
+      except queue.Empty:
+        return
+      self.logEvent(event,True)
+
   def clearEvents(self):
     self.eventLog.delete('1.0',tk.END)
 
@@ -405,49 +566,46 @@ class Application(tk.Frame):
   def logWrite(self):
     now= dt.datetime.now()
     # write log file
+    header= 'Date, Time'
+    for dev in self.device.values():
+      for field,head in dev['log']:
+        header+= ', {}'.format(head)
+    header+= ', Eval Mean us, Eval Max us'
     logName= '{}{}.csv'.format(logFileName,now.strftime('%Y%m%d'))
     filePath= os.path.join(logPath,logName)
+    # a file with other columns is left as it is, rows go to a new one
+    part= 1
+    while os.path.exists(filePath):
+      with open(filePath) as inFile:
+        if inFile.readline().rstrip('\n')==header: break
+      part+= 1
+      logName= '{}{}-{:d}.csv'.format(logFileName,now.strftime('%Y%m%d'),part)
+      filePath= os.path.join(logPath,logName)
     # create directory if needed
     Path(logPath).mkdir(parents=True,exist_ok=True)
     # if needed setup new file
     if not os.path.exists(filePath):
       outFile= open(filePath,'w')
-      outFile.write('Date, Time, CO2 On, Supply pH, CO2 Timer')
-      for tank in range(1,self.tankCount+1):
-        key= 'tank{:d}'.format(tank)
-        outFile.write(', Tank {0:d} pH, Tank {0:d} Temp, Tank {0:d} Cooling'.format(tank))
+      outFile.write(header)
       outFile.write('\n')
       self.logEvent('New log file {} created'.format(logName),True)
     else:
       outFile= open(filePath,'a')
     # write data line
     outFile.write('{}, {}'.format(dt.datetime.now().strftime('%Y-%b-%d'),dt.datetime.now().strftime('%H:%M:%S')))
-    if self.device['carbofox']['co2Valve']!= None:
-      if self.device['carbofox']['co2Valve']:
-        outFile.write(',     True')
-      else:
-        outFile.write(',    False')
-    else: outFile.write(',         ')
-    if self.device['carbofox']['pH']!= None:
-      outFile.write(',{:9.2f}'.format(self.device['carbofox']['pH']))
-    else: outFile.write(',         ')
-    if self.device['carbofox']['timer']!=None:
-      outFile.write(',{:9d}'.format(self.device['carbofox']['timer']))
-    else: outFile.write(',         ')
-    for tank in range(1,self.tankCount+1):
-      key= 'tank{:d}'.format(tank)
-      if self.device[key]['pH']!= None:
-        outFile.write(',{:9.2f}'.format(self.device[key]['pH']))
-      else: outFile.write(',         ')
-      if self.device[key]['temp']!=None:
-        outFile.write(',{:9.2f}'.format(self.device[key]['temp']))
-      else: outFile.write(',         ')
-      if self.device[key]['tempValve']!=None:
-        if self.device[key]['tempValve']:
-          outFile.write(',     True')
-        else:
-          outFile.write(',    False')
-      else: outFile.write(',         ')
+    for dev in self.device.values():
+      for field,head in dev['log']:
+        value= dev[field]
+        if value==None:               outFile.write(',         ')
+        elif isinstance(value,bool):  outFile.write(',{:>9}'.format(str(value)))
+        elif isinstance(value,float): outFile.write(',{:9.2f}'.format(value))
+        else:                         outFile.write(',{:>9}'.format(value))
+    if self.evalCount>0:
+      outFile.write(',{:9.1f},{:9.1f}'.format(self.evalTotal/self.evalCount*1e6,self.evalMax*1e6))
+    else: outFile.write(',         ,         ')
+    self.evalCount= 0
+    self.evalTotal= 0.0
+    self.evalMax=   0.0
     outFile.write('\n')
     outFile.close()
     self.logEvent('Log file {} appended'.format(logName),True)
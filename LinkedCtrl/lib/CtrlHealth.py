@@ -0,0 +1,131 @@
+#------------------------------------------------------------------------------
+#  Controller Health Tracker
+#
+#  - Track communication failures with a controller, back off after
+#    consecutive failures and fail fast while the controller is down
+#
+#  External notes...
+#  - tracker(key) returns the shared CtrlHealth for a controller, key is
+#    usually '<ipAddr>:<port>', every caller using the same key shares it
+#  - setReport(func) sets the function called with a line of text on each
+#    state change, normally the application event log
+#  - CtrlHealth.allow()      True if an attempt may be made now, when the
+#                            circuit is open the first call after the cool
+#                            down is the probe, later calls fail fast
+#  - CtrlHealth.success()    record a good transaction
+#  - CtrlHealth.failure()    record a failed transaction
+#  - CtrlHealth.timeout(t)   connect timeout to use, t normally or the short
+#                            probeTimeout while probing
+#  - CtrlHealth.retryIn()    seconds until the next attempt is allowed
+#  - CtrlHealth.state        'closed', 'open' or 'half-open'
+#  - CtrlHealth.fails        consecutive failures
+#
+#  Internal notes...
+#  - closed: attempts are allowed, after a failure the next attempt waits
+#    backoffBase seconds doubling with each consecutive failure up to
+#    backoffMax
+#  - open: after tripCount consecutive failures every attempt fails at once
+#    for coolTime seconds
+#  - half-open: one probe is allowed with a short timeout, success closes
+#    the circuit and failure opens it for another coolTime
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import threading
+import time
+
+#-- constants -----------------------------------------------------------------
+CLOSED= 'closed'     # controller answering, attempts allowed
+OPEN=   'open'       # controller down, attempts fail fast
+HALF=   'half-open'  # cool down over, one probe allowed
+
+#-- reporting -----------------------------------------------------------------
+reportFunc= None
+
+def setReport(func):
+  global reportFunc
+  reportFunc= func
+
+#------------------------------------------------------------------------------
+#  CtrlHealth Class
+#
+#  - health of one controller
+#
+#------------------------------------------------------------------------------
+class CtrlHealth():
+  backoffBase=  1    # seconds to wait after the first failure
+  backoffMax=   30   # longest wait between attempts while closed
+  tripCount=    3    # consecutive failures that open the circuit
+  coolTime=     60   # seconds the circuit stays open before a probe
+  probeTimeout= 1    # connect timeout in seconds for a probe
+
+  def __init__(self,name):
+    self.name=    name
+    self.state=   CLOSED
+    self.fails=   0
+    self.nextTry= 0.0
+    self.probing= False
+    self.lock=    threading.Lock()
+
+  def allow(self):
+    with self.lock:
+      now= time.monotonic()
+      if now<self.nextTry: return False
+      if self.state==OPEN:
+        self.change(HALF,'probing')
+      if self.state==HALF:
+        if self.probing: return False
+        self.probing= True
+      return True
+
+  def success(self):
+    with self.lock:
+      self.fails=   0
+      self.nextTry= 0.0
+      self.probing= False
+      if self.state!=CLOSED:
+        self.change(CLOSED,'communication restored')
+
+  def failure(self):
+    with self.lock:
+      now= time.monotonic()
+      self.fails+= 1
+      self.probing= False
+      if self.state==HALF or self.fails>=self.tripCount:
+        self.nextTry= now+self.coolTime
+        if self.state!=OPEN:
+          self.change(OPEN,'{:d} failures, retry in {:d}s'.format(self.fails,int(self.coolTime)))
+        return
+      self.nextTry= now+min(self.backoffMax,self.backoffBase*2**(self.fails-1))
+
+  def timeout(self,normal):
+    if self.state==HALF: return min(normal,self.probeTimeout)
+    return normal
+
+  def retryIn(self):
+    return max(0.0,self.nextTry-time.monotonic())
+
+  # caller must hold the lock
+  def change(self,state,reason):
+    self.state= state
+    if reportFunc!=None:
+      reportFunc('Controller {} {}, {}'.format(self.name,state,reason))
+
+#-- shared trackers -----------------------------------------------------------
+trackers= {}
+trackLock= threading.Lock()
+
+def tracker(key):
+  with trackLock:
+    if key not in trackers:
+      trackers[key]= CtrlHealth(key)
+    return trackers[key]
+
+#-- end CtrlHealth ------------------------------------------------------------
@@ -0,0 +1,119 @@
+#------------------------------------------------------------------------------
+#  Link Rules
+#
+#  - Interlock rules over many controllers, evaluated incrementally so the
+#    cost of a control tick does not grow with the number of devices
+#
+#  External notes...
+#  - LinkRules(rules,staleTime) compiles the rules, each rule is a dict
+#      name, device, addr, interval  output coil and write interval
+#      terms  list of {'kind','field','devices','below','above','when'}
+#             kind 'on' turns the output on when the test holds in any
+#             device, 'off' turns it off, a rule without on terms starts on
+#  - LinkRules.update(key,entry) records a new snapshot of a device, entry
+#    is {field:value,...,'time':monotonic} as published by the poller, safe
+#    to call from any thread
+#  - LinkRules.evaluate(now) returns [(rule,on,missing)] for every rule,
+#    missing is True when a term has no data or data older than staleTime,
+#    the output is then off
+#  - LinkRules.fields(key) the fields of a device used by the rules
+#
+#  Internal notes...
+#  - each rule term keeps a count of devices where its test holds and a
+#    count of devices with missing data
+#  - update() only recomputes the terms that use the device and applies the
+#    change to the counts, evaluate() reads the counts of each rule
+#  - staleness is found from a heap of snapshot times, evaluate() only pops
+#    snapshots that have aged out, a device whose latest snapshot ages out
+#    counts as missing until its next update
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import heapq
+import threading
+
+#-- term tests ----------------------------------------------------------------
+
+# (hit,missing) of a term for one device snapshot
+def termTest(term,entry):
+  value= entry.get(term['field'])
+  if value==None: return False,True
+  if term['when']!=None:
+    gate= entry.get(term['when'])
+    if gate==None: return False,True
+    if not gate: return False,False
+  if term['below']!=None: return value<term['below'],False
+  if term['above']!=None: return value>term['above'],False
+  return bool(value),False
+
+#------------------------------------------------------------------------------
+#  LinkRules Class
+#
+#  - compiled rules with the running counts
+#
+#------------------------------------------------------------------------------
+class LinkRules():
+
+  def __init__(self,rules,staleTime):
+    self.rules=     rules
+    self.staleTime= staleTime
+    self.terms=     []      # every term of every rule
+    self.uses=      {}      # device key to [term index]
+    self.ruleTerms= []      # per rule, ([on term index],[off term index])
+    for rule in rules:
+      on,off= [],[]
+      for term in rule['terms']:
+        index= len(self.terms)
+        self.terms.append(term)
+        if term['kind']=='on': on.append(index)
+        else: off.append(index)
+        for key in term['devices']:
+          self.uses.setdefault(key,[]).append(index)
+      self.ruleTerms.append((on,off))
+    # every device starts missing
+    self.hits=    [0]*len(self.terms)
+    self.missing= [len(term['devices']) for term in self.terms]
+    self.state=   {key:[(False,True)]*len(uses) for key,uses in self.uses.items()}
+    self.seq=     dict.fromkeys(self.uses,0)
+    self.ages=    []
+    self.lock=    threading.Lock()
+
+  def fields(self,key):
+    return {field for index in self.uses.get(key,[]) for field in (self.terms[index]['field'],self.terms[index]['when']) if field!=None}
+
+  def update(self,key,entry):
+    if key not in self.uses: return
+    with self.lock:
+      self.apply(key,[termTest(self.terms[index],entry) for index in self.uses[key]])
+      self.seq[key]+= 1
+      heapq.heappush(self.ages,(entry['time'],self.seq[key],key))
+
+  # caller holds the lock
+  def apply(self,key,new):
+    for index,old,now in zip(self.uses[key],self.state[key],new):
+      if old==now: continue
+      self.hits[index]+=    now[0]-old[0]
+      self.missing[index]+= now[1]-old[1]
+    self.state[key]= new
+
+  def evaluate(self,now):
+    result= []
+    with self.lock:
+      while len(self.ages)>0 and now-self.ages[0][0]>self.staleTime:
+        when,seq,key= heapq.heappop(self.ages)
+        if seq==self.seq[key]: self.apply(key,[(False,True)]*len(self.uses[key]))
+      for rule,(on,off) in zip(self.rules,self.ruleTerms):
+        missing= any(self.missing[index]>0 for index in on+off)
+        state= len(on)==0 or any(self.hits[index]>0 for index in on)
+        if any(self.hits[index]>0 for index in off): state= False
+        result.append((rule,state and not missing,missing))
+    return result
+
+#-- end LinkRules -------------------------------------------------------------
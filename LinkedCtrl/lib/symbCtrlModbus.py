@@ -10,9 +10,12 @@
 #
 #
 #  Notes:
-#  - Modbus operations are handled by opening the connection, performing the
-#  requested operation, then immediately closing the connection, connections
-#  are not left open
+#  - Modbus connections are pooled, one socket per controller is kept open
+#  between operations and closed after idleTime seconds without use, a failed
+#  operation on a reused socket reconnects and retries once
+#  - Each controller has a CtrlHealth tracker shared by every SymbCtrl using
+#  it, after consecutive failures attempts back off and then fail at once
+#  until a probe with a short timeout finds the controller answering again
 #  - The error result and message may be queried through calls after completion
 #  of the operation to determine success or failure
 #
@@ -27,10 +30,144 @@
 #  - added one-shot registers
 #  - added TofD to channel list
 #
+# 17Oct2026 v1.2
+#  - connections are pooled and left open between operations instead of
+#    opening and closing a socket for every read or write
+#  - added close(), idle() and connStats() for pool control and statistics
+#  - failures are tracked per controller with backoff and a circuit breaker
+#    so a dead controller fails fast instead of costing a timeout each call,
+#    added health() and retryIn()
+#  - service() decodes the register blocks through a RegCodec plan compiled
+#    from ctrlRegs at import instead of a type chain per register
+#  - each instance has its own copy of ctrlRegs so instances on different
+#    threads no longer share register values
+#  - service() keeps the raw register blocks, returned by rawData()
+#  - added writeRaw() to write runs of raw registers and coils over one
+#    connection
+#  - the pooled connection is always released, a failed int, uint or dint
+#    read no longer raises and leaves the controller locked
+#
 #------------------------------------------------------------------------------
 from pyModbusTCP.client import ModbusClient
 from pyModbusTCP import utils
 import datetime as dt
+import threading
+import time
+import CtrlHealth
+from RegCodec import RegCodec
+
+#-- pyModbusTCP compatibility -------------------------------------------------
+# is_open is a method in pyModbusTCP 0.1.x and a property from 0.2 on
+def mbIsOpen(client):
+  state= client.is_open
+  if callable(state): return state()
+  return state
+
+# timeout is a method in pyModbusTCP 0.1.x and a property from 0.2 on
+def mbTimeout(client,timeout):
+  if callable(client.timeout): client.timeout(timeout)
+  else: client.timeout= timeout
+
+#------------------------------------------------------------------------------
+#  Connection Pool
+#
+#  - keeps one ModbusClient per controller, the socket stays open between
+#    operations so each call does not pay for a new TCP connection
+#  - a socket is only used by one caller at a time, open() takes the
+#    connection lock and release() returns it
+#  - a reaper thread closes sockets that have been idle for idleTime seconds
+#  - open() fails at once while the controller health tracker is backing off
+#    or the circuit is open, release() records the result of the operation
+#
+#------------------------------------------------------------------------------
+class ConnPool():
+  idleTime= 30         # seconds an unused socket is kept open
+
+  def __init__(self):
+    self.conns=  {}
+    self.lock=   threading.Lock()
+    self.reaper= None
+
+  def get(self,ipAddr,port,timeout):
+    key= '{}:{}'.format(ipAddr,port)
+    with self.lock:
+      if key not in self.conns:
+        client= ModbusClient(host=ipAddr,port=int(port),unit_id=1,timeout=timeout,auto_open=False,auto_close=False)
+        self.conns[key]= {'key':key,'client':client,'lock':threading.RLock(),'last':0.0,'fresh':False,'connects':0,'reuses':0,
+                          'timeout':timeout,'health':CtrlHealth.tracker(key)}
+      if self.reaper==None:
+        self.reaper= threading.Thread(target=self.reap,daemon=True)
+        self.reaper.start()
+      return self.conns[key]
+
+  # take the connection and make sure the socket is open
+  def open(self,conn):
+    if not conn['health'].allow(): return False
+    conn['lock'].acquire()
+    if mbIsOpen(conn['client']) and time.monotonic()-conn['last']<self.idleTime:
+      conn['reuses']+= 1
+      conn['fresh']= False
+      return True
+    if self.connect(conn):
+      return True
+    conn['health'].failure()
+    conn['lock'].release()
+    return False
+
+  # open a new socket, caller must hold the connection
+  def connect(self,conn):
+    conn['client'].close()
+    conn['fresh']= True
+    mbTimeout(conn['client'],conn['health'].timeout(conn['timeout']))
+    if conn['client'].open():
+      conn['connects']+= 1
+      return True
+    return False
+
+  # hand the connection back, the socket is left open
+  def release(self,conn,ok=True):
+    if ok: conn['health'].success()
+    else:  conn['health'].failure()
+    if conn['fresh']: mbTimeout(conn['client'],conn['timeout'])
+    conn['last']= time.monotonic()
+    conn['lock'].release()
+
+  def drop(self,conn):
+    with conn['lock']:
+      conn['client'].close()
+
+  def reap(self):
+    while True:
+      time.sleep(min(max(self.idleTime/4,0.5),5))
+      with self.lock:
+        conns= list(self.conns.values())
+      for conn in conns:
+        if not conn['lock'].acquire(blocking=False): continue
+        if mbIsOpen(conn['client']) and time.monotonic()-conn['last']>=self.idleTime:
+          conn['client'].close()
+        conn['lock'].release()
+
+  def stats(self,conn=None):
+    if conn!=None: conns= [conn]
+    else:
+      with self.lock:
+        conns= list(self.conns.values())
+    connects= 0
+    reuses=   0
+    for c in conns:
+      connects+= c['connects']
+      reuses+=   c['reuses']
+    ratio= 0.0
+    if connects+reuses>0: ratio= reuses/(connects+reuses)
+    return {'connects':connects,'reuses':reuses,'ratio':ratio}
+
+  def closeAll(self):
+    with self.lock:
+      conns= list(self.conns.values())
+    for conn in conns:
+      self.drop(conn)
+
+pool= ConnPool()
 
 #------------------------------------------------------------------------------
 #  SymbCtrl Class
@@ -287,8 +424,15 @@ class SymbCtrl():
                  'ProcessedData':'ProcReadValid'}
                
 
+  # decode plan for the register map, compiled once at import
+  codec= RegCodec(ctrlRegs,holdSize,coilSize)
+
   def __init__(self, master=None):
+    self.ctrlRegs=   {reg:dict(entry) for reg,entry in SymbCtrl.ctrlRegs.items()}
+    self.holdData=   None
+    self.coilData=   None
     self.ctrl=       None
+    self.conn=       None
     self.ctrlName=   None
     self.open=       False
     self.valid=      False
@@ -302,13 +446,19 @@ class SymbCtrl():
     if self.__mbStart(ipAddr,port):
       self.ipAddr= ipAddr
       self.port= port
-      self.ctrlName= self.__mbRead('ControlName')
+      name= None
+      try:
+        name= self.__mbRead('ControlName')
+        if name==None and self.__mbRetry():
+          name= self.__mbRead('ControlName')
+      finally:
+        self.__mbClose(name!=None)
+      self.ctrlName= name
       if self.ctrlName=='' or self.ctrlName==None:
         self.ctrlName= 'SymbCtrl'
       if self.ctrlName!=None:
         self.lastError= False
         self.lastMessage= 'Controller {}@{} communication successful'.format(self.ctrlName,ipAddr)
-        self.__mbClose()
         self.open= True
         self.comTime= dt.datetime.now()
         return True
@@ -320,8 +470,37 @@ class SymbCtrl():
     self.comTime=    dt.datetime.min
     self.lastError=  True
     self.lastMessage= 'Unable to open controller {}:{}'.format(ipAddr,port)
+    if self.conn!=None and self.conn['health'].state!=CtrlHealth.CLOSED:
+      self.lastMessage= 'Controller {}:{} not answering, retry in {:.0f}s'.format(ipAddr,port,self.conn['health'].retryIn())
     return False
-    
+
+  # close the pooled socket for this controller
+  def close(self):
+    if self.conn!=None:
+      pool.drop(self.conn)
+    self.open= False
+    return True
+
+  # set the time in seconds an unused socket is kept open, shared by all
+  def idle(self,seconds):
+    ConnPool.idleTime= seconds
+
+  # connection statistics for this controller, or all with allCtrl
+  def connStats(self,allCtrl=False):
+    if allCtrl: return pool.stats()
+    if self.conn==None: return {'connects':0,'reuses':0,'ratio':0.0}
+    return pool.stats(self.conn)
+
+  # health of this controller, 'closed', 'open' or 'half-open'
+  def health(self):
+    if self.conn==None: return CtrlHealth.CLOSED
+    return self.conn['health'].state
+
+  # seconds until the next attempt to reach this controller is allowed
+  def retryIn(self):
+    if self.conn==None: return 0.0
+    return self.conn['health'].retryIn()
+
   def error(self):
     return self.lastError
 
@@ -403,6 +582,12 @@ class SymbCtrl():
     self.lastMessage= 'Success'
     return True
 
+  # holding registers and coils from the last service(), None if stale
+  def rawData(self):
+    if not self.valid or self.holdData==None: return None
+    if dt.datetime.now()-self.dataTime>dt.timedelta(seconds=self.validTime): return None
+    return self.holdData,self.coilData
+
   def type(self,reg):
     if reg in self.ctrlRegs:
       self.lastError= False
@@ -531,15 +716,19 @@ class SymbCtrl():
       self.lastMessage= 'Unable to connect to {}'.format(self.ctrlName)
       self.open= False
       return None
-    stat= self.__mbRead('Status')
+    stat= None
+    try:
+      stat= self.__mbRead('Status')
+      if stat==None and self.__mbRetry():
+        stat= self.__mbRead('Status')
+    finally:
+      self.__mbClose(stat!=None)
     if stat==None:
       self.lastError= True
       self.lastMessage= 'Unable to query {} status '.format(self.ctrlName)
-      self.__mbClose()
       return None
     self.lastError= False
     self.lastMessage= 'Success'
-    self.__mbClose()
     self.comTime= dt.datetime.now()
     return stat
 
@@ -549,7 +738,13 @@ class SymbCtrl():
       self.lastMessage= 'Unable to connect to {}'.format(self.ctrlName)
       self.open= False
       return None
-    val= self.__mbRead(reg)
+    val= None
+    try:
+      val= self.__mbRead(reg)
+      if val==None and self.__mbRetry():
+        val= self.__mbRead(reg)
+    finally:
+      self.__mbClose(val!=None)
     if val!=None:
       self.lastError= False
       self.lastMessage= 'Success'
@@ -557,7 +752,6 @@ class SymbCtrl():
     else:
       self.lastError= True
       self.lastMessage= 'Unable to read {} from {}'.format(reg,self.ctrlName)
-    self.__mbClose()
     return val
 
   def write(self,reg,value):
@@ -566,15 +760,20 @@ class SymbCtrl():
       self.lastMessage= 'Unable to connect to {}'.format(self.ctrlName)
       self.open= False
       return False
-    if self.__mbWrite(reg,value):
+    done= False
+    try:
+      done= self.__mbWrite(reg,value)
+      if not done and self.__mbRetry():
+        done= self.__mbWrite(reg,value)
+    finally:
+      self.__mbClose(done)
+    if done:
       self.lastError= False
       self.lastMessage= 'Success'
-      self.__mbClose()
       self.comTime= dt.datetime.now()
       return True
     self.lastError= True
     self.lastMessage= 'Unable to write {} to {}'.format(reg,self.ctrlName)
-    self.__mbClose()
     return False
 
   def writeAll(self):
@@ -587,52 +786,65 @@ class SymbCtrl():
     self.comTime= dt.datetime.now()
     return True
 
-  def service(self):
+  # write runs of holding registers and coils as (addr,[values]), one
+  # transaction per run, stops at the first failure
+  def writeRaw(self,holdRuns,coilRuns):
     if not self.__mbOpen():
       self.lastError= True
       self.lastMessage= 'Unable to connect to {}'.format(self.ctrlName)
       self.open= False
       return False
-    hold= self.__mbBlockHold(self.holdBase,self.holdSize)
-    if hold==None:
+    failed= 'Unable to write to {}'.format(self.ctrlName)
+    try:
+      for addr,words in holdRuns:
+        done= self.ctrl.write_multiple_registers(addr,words)
+        if not done and self.__mbRetry():
+          done= self.ctrl.write_multiple_registers(addr,words)
+        if not done:
+          failed= 'Unable to write registers {:d}-{:d} to {}'.format(addr,addr+len(words)-1,self.ctrlName)
+          return False
+      for addr,bits in coilRuns:
+        done= self.ctrl.write_multiple_coils(addr,bits)
+        if not done and self.__mbRetry():
+          done= self.ctrl.write_multiple_coils(addr,bits)
+        if not done:
+          failed= 'Unable to write coils {:d}-{:d} to {}'.format(addr,addr+len(bits)-1,self.ctrlName)
+          return False
+      failed= None
+    finally:
+      self.__mbClose(failed==None)
+      if failed!=None:
+        self.lastError= True
+        self.lastMessage= failed
+    self.lastError= False
+    self.lastMessage= 'Success'
+    self.comTime= dt.datetime.now()
+    return True
+
+  def service(self):
+    if not self.__mbOpen():
       self.lastError= True
-      self.lastMessage= 'Could not read data from {}'.format(self.ctrlName)
-      self.__mbClose()
+      self.lastMessage= 'Unable to connect to {}'.format(self.ctrlName)
+      self.open= False
       return False
-    coil= self.__mbBlockCoil(self.coilBase,self.coilSize)
+    hold= None
+    coil= None
+    try:
+      hold= self.__mbBlockHold(self.holdBase,self.holdSize)
+      if hold==None and self.__mbRetry():
+        hold= self.__mbBlockHold(self.holdBase,self.holdSize)
+      if hold!=None:
+        coil= self.__mbBlockCoil(self.coilBase,self.coilSize)
+    finally:
+      self.__mbClose(coil!=None)
     if coil==None:
       self.lastError= True
       self.lastMessage= 'Could not read data from {}'.format(self.ctrlName)
-      self.__mbClose()
       return False
-    for reg in self.ctrlRegs.keys():
-      if self.ctrlRegs[reg]['mode']=='w': continue
-      if self.ctrlRegs[reg]['type']=='bool':
-        self.ctrlRegs[reg]['value']= coil[self.ctrlRegs[reg]['addr']]
-      if self.ctrlRegs[reg]['type']=='int':
-        self.ctrlRegs[reg]['value']= utils.get_list_2comp([hold[self.ctrlRegs[reg]['addr']]],16)[0]
-      if self.ctrlRegs[reg]['type']=='uint':
-        self.ctrlRegs[reg]['value']= hold[self.ctrlRegs[reg]['addr']]
-      if self.ctrlRegs[reg]['type']=='dint':
-        self.ctrlRegs[reg]['value']= hold[self.ctrlRegs[reg]['addr']]+(hold[self.ctrlRegs[reg]['addr']+1]*65536)
-      if self.ctrlRegs[reg]['type']=='float':
-        self.ctrlRegs[reg]['value']= utils.decode_ieee(utils.word_list_to_long([hold[self.ctrlRegs[reg]['addr']],hold[self.ctrlRegs[reg]['addr']+1]],big_endian=False)[0])
-      if self.ctrlRegs[reg]['type']=='str':
-        st= ''
-        addr= self.ctrlRegs[reg]['addr']
-        for pos in range(8):
-          ch= hold[addr+pos]>>8
-          if ch==0: break
-          st= st+chr(ch)
-          ch= hold[addr+pos]&0xFF
-          if ch==0: break
-          st= st+chr(ch)
-        self.ctrlRegs[reg]['value']= st
-      if self.ctrlRegs[reg]['type']=='time':
-        self.ctrlRegs[reg]['value']= '{:02d}:{:02d}:{:02d}'.format(hold[self.ctrlRegs[reg]['addr']],hold[self.ctrlRegs[reg]['addr']+1],hold[self.ctrlRegs[reg]['addr']+2])
-      if self.ctrlRegs[reg]['type']=='hour':
-        self.ctrlRegs[reg]['value']= '{:02d}:{:02d}'.format(hold[self.ctrlRegs[reg]['addr']],hold[self.ctrlRegs[reg]['addr']+1])
-    self.__mbClose()
+    for reg,value in self.codec.decode(hold,coil).items():
+      self.ctrlRegs[reg]['value']= value
+    self.holdData= hold
+    self.coilData= coil
     self.comTime=  dt.datetime.now()
     self.dataTime= dt.datetime.now()
     self.valid= True
@@ -640,30 +852,40 @@ class SymbCtrl():
 
   #-- modbus handling ---------------------------------------------------------
   def __mbStart(self,ipAddr,port):
-    self.ctrl= ModbusClient(host=ipAddr,port=port,unit_id=1,timeout=self.timeout,auto_open=False,auto_close=False)
-    return self.ctrl.open()
+    self.conn= pool.get(ipAddr,port,self.timeout)
+    self.ctrl= self.conn['client']
+    return pool.open(self.conn)
 
   def __mbOpen(self):
-    if self.ctrl.is_open()==True:
-      self.ctrl.close()
-    return self.ctrl.open()
+    if self.conn==None: return False
+    return pool.open(self.conn)
 
-  def __mbClose(self):
-    if self.ctrl.is_open():
-      self.ctrl.close()
+  def __mbClose(self,ok=True):
+    pool.release(self.conn,ok)
     return True
 
+  # a reused socket may have been dropped by the controller, reconnect once
+  def __mbRetry(self):
+    if self.conn['fresh']: return False
+    return pool.connect(self.conn)
+
   def __mbRead(self,reg):
     if reg not in self.ctrlRegs:
       return None
     addr= self.ctrlRegs[reg]['addr']
     type= self.ctrlRegs[reg]['type']
     if type=='int':
-      return utils.get_list_2comp(self.ctrl.read_holding_registers(addr,1),16)[0]
+      result= self.ctrl.read_holding_registers(addr,1)
+      if result==None: return None
+      return utils.get_list_2comp(result,16)[0]
     if type=='uint':
-      return self.ctrl.read_holding_registers(addr,1)[0]
+      result= self.ctrl.read_holding_registers(addr,1)
+      if result==None: return None
+      return result[0]
     if type=='dint':
-      return utils.word_list_to_long(self.ctrl.read_holding_registers(addr,2))
+      result= self.ctrl.read_holding_registers(addr,2)
+      if result==None: return None
+      return utils.word_list_to_long(result)
     if type=='float':
       while True:
         result= self.ctrl.read_holding_registers(addr,2)
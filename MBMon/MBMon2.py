@@ -35,6 +35,11 @@
 #  - Fix data box scrolling for mouse entry and exit
 #  09Jul2025 A. Cooper
 #  - Fix CSV output bug, may skip fields
+#  17Oct2026
+#  - added <scanEngine> configuration tag, 'async' polls all devices from a
+#    single asyncio subprocess instead of one subprocess per device
+#  - added <metrics> configuration tag, [host:]port serves scanner health
+#    and latency in the Prometheus text format at /metrics
 #
 #------------------------------------------------------------------------------
 verStr= 'MBMon2 v2.1'
@@ -72,6 +77,7 @@ libPath=  os.path.join(localDir,libFilePath)
 cfgPath=  os.path.join(localDir,cfgFilePath)
 sys.path.append(libPath)
 from MBScan import MBScanner
+import PromExport
 
 #------------------------------------------------------------------------------
 #  MBMon GUI
@@ -89,6 +95,7 @@ class Application(tk.Frame):
   logFile=      None
   lastLog=      dt.datetime.now()
   eventNow=     dt.datetime.min
+  exporter=     None
 
   def __init__(self, master=None):
     print('{} starting...'.format(verStr))
@@ -110,7 +117,12 @@ class Application(tk.Frame):
       for datum in device['data']:
         reg= {'ipAddr':device['ipAddr'],'port':device['port'],'name':datum['name'],'register':int(datum['addr']),'type':datum['type']}
         regs.append(reg)
-    self.devices.start(regs,scanInterval)
+    engine= 'process'
+    if 'scanEngine' in self.config and self.config['scanEngine']!=None:
+      engine= self.config['scanEngine'].strip().lower()
+    self.devices.timing= self.config.get('metrics')!=None
+    self.devices.start(regs,scanInterval,engine)
+    self.startExporter()
     #setup complete
     self.mbEvent= root.after(int(self.config['scanInterval'])*500,self.update)
     print('  MBMon2 running...')
@@ -235,9 +247,24 @@ class Application(tk.Frame):
       self.logEvent('Shutting down...',True)
       self.update_idletasks()
       root.after_cancel(self.mbEvent)
+      if self.exporter!=None: self.exporter.stop()
       self.devices.close()
       self.quit()
 
+  # serve scanner metrics from a background thread, never touches Tk
+  def startExporter(self):
+    if self.config.get('metrics')==None: return
+    names= {device['ipAddr']:device['name'] for device in self.config['devices']}
+    try:
+      host,port= PromExport.parseAddress(self.config['metrics'])
+      self.exporter= PromExport.MetricsServer(lambda: PromExport.scanText('mbmon',self.devices.metrics(),names),host,port)
+      self.exporter.start()
+    except (ValueError,OSError) as err:
+      self.exporter= None
+      self.logEvent('Metrics exporter not started: {}'.format(err),True)
+      return
+    self.logEvent('Metrics served at http://{}:{:d}/metrics'.format(host,self.exporter.port),True)
+
   def update(self):
     self.scanData();
     self.logTimer();
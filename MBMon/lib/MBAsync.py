@@ -0,0 +1,173 @@
+#------------------------------------------------------------------------------
+#  ModbusTCP asyncio Client
+#
+#  - Minimal non-blocking ModbusTCP client built on asyncio streams
+#  - Used by MBScan to poll many devices from one event loop without a
+#    process or thread per device
+#
+#  External notes...
+#  - client= AsyncClient(ipAddr,port,unit,timeout) creates the client, no
+#    connection is made until open() is awaited
+#  - await client.open()  returns True if the connection was established
+#  - await client.close() closes the connection
+#  - await client.readHold(addr,count)  returns a list of register values or
+#    None on failure
+#  - await client.readCoils(addr,count) returns a list of booleans or None on
+#    failure
+#  - await client.writeHold(addr,values)  write holding registers, True if
+#    written
+#  - await client.writeCoils(addr,bits)   write coils, True if written
+#  - client.error      indicates the error status, 0=good, 1=com error, 2=read error
+#  - client.errText    give the error reason in human readable text
+#  - client.exception  Modbus exception code of the last response, 0 if none
+#
+#  Internal notes...
+#  - each request is framed with the standard 7 byte MBAP header, the
+#    transaction id is checked on the response
+#  - only one request is outstanding per client, the caller awaits each
+#    request before issuing the next
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#  - added writeHold(), writeCoils() and the exception code
+#  - a response header length under 2 is a bad frame
+#  - a read response shorter than its byte count is a bad frame
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import asyncio
+import struct
+
+#-- constants -----------------------------------------------------------------
+FC_READ_COILS=  1
+FC_READ_HOLD=   3
+FC_WRITE_COILS= 15
+FC_WRITE_HOLD=  16
+
+#-- client class --------------------------------------------------------------
+
+class AsyncClient():
+
+  def __init__(self,host,port=502,unit=1,timeout=5):
+    self.host=    host
+    self.port=    int(port)
+    self.unit=    unit
+    self.timeout= timeout
+    self.reader=  None
+    self.writer=  None
+    self.tid=     0
+    self.error=   0
+    self.errText= 'No error'
+    self.exception= 0
+
+  def isOpen(self):
+    return self.writer!=None
+
+  async def open(self):
+    await self.close()
+    try:
+      self.reader,self.writer= await asyncio.wait_for(asyncio.open_connection(self.host,self.port),self.timeout)
+    except (OSError,asyncio.TimeoutError):
+      self.reader= None
+      self.writer= None
+      self.error= 1
+      self.errText= 'Unable to open {}:{} for Modbus'.format(self.host,self.port)
+      return False
+    self.error= 0
+    self.errText= 'No error'
+    return True
+
+  async def close(self):
+    if self.writer!=None:
+      self.writer.close()
+      try:
+        await self.writer.wait_closed()
+      except OSError:
+        pass
+    self.reader= None
+    self.writer= None
+
+  # send one PDU and return the response PDU, None on any failure
+  async def request(self,pdu):
+    if self.writer==None:
+      self.error= 1
+      self.errText= 'Not connected to {}'.format(self.host)
+      return None
+    self.tid= (self.tid+1) & 0xFFFF
+    frame= struct.pack('>HHHB',self.tid,0,len(pdu)+1,self.unit)+pdu
+    try:
+      self.writer.write(frame)
+      await self.writer.drain()
+      head= await asyncio.wait_for(self.reader.readexactly(7),self.timeout)
+      tid,pid,length,unit= struct.unpack('>HHHB',head)
+      if length<2:
+        await self.close()
+        self.error= 2
+        self.errText= 'Bad response frame from {}'.format(self.host)
+        return None
+      body= await asyncio.wait_for(self.reader.readexactly(length-1),self.timeout)
+    except (OSError,EOFError,asyncio.TimeoutError,asyncio.IncompleteReadError):
+      await self.close()
+      self.error= 1
+      self.errText= 'Communication lost with {}'.format(self.host)
+      return None
+    if tid!=self.tid or pid!=0 or len(body)<2:
+      await self.close()
+      self.error= 2
+      self.errText= 'Bad response frame from {}'.format(self.host)
+      return None
+    if body[0]&0x80:
+      self.error= 2
+      self.exception= body[1]
+      self.errText= 'Modbus exception {:d} from {}'.format(body[1],self.host)
+      return None
+    self.exception= 0
+    self.error= 0
+    self.errText= 'No error'
+    return body
+
+  async def readHold(self,addr,count):
+    resp= await self.request(struct.pack('>BHH',FC_READ_HOLD,addr,count))
+    if resp==None: return None
+    if resp[0]!=FC_READ_HOLD or resp[1]!=count*2 or len(resp)<2+resp[1]:
+      self.error= 2
+      self.errText= 'Bad holding register response from {}'.format(self.host)
+      return None
+    return list(struct.unpack('>{:d}H'.format(count),resp[2:2+count*2]))
+
+  async def readCoils(self,addr,count):
+    resp= await self.request(struct.pack('>BHH',FC_READ_COILS,addr,count))
+    if resp==None: return None
+    if resp[0]!=FC_READ_COILS or resp[1]!=(count+7)//8 or len(resp)<2+resp[1]:
+      self.error= 2
+      self.errText= 'Bad coil response from {}'.format(self.host)
+      return None
+    bits= resp[2:]
+    return [bool((bits[i>>3]>>(i&7))&1) for i in range(count)]
+
+  async def writeHold(self,addr,values):
+    resp= await self.request(struct.pack('>BHHB{:d}H'.format(len(values)),FC_WRITE_HOLD,addr,len(values),len(values)*2,*values))
+    if resp==None: return False
+    if resp[0]!=FC_WRITE_HOLD:
+      self.error= 2
+      self.errText= 'Bad register write response from {}'.format(self.host)
+      return False
+    return True
+
+  async def writeCoils(self,addr,bits):
+    packed= bytearray((len(bits)+7)//8)
+    for i,bit in enumerate(bits):
+      if bit: packed[i>>3]|= 1<<(i&7)
+    resp= await self.request(struct.pack('>BHHB',FC_WRITE_COILS,addr,len(bits),len(packed))+bytes(packed))
+    if resp==None: return False
+    if resp[0]!=FC_WRITE_COILS:
+      self.error= 2
+      self.errText= 'Bad coil write response from {}'.format(self.host)
+      return False
+    return True
+
+#-- end MBAsync ---------------------------------------------------------------
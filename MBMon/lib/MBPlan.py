@@ -0,0 +1,66 @@
+#------------------------------------------------------------------------------
+#  Modbus Block Read Planner
+#
+#  - Turn a set of register addresses into a short list of block reads
+#
+#  External notes...
+#  - planBlocks(addrs,limit,gap) returns a list of [start,count] blocks that
+#    cover every address in addrs
+#      addrs:  any iterable of register or coil addresses, duplicates ignored
+#      limit:  most registers allowed in one transaction, use HOLD_LIMIT for
+#              holding registers and COIL_LIMIT for coils, WRITE_LIMIT when
+#              planning holding register writes
+#      gap:    largest run of unwanted addresses that will be read through to
+#              join two blocks, 0 only joins adjacent addresses
+#  - planCount(blocks) returns the number of registers read by a plan
+#  - planText(blocks) returns the plan in human readable form
+#
+#  Internal notes...
+#  - addresses are sorted and merged greedily, a block is extended while the
+#    next address is within gap of the block end and the block stays inside
+#    the protocol limit
+#  - a gap costs two bytes per holding register on the wire, a new
+#    transaction costs a request and a round trip, the default gaps in the
+#    scanners favor fewer transactions
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- constants -----------------------------------------------------------------
+HOLD_LIMIT= 125   # Modbus limit for holding registers in one read
+COIL_LIMIT= 2000  # Modbus limit for coils in one read
+WRITE_LIMIT= 123  # Modbus limit for holding registers in one write
+
+#-- planner -------------------------------------------------------------------
+
+def planBlocks(addrs,limit,gap=0):
+  blocks= []
+  for addr in sorted(set(addrs)):
+    if len(blocks)>0:
+      start= blocks[-1][0]
+      end=   start+blocks[-1][1]
+      if addr-end<=gap and addr-start<limit:
+        blocks[-1][1]= addr-start+1
+        continue
+    blocks.append([addr,1])
+  return blocks
+
+def planCount(blocks):
+  count= 0
+  for block in blocks:
+    count+= block[1]
+  return count
+
+def planText(blocks):
+  if len(blocks)==0: return 'no reads'
+  text= []
+  for start,count in blocks:
+    text.append('{:d}-{:d}'.format(start,start+count-1))
+  return '{:d} reads, {:d} registers: {}'.format(len(blocks),planCount(blocks),', '.join(text))
+
+#-- end MBPlan ----------------------------------------------------------------
@@ -3,14 +3,35 @@
 #
 #  - Maintain a data structure from a set of Modbus devices
 #  - Use multiprocess to spawn a subprocesses to get data asychronously
+#  - Optionally use a single asyncio subprocess to poll all devices
 #
 #  External notes...
-#  - MBScanner.start(map) should be called once to initiate scanning
+#  - MBScanner.start(map,scanInt,engine) should be called once to initiate
+#    scanning, engine is 'process' (default) for one subprocess per device or
+#    'async' for one subprocess polling every device from an asyncio loop
 #  - MBScanner.get(ipAddr,name) retrieve a specific piece of data, will be None
 #    if the get fails, check error or errText
 #  - MBScanner.close()    will kill all subprocesses
+#  - MBScanner.snapshot(ipAddr) consistent copy of the data of a device as
+#                         {'seq','hold','coil'}, values in block table order
+#  - MBScanner.cpuTime()  processor time used by the subprocess of each device
+#                         in seconds as a dict keyed by IP address
 #  - MBScanner.error      indicates the error status, 0=good, 1=com error, 2=read error
 #  - MBScanner.errText    give the error reason in human readable text
+#  - MBScanner.plan()     the block reads planned for each device
+#  - MBScanner.printPlan() print the planned block reads
+#  - MBScanner.holdGap    unused holding registers read to join two blocks
+#  - MBScanner.coilGap    unused coils read to join two blocks, both gaps
+#                         must be set before start()
+#  - MBScanner.timing     set True before start() to time each phase of the
+#                         scan loop
+#  - MBScanner.scanStats(ipAddr) scan timing of a device as ScanStats.read()
+#                         gives it, None when timing is off
+#  - MBScanner.metrics()  scanner metrics of every device for PromExport,
+#                         safe to call from another thread
+#                         {<ip>:{'valid','errors','age','stats'}}, errors
+#                         counts by type 'com' and 'read', age seconds since
+#                         the last good scan or None
 #  - the register map is sent as a list of required devices and registers
 #        [{'ipAddr':   <device IP address>,
 #          'port':     <Modbus port>,
@@ -21,29 +42,38 @@
 #        hold:  one holding register as an unsigned integer
 #        uint:  same as hold
 #        int:   one holding resiter as signed integer
+#        long:  unsigned 32bit integer using two holding registers
 #        float: floating point using two holding registers as 32bit IEEE-754
 #        coil:  one coil register as boolean
 #        bool:  same as coil
-#  
+#
 #  Internal notes...
-#  - the data list will be compiled into a device and register list that
-#    uses one or two transactions per modbus device, one for holding and one
-#    for coil registers
-#  - the register map is stored in a dict of dicts with a list of IP addresses and registers
-#        mbScanner.datList= {<ipAddr>:
-#            {'port':    <Modbus port>,
-#             'name':    <data name>,
+#  - the requested addresses of each device are planned into a list of block
+#    reads with MBPlan, unused addresses are only read when the gap between
+#    two wanted addresses is no more than holdGap or coilGap, blocks are kept
+#    within the 125 register and 2000 coil Modbus limits
+#  - the register map is stored in a dict of dicts keyed by IP address and name
+#        mbScanner.datList= {<ipAddr>+<reg name>:
+#            {'ipAddr':  <device IP address>,
 #             'register':<register number>,
-#             'type':    <data type>}}
+#             'type':    <data type>,
+#             'pos':     <index of the value in the device hold or coil data>}}
 #  - the list of unique devices is compiled and stored in a dict of dicts
-#        mbScanner.devList= {<ipAddr>+<reg name>:
-#            {'port':<Modbus port>,
-#             'holdStart':<first Modbus holding register>,
-#             'holdStop': <last Modbus holding register>,
-#             'coilStart':<first Modbus coil register>,
-#             'coilStop': <last Modbus coil register>,
+#        mbScanner.devList= {<ipAddr>:
+#            {'port':     <Modbus port>,
+#             'hold':     <list of wanted holding registers>,
+#             'coil':     <list of wanted coils>,
+#             'holdPlan': <list of [start,count] holding register reads>,
+#             'coilPlan': <list of [start,count] coil reads>,
 #             'proc':     <subprocess object>,
-#             'data':     <subprocess shared array>}
+#             'wake':     <event to wake the subprocess>,
+#             'data':     <subprocess shared array>,
+#             'mem':      <shared memory block of register data>,
+#             'seqData':  <publish sequence view of mem>,
+#             'holdData': <holding register view of mem>,
+#             'coilData': <coil view of mem>,
+#             'statMem':  <shared memory block of scan timing, or None>,
+#             'stats':    <ScanStats view of statMem, or None>}
 #  - communication with the subprocess takes place through an array of integers
 #        0:  message to subprocess, 0:none, -1:kill
 #        1:  subprocess error, 0:none, 1:com error, 2:read error
@@ -52,25 +82,54 @@
 #        4:  IP address byte 3
 #        5:  IP address byte 4
 #        6:  port
-#        7:  start hold address
-#        8:  end hold address
-#        9:  first hold address
-#        10: number of holding registers
-#        11: start coil address
-#        12: end coil address
-#        13: first coil address
-#        14: number of coil registers
-#        15: scan time in seconds
-#        16 to n: holding reg data
-#        n+1 to m: coil reg data
-#  - pyModbusTCP can only read 125 holding registers at once, larger blocks must
-#    be broken up into several transactions... Done
+#        7:  number of holding register blocks
+#        8:  number of coil blocks
+#        9:  scan time in seconds
+#        10: processor time used by the subprocess in ms
+#        11: com errors, scans that could not connect
+#        12: read errors
+#        13: ms time stamp of the last good scan, -1 before the first
+#        14 to n: block table, three entries per block, holding blocks first
+#              start address
+#              number of registers
+#              index of first value in the hold or coil data
+#  - register data is kept in a shared memory block without a lock, a 32bit
+#    publish sequence, holding register blocks in table order as unsigned
+#    16bit words and one byte per coil
+#  - all blocks read in a scan are stored together between two increments of
+#    the sequence, get() and snapshot() copy the data and keep the copy only
+#    if the sequence was even and unchanged, so two word values are never torn
+#  - the async engine uses the same shared arrays, one coroutine per device
+#    sleeps between scans so idle devices cost nothing, maxActive limits the
+#    number of devices being read at the same time
+#  - subprocesses block on a wake event until the next scan is due, close()
+#    sets the event after the poison pill so the subprocesses end at once
+#  - with timing on each device has a ScanStats block its scanner records
+#    connect, block read and publish times into, there is no decode phase,
+#    with timing off the scanner holds None and skips every call
 #
 #  Symbrosia
 #  Copyright 2021-2025, all rights reserved
 #
 # 30Apr2025 A. Cooper
 #  - initial version
+# 17Oct2026
+#  - added asyncio scanning engine selectable at start()
+#  - fixed port from the shared array being ignored, always used 502
+#  - create the client with constructor arguments, works with pyModbusTCP 0.1
+#    through 0.3
+#  - replaced the single holding and coil span per device with planned block
+#    reads so sparse register lists do not read everything in between
+#  - fixed hold, bool and long types not extending the span in start()
+#  - wait on an event between scans instead of polling every 100ms, added
+#    cpuTime()
+#  - register data moved from the locked shared array to a shared memory block
+#  - seqlock on the register data, added snapshot()
+#  - per phase scan timing when timing is set, added scanStats()
+#  - error counts by type and the time of the last good scan are kept in
+#    the shared array, added metrics()
+#  - a scan of the async engine that raises counts as a read error, a device
+#    task that ends is marked bad and started again instead of dropped
 #
 # Remaining to do:
 # - add input qualification
@@ -83,186 +142,296 @@ import os
 import datetime as dt
 import time
 import ipaddress
+import asyncio
 from enum import IntEnum
-from multiprocessing import Process, Array
+from array import array
+from multiprocessing import Process, Array, Event
+from multiprocessing.shared_memory import SharedMemory
 from pyModbusTCP.client import ModbusClient
 from pyModbusTCP import utils
+from MBAsync import AsyncClient
+from MBPlan import planBlocks, planCount, planText, HOLD_LIMIT, COIL_LIMIT
+import ScanStats
 
 class Share(IntEnum):
-    SUBMSG   = 0
-    ERROR    = 1
-    IP1      = 2
-    IP2      = 3
-    IP3      = 4
-    IP4      = 5
-    PORT     = 6
-    HOLDSTART= 7
-    HOLDSTOP = 8
-    HOLDFIRST= 9
-    HOLDCOUNT= 10
-    COILSTART= 11
-    COILSTOP = 12
-    COILFIRST= 13
-    COILCOUNT= 14
-    SCANTIME=  15
-    FIRSTDATA= 16
+    SUBMSG    = 0
+    ERROR     = 1
+    IP1       = 2
+    IP2       = 3
+    IP3       = 4
+    IP4       = 5
+    PORT      = 6
+    HOLDBLOCKS= 7
+    COILBLOCKS= 8
+    SCANTIME  = 9
+    CPUTIME   = 10
+    ERRCOM    = 11
+    ERRREAD   = 12
+    GOOD      = 13
+    BLOCKS    = 14
+
+# millisecond time stamp shared between processes, wraps at 31 bits
+def msStamp():
+  return int(time.monotonic()*1000)&0x7fffffff
+
+# count the error of a finished scan, or stamp it good
+def scanDone(shared):
+  if shared[Share.ERROR]==1: shared[Share.ERRCOM]+= 1
+  elif shared[Share.ERROR]==2: shared[Share.ERRREAD]+= 1
+  else: shared[Share.GOOD]= msStamp()
+
+# get the block tables from a shared array as lists of [start,count,first]
+def shareBlocks(shared):
+  blocks= []
+  for i in range(shared[Share.HOLDBLOCKS]+shared[Share.COILBLOCKS]):
+    pos= Share.BLOCKS+i*3
+    blocks.append([shared[pos],shared[pos+1],shared[pos+2]])
+  return blocks[:shared[Share.HOLDBLOCKS]],blocks[shared[Share.HOLDBLOCKS]:]
+
+# get the sequence, holding register and coil views of a device data block,
+# a 32bit publish sequence, holding registers as unsigned 16bit words then one
+# byte per coil
+def memViews(mem,holdBlocks):
+  holdEnd= 4+2*sum(count for start,count,first in holdBlocks)
+  return mem.buf[:4].cast('I'),mem.buf[4:holdEnd].cast('H'),mem.buf[holdEnd:]
+
+# store the blocks read in one scan, the sequence is odd while data changes
+def publish(seqData,holdData,coilData,holdNew,coilNew):
+  if len(holdNew)+len(coilNew)==0: return
+  seqData[0]= (seqData[0]+1)&0xffffffff
+  for first,values in holdNew: holdData[first:first+len(values)]= values
+  for first,values in coilNew: coilData[first:first+len(values)]= values
+  seqData[0]= (seqData[0]+1)&0xffffffff
 
 #-- scanner class -------------------------------------------------------------
 
-def scanSub(shared):
+def scanSub(shared,mem,wake,statMem=None):
   debug= False
   comGood= False
+  stats= None # None unless timing, every call is skipped
+  if statMem!=None: stats= ScanStats.ScanStats(statMem)
+  retry= False # last scan failed
   ipAddr= '{}.{}.{}.{}'.format(shared[Share.IP1],shared[Share.IP2],shared[Share.IP3],shared[Share.IP4])
-  port= '{}'.format(shared[Share.PORT])
+  port= shared[Share.PORT]
+  if port<=0: port= 502
   # create a Modbus client object
-  device= ModbusClient(debug=False)
-  device.host= ipAddr
-  if isinstance(port,int):
-    device.port= int(port)
-  else:
-    device.port= 502
-  # freeze array indexes
-  holdStart= shared[Share.HOLDSTART]
-  holdStop=  shared[Share.HOLDSTOP]
-  holdFirst= shared[Share.HOLDFIRST]
-  holdCount= shared[Share.HOLDCOUNT]
-  coilStart= shared[Share.COILSTART]
-  coilStop=  shared[Share.COILSTOP]
-  coilFirst= shared[Share.COILFIRST]
-  coilCount= shared[Share.COILCOUNT]
+  device= ModbusClient(host=ipAddr,port=port)
+  # freeze block tables
+  holdBlocks,coilBlocks= shareBlocks(shared)
+  seqData,holdData,coilData= memViews(mem,holdBlocks)
   # scanning loop
   last= dt.datetime.now()-dt.timedelta(seconds=shared[Share.SCANTIME]+1)
   while True:
     # swallow poison pill and die
-    if shared[Share.SUBMSG]==-1: 
+    if shared[Share.SUBMSG]==-1:
       print('    Scanner for {:15s} terminated!'.format(ipAddr))
+      seqData.release()
+      holdData.release()
+      coilData.release()
+      if stats!=None: stats.release()
       break
     # scan if time elapsed
-    time.sleep(0.1)
     now= dt.datetime.now()
     if (now-last)>dt.timedelta(seconds=shared[Share.SCANTIME]):
       last= now
-      if device.open():
+      if stats!=None: stats.begin(retry)
+      opened= device.open()
+      if stats!=None: stats.lap(ScanStats.CONNECT)
+      if opened:
+        error= 0
+        holdNew= []
+        coilNew= []
         # holding registers
-        if holdCount>0:
-          if debug: print('Read holding regs for {}'.format(ipAddr))
-          if (holdCount<100):  # pyModbusTCP can only do 125 registers at a time
-            values= device.read_holding_registers(holdStart,holdCount)
-          else:  # do 100 at a time
-            values= []
-            for pos in range(holdStart,holdStop,100):
-              if pos+100>=holdStop:
-                count= holdStop-pos+1
-              else:
-                count= 100
-              val= device.read_holding_registers(pos,count)
-              if val==None:
-                values= None
-                break
-              values= values+val
-          if values!=None: # place data in shared
-            for i,val in enumerate(values):
-              shared[holdFirst+i]= val
-            shared[Share.ERROR]= 0 #no error
+        for start,count,first in holdBlocks:
+          if debug: print('Read holding regs {:d} to {:d} for {}'.format(start,start+count-1,ipAddr))
+          values= device.read_holding_registers(start,count)
+          if stats!=None: stats.lap(ScanStats.HOLD)
+          if values!=None:
+            holdNew.append((first,array('H',values)))
           else:
             if debug: print('  Read error!')
-            shared[Share.ERROR]= 2 #set read failed error flag
+            error= 2 #set read failed error flag
         # coils
-        if coilCount>0:
-          if debug: print('Read coils for {}'.format(ipAddr))
-          values= device.read_coils(coilStart,coilCount)
-          if values!=None: # place data in shared
-            for i,val in enumerate(values):
-              if val:
-                shared[coilFirst+i]= 1
-              else:
-                shared[coilFirst+i]= 0
-            shared[Share.ERROR]= 0 #no error
+        for start,count,first in coilBlocks:
+          if debug: print('Read coils {:d} to {:d} for {}'.format(start,start+count-1,ipAddr))
+          values= device.read_coils(start,count)
+          if stats!=None: stats.lap(ScanStats.COILS)
+          if values!=None:
+            coilNew.append((first,bytes(values)))
           else:
             if debug: print('  Read error!')
-            shared[Share.ERROR]= 2 #set read failed error flag
+            error= 2 #set read failed error flag
+        publish(seqData,holdData,coilData,holdNew,coilNew)
+        if stats!=None: stats.lap(ScanStats.PUBLISH)
+        shared[Share.ERROR]= error
         device.close()
       else:
         if debug: print('  Com error!')
         shared[Share.ERROR]= 1 #set com error flag
+      scanDone(shared)
+      retry= shared[Share.ERROR]!=0
+      if stats!=None: stats.end(retry)
+    # sleep until the next scan unless woken by close()
+    shared[Share.CPUTIME]= int(time.process_time()*1000)&0x7fffffff
+    wait= shared[Share.SCANTIME]-(dt.datetime.now()-last).total_seconds()
+    if wait>0: wake.wait(wait)
+
+#-- asyncio scanner -----------------------------------------------------------
+
+maxActive= 64  # maximum devices read at the same time by the async engine
+
+def scanAsync(sharedList,memList,wake,statList):
+  asyncio.run(asyncEngine(sharedList,memList,wake,statList))
+
+async def asyncEngine(sharedList,memList,wake,statList):
+  loop= asyncio.get_running_loop()
+  active= asyncio.Semaphore(maxActive)
+  devices= list(zip(sharedList,memList,statList))
+  tasks= []
+  for shared,mem,statMem in devices:
+    tasks.append(asyncio.create_task(asyncDevice(shared,mem,active,statMem)))
+  # wait for the wake event in a thread, check poison pills when it is set
+  # or a device task ends
+  watch= loop.run_in_executor(None,wake.wait)
+  while len(tasks)>0:
+    await asyncio.wait(tasks+[watch],return_when=asyncio.FIRST_COMPLETED)
+    if watch.done():
+      wake.clear()
+      watch= loop.run_in_executor(None,wake.wait)
+    for i in range(len(tasks)-1,-1,-1):
+      shared,mem,statMem= devices[i]
+      if shared[Share.SUBMSG]==-1:
+        tasks[i].cancel()
+        del tasks[i]
+        del devices[i]
+      elif tasks[i].done():
+        # a device task that failed is marked bad and started again
+        print('    Async scanner task failed, {}'.format(tasks[i].exception()))
+        shared[Share.ERROR]= 2
+        scanDone(shared)
+        tasks[i]= asyncio.create_task(asyncDevice(shared,mem,active,statMem,shared[Share.SCANTIME]))
+  wake.set() # release the watch thread
+  print('    Async scanner terminated!')
+
+async def asyncDevice(shared,mem,active,statMem=None,delay=0):
+  debug= False
+  stats= None # None unless timing, every call is skipped
+  if statMem!=None: stats= ScanStats.ScanStats(statMem)
+  retry= False # last scan failed
+  loop= asyncio.get_running_loop()
+  ipAddr= '{}.{}.{}.{}'.format(shared[Share.IP1],shared[Share.IP2],shared[Share.IP3],shared[Share.IP4])
+  port= shared[Share.PORT]
+  if port<=0: port= 502
+  device= AsyncClient(ipAddr,port)
+  # freeze block tables
+  holdBlocks,coilBlocks= shareBlocks(shared)
+  seqData,holdData,coilData= memViews(mem,holdBlocks)
+  # scanning loop
+  try:
+    await asyncio.sleep(delay)
+    while True:
+      begin= loop.time()
+      async with active:
+        if stats!=None: stats.begin(retry)
+        try:
+          opened= await device.open()
+          if stats!=None: stats.lap(ScanStats.CONNECT)
+          if opened:
+            error= 0
+            holdNew= []
+            coilNew= []
+            # holding registers
+            for start,count,first in holdBlocks:
+              if debug: print('Read holding regs {:d} to {:d} for {}'.format(start,start+count-1,ipAddr))
+              values= await device.readHold(start,count)
+              if stats!=None: stats.lap(ScanStats.HOLD)
+              if values!=None:
+                holdNew.append((first,array('H',values)))
+              else:
+                if debug: print('  Read error!')
+                error= 2 #set read failed error flag
+            # coils
+            for start,count,first in coilBlocks:
+              if debug: print('Read coils {:d} to {:d} for {}'.format(start,start+count-1,ipAddr))
+              values= await device.readCoils(start,count)
+              if stats!=None: stats.lap(ScanStats.COILS)
+              if values!=None:
+                coilNew.append((first,bytes(values)))
+              else:
+                if debug: print('  Read error!')
+                error= 2 #set read failed error flag
+            publish(seqData,holdData,coilData,holdNew,coilNew)
+            if stats!=None: stats.lap(ScanStats.PUBLISH)
+            shared[Share.ERROR]= error
+            await device.close()
+          else:
+            if debug: print('  Com error!')
+            shared[Share.ERROR]= 1 #set com error flag
+        except Exception as err: # a scan that fails is a read error, the next one is tried
+          print('    Scan of {} failed, {}'.format(ipAddr,err))
+          shared[Share.ERROR]= 2
+          await device.close()
+        scanDone(shared)
+        retry= shared[Share.ERROR]!=0
+        if stats!=None: stats.end(retry)
+      shared[Share.CPUTIME]= int(time.process_time()*1000)&0x7fffffff
+      await asyncio.sleep(max(0,shared[Share.SCANTIME]-(loop.time()-begin)))
+  except asyncio.CancelledError:
+    print('    Scanner for {:15s} terminated!'.format(ipAddr))
+    raise
+  finally:
+    seqData.release()
+    holdData.release()
+    coilData.release()
+    if stats!=None: stats.release()
+    await device.close()
 
 
 class MBScanner():
   devList= {}
   datList= {}
   scanInt= 60
+  engine= 'process'
+  holdGap= 16    # unused holding registers read to join two blocks
+  coilGap= 256   # unused coils read to join two blocks
+  snapTries= 1000 # attempts at a consistent copy of device data
+  timing= False  # time the scan phases, must be set before start()
   lastScan= dt.datetime.now();
   stat= True
   errText= 'No error'
 
-  def start(self,data,scanInt):
+  # number of holding registers used by a datum
+  def words(self,datum):
+    if datum['type']=='long' or datum['type']=='float': return 2
+    if datum['type']=='string': return int(datum['length'])
+    return 1
+
+  def start(self,data,scanInt,engine='process'):
     self.devList= {}
     self.datList= {}
     self.scanInt= scanInt
+    self.engine= engine
     if scanInt<1:   scanInt= 1
     if scanInt>600: scanInt= 600
     print('  MBScan starting...')
+    # collect wanted addresses for each device
     for datum in data:
-      found= False
-      for ipAddr,device in self.devList.items():
-        if datum['ipAddr']==ipAddr:
-          found= True
-          if datum['type']=='int' or datum['type']=='uint':
-            if device['holdStart']==None:
-              newDev['holdStart']= datum['register']
-              newDev['holdStop']= datum['register']
-            else:
-              if datum['register']<device['holdStart']:
-                device['holdStart']= datum['register']
-              if datum['register']>device['holdStop']:
-                device['holdStop']= datum['register']
-          if datum['type']=='long' or datum['type']=='float':
-            if device['holdStart']==None:
-              newDev['holdStart']= datum['register']
-              newDev['holdStop']= datum['register']+1
-            else:
-              if datum['register']<device['holdStart']:
-                device['holdStart']= datum['register']
-              if datum['register']>device['holdStop']:
-                device['holdStop']= datum['register']+1
-          if datum['type']=='string':
-            if device['holdStart']==None:
-              device['holdStart']= datum['register']
-              device['holdStop']= datum['register']+datum['length']
-            else:
-              if datum['register']<device['holdStart']:
-                device['holdStart']= datum['register']
-              if datum['register']+datum['length']>device['holdStop']:
-                device['holdStop']= datum['register']+datum['length']
-          if datum['type']=='coil':
-            if device['coilStart']==None:
-              newDev['coilStart']= datum['register']
-              newDev['coilStop']= datum['register']
-            else:
-              if datum['register']<device['coilStart']:
-                device['coilStart']= datum['register']
-              if datum['register']>device['coilStop']:
-                device['coilStop']= datum['register']
-      if not found:
-        newDev= {'port':datum['port'],'holdStart':None,'holdStop':None,'coilStart':None,'coilStop':None,'proc':None}
-        if datum['type']=='int' or datum['type']=='uint':
-          newDev['holdStart']= datum['register']
-          newDev['holdStop']= datum['register']
-        if datum['type']=='long' or datum['type']=='float':
-          newDev['holdStart']= datum['register']
-          newDev['holdStop']= datum['register']+1
-        if datum['type']=='string':
-          device['holdStart']= datum['register']
-          device['holdStop']= datum['register']+datum['length']
-        if datum['type']=='coil':
-          newDev['coilStart']= datum['register']
-          newDev['coilStop']= datum['register']
-        self.devList[datum['ipAddr']]= newDev
+      ipAddr= datum['ipAddr']
+      if ipAddr not in self.devList:
+        self.devList[ipAddr]= {'port':datum['port'],'hold':[],'coil':[],'holdPlan':[],'coilPlan':[],'proc':None}
+      device= self.devList[ipAddr]
+      if datum['type']=='coil' or datum['type']=='bool':
+        device['coil'].append(datum['register'])
+      else:
+        for i in range(self.words(datum)):
+          device['hold'].append(datum['register']+i)
       # generate internal data list
-      self.datList['{}{}'.format(datum['ipAddr'],datum['name'])]= {'register':datum['register'],'type':datum['type']}
+      self.datList['{}{}'.format(ipAddr,datum['name'])]= {'ipAddr':ipAddr,'register':datum['register'],'type':datum['type'],'pos':None}
     # generate subprocesses
+    sharedList= []
+    memList= []
+    statList= []
     for ipAddr,dev in self.devList.items():
-      arrLen= 0
       # parse ip address
       try:
         ipaddress.ip_address(ipAddr)
@@ -270,49 +439,118 @@ class MBScanner():
         dev['error']= 1
         continue
       ipArr= ipAddr.split(".")
-      # build shared array
-      if dev['holdStop']!=None:
-        arrLen= 1+dev['holdStop']-dev['holdStart']
-      if dev['coilStop']!=None:
-        arrLen= arrLen+1+dev['coilStop']-dev['coilStart']
-      data= Array('i',arrLen+Share.FIRSTDATA)
+      # plan the block reads
+      dev['holdPlan']= planBlocks(dev['hold'],HOLD_LIMIT,self.holdGap)
+      dev['coilPlan']= planBlocks(dev['coil'],COIL_LIMIT,self.coilGap)
+      blocks= dev['holdPlan']+dev['coilPlan']
+      # build shared array and data block
+      data= Array('i',Share.BLOCKS+3*len(blocks))
       dev['data']= data
+      memLen= 4+2*planCount(dev['holdPlan'])+planCount(dev['coilPlan'])
+      dev['mem']= SharedMemory(create=True,size=memLen)
       # load the array with needed values
       data[Share.SUBMSG]= 0
       data[Share.ERROR]=  0
+      data[Share.GOOD]=   -1
       for i in range(4):
         data[i+Share.IP1]= int(ipArr[i])
       data[Share.PORT]=  int(dev['port'])
-      if dev['holdStart']!=None:
-        data[Share.HOLDSTART]= dev['holdStart']
-        data[Share.HOLDSTOP]=  dev['holdStop']
-        data[Share.HOLDFIRST]= Share.FIRSTDATA
-        data[Share.HOLDCOUNT]= dev['holdStop']-dev['holdStart']+1
-      else:
-        data[Share.HOLDSTART]= -1
-        data[Share.HOLDSTOP]=  -1
-        data[Share.HOLDFIRST]= -1
-        data[Share.HOLDCOUNT]= 0
-      if dev['coilStart']!=None:
-        data[Share.COILSTART]= dev['coilStart']
-        data[Share.COILSTOP]=  dev['coilStop']
-        if dev['holdStart']!=None:
-          data[Share.COILFIRST]= Share.FIRSTDATA+(dev['holdStop']-dev['holdStart'])+1
-        else:
-          data[Share.COILFIRST]= Share.FIRSTDATA
-        data[Share.COILCOUNT]= dev['coilStop']-dev['coilStart']+1
-      else:
-        data[Share.COILSTART]= -1
-        data[Share.COILSTOP]=  -1
-        data[Share.COILFIRST]= -1
-        data[Share.COILCOUNT]=  0
+      data[Share.HOLDBLOCKS]= len(dev['holdPlan'])
+      data[Share.COILBLOCKS]= len(dev['coilPlan'])
       data[Share.SCANTIME]= int(scanInt)
+      first= 0
+      for i,block in enumerate(blocks):
+        if i==len(dev['holdPlan']): first= 0 # coils have their own view
+        data[Share.BLOCKS+i*3]=   block[0]
+        data[Share.BLOCKS+i*3+1]= block[1]
+        data[Share.BLOCKS+i*3+2]= first
+        first+= block[1]
+      dev['seqData'],dev['holdData'],dev['coilData']= memViews(dev['mem'],shareBlocks(data)[0])
+      dev['statMem']= None
+      dev['stats']=   None
+      if self.timing:
+        dev['statMem']= ScanStats.newStats()
+        dev['stats']=   ScanStats.ScanStats(dev['statMem'])
+      if self.engine=='async':
+        sharedList.append(data)
+        memList.append(dev['mem'])
+        statList.append(dev['statMem'])
+        continue
       # spawn the process
       print('    Starting subprocess for {}'.format(ipAddr))
-      dev['proc']= Process(target=scanSub,args=(data,))
+      dev['wake']= Event()
+      dev['proc']= Process(target=scanSub,args=(data,dev['mem'],dev['wake'],dev['statMem']))
       dev['proc'].start()
+    # locate each datum in its device array
+    for dat in self.datList.values():
+      dev= self.devList[dat['ipAddr']]
+      if 'data' not in dev: continue
+      holdBlocks,coilBlocks= shareBlocks(dev['data'])
+      blocks= holdBlocks
+      if dat['type']=='coil' or dat['type']=='bool': blocks= coilBlocks
+      for start,count,first in blocks:
+        if dat['register']>=start and dat['register']<start+count:
+          dat['pos']= first+dat['register']-start
+          break
+    if self.engine=='async':
+      # one subprocess runs the event loop for every device
+      print('    Starting async scanner for {:d} devices'.format(len(sharedList)))
+      wake= Event()
+      proc= Process(target=scanAsync,args=(sharedList,memList,wake,statList))
+      proc.start()
+      for ipAddr,dev in self.devList.items():
+        if 'data' in dev:
+          dev['proc']= proc
+          dev['wake']= wake
+      print('    1 subprocess started')
+      return
     print('    {:d} subprocesses started'.format(len(self.devList)))
 
+  # planned block reads for each device
+  def plan(self):
+    plans= {}
+    for ipAddr,dev in self.devList.items():
+      plans[ipAddr]= {'hold':dev['holdPlan'],'coil':dev['coilPlan']}
+    return plans
+
+  # processor time used by the scanner of each device
+  def cpuTime(self):
+    times= {}
+    for ipAddr,dev in self.devList.items():
+      if 'data' in dev: times[ipAddr]= dev['data'][Share.CPUTIME]/1000
+    return times
+
+  # scan timing of a device
+  def scanStats(self,ipAddr):
+    if ipAddr not in self.devList: return None
+    if self.devList[ipAddr].get('stats')==None: return None
+    return self.devList[ipAddr]['stats'].read()
+
+  # metrics of every device, only reads shared memory so an exporter thread
+  # never disturbs the GUI
+  def metrics(self):
+    devices= {}
+    for ipAddr,dev in list(self.devList.items()):
+      if 'data' not in dev: continue
+      shared= dev['data']
+      try:
+        stats= None
+        if dev.get('stats')!=None: stats= dev['stats'].read()
+      except ValueError: # released by close() meanwhile
+        continue
+      age= None
+      if shared[Share.GOOD]>=0: age= ((msStamp()-shared[Share.GOOD])&0x7fffffff)/1000
+      devices[ipAddr]= {'valid': int(shared[Share.ERROR]==0 and age!=None),
+                        'errors':{'com':shared[Share.ERRCOM],'read':shared[Share.ERRREAD]},
+                        'age':   age,
+                        'stats': stats}
+    return devices
+
+  def printPlan(self):
+    for ipAddr,dev in self.devList.items():
+      print('  {:15s} hold: {}'.format(ipAddr,planText(dev['holdPlan'])))
+      print('  {:15s} coil: {}'.format('',planText(dev['coilPlan'])))
+
   # get the latest value of a particular datum
   def get(self,ipAddr,name):
     debug= False
@@ -321,11 +559,14 @@ class MBScanner():
     if debug: print('Get {}...'.format(name))
     dat= '{}{}'.format(ipAddr,name)
     if dat in self.datList:
+      pos= self.datList[dat]['pos']
       reg= self.datList[dat]['register']
       typ= self.datList[dat]['type']
-      if ipAddr in self.devList:
+      if ipAddr in self.devList and 'data' in self.devList[ipAddr]:
         shared= self.devList[ipAddr]['data']
-        #self.printShared(shared)
+        holdData= self.devList[ipAddr]['holdData']
+        coilData= self.devList[ipAddr]['coilData']
+        #self.printShared(ipAddr)
         if shared[Share.ERROR]==1:
           if debug: print ('  Error! Unable to open {} for Modbus'.format(ipAddr))
           self.error= True
@@ -341,37 +582,44 @@ class MBScanner():
           self.error= True
           self.errText= 'Unknown error from {}'.format(ipAddr)
           return None
+        # copy the words of the datum, again if a scan was published meanwhile
+        if typ=='coil' or typ=='bool':
+          vals= self.seqCopy(self.devList[ipAddr]['seqData'],coilData,pos,1)
+        elif typ=='float' or typ=='long':
+          vals= self.seqCopy(self.devList[ipAddr]['seqData'],holdData,pos,2)
+        else:
+          vals= self.seqCopy(self.devList[ipAddr]['seqData'],holdData,pos,1)
+        if vals==None:
+          if debug: print ('  Error! No consistent data from {}'.format(ipAddr))
+          self.error= True
+          self.errText= 'No consistent data from {}'.format(ipAddr)
+          return None
         if typ=='float':
-          sharePos= reg+shared[Share.HOLDFIRST]-shared[Share.HOLDSTART]
-          val= [shared[sharePos],shared[sharePos+1]]
+          val= vals
           val= utils.word_list_to_long(val,big_endian=False)
           val= utils.decode_ieee(val[0])
-          if debug: print('  Float {:0.4f} at reg {:d} shared {:d} [{:d},{:d}]'.format(val,reg,sharePos,shared[sharePos],shared[sharePos+1]))
+          if debug: print('  Float {:0.4f} at reg {:d} shared {:d} [{:d},{:d}]'.format(val,reg,pos,vals[0],vals[1]))
           return val
         if typ=='hold' or typ=='uint':
-          sharePos= reg+shared[Share.HOLDFIRST]-shared[Share.HOLDSTART]
-          val= shared[sharePos]
-          if debug: print('  Hold {:d} at reg {:d} shared {:d} [{:d}]'.format(val,reg,sharePos,shared[sharePos]))
+          val= vals[0]
+          if debug: print('  Hold {:d} at reg {:d} shared {:d} [{:d}]'.format(val,reg,pos,vals[0]))
           return val
         if typ=='int':
-          sharePos= reg+shared[Share.HOLDFIRST]-shared[Share.HOLDSTART]
-          val= shared[sharePos]
+          val= vals[0]
           if (val>>15) & 1:
             val= val-65536
-          if debug: print('  Hold {:d} at reg {:d} shared {:d} [{:d}]'.format(val,reg,sharePos,shared[sharePos]))
+          if debug: print('  Hold {:d} at reg {:d} shared {:d} [{:d}]'.format(val,reg,pos,vals[0]))
           return val
         if typ=='long':
-          sharePos= reg+shared[Share.HOLDFIRST]-shared[Share.HOLDSTART]
-          valL= shared[sharePos]
-          valH= shared[sharePos+1]
+          valL= vals[0]
+          valH= vals[1]
           val= valL+valH*65536
-          if debug: print('  Long {:d} at reg {:d} shared {:d} [{:d},{:d}]'.format(val,reg,sharePos,shared[sharePos],shared[sharePos+1]))
+          if debug: print('  Long {:d} at reg {:d} shared {:d} [{:d},{:d}]'.format(val,reg,pos,vals[0],vals[1]))
           return val
         if typ=='coil' or typ=='bool':
-          sharePos= reg+shared[Share.COILFIRST]-shared[Share.COILSTART]
-          if shared[sharePos]: val= True
+          if vals[0]: val= True
           else: val= False
-          if debug: print('  Coil {} at reg {:d} shared {:d} [{}]'.format(val,reg,sharePos,shared[sharePos]))
+          if debug: print('  Coil {} at reg {:d} shared {:d} [{}]'.format(val,reg,pos,vals[0]))
           return val
         else:
           self.error= True
@@ -388,34 +636,70 @@ class MBScanner():
       self.errText= 'No such datum {}'.format(dat)
       if debug: print ('  Error! No such datum {}'.format(dat))
       return None
-      
+
+  # copy count values from a data view, retried while a scan is published
+  def seqCopy(self,seqData,data,pos,count):
+    for i in range(self.snapTries):
+      seq= seqData[0]
+      if seq&1: continue
+      vals= data[pos:pos+count].tolist()
+      if seqData[0]==seq: return vals
+    return None
+
+  # consistent copy of all data of a device, values in block table order
+  def snapshot(self,ipAddr):
+    if ipAddr not in self.devList or 'mem' not in self.devList[ipAddr]: return None
+    dev= self.devList[ipAddr]
+    for i in range(self.snapTries):
+      seq= dev['seqData'][0]
+      if seq&1: continue
+      hold= dev['holdData'].tolist()
+      coil= dev['coilData'].tolist()
+      if dev['seqData'][0]==seq: return {'seq':seq,'hold':hold,'coil':coil}
+    return None
+
   # print shared memory report
-  def printShared(self,shared):
+  def printShared(self,ipAddr):
+    shared= self.devList[ipAddr]['data']
+    holdData= self.devList[ipAddr]['holdData']
+    coilData= self.devList[ipAddr]['coilData']
     print('  IP Addr: {:d}.{:d}.{:d}.{:d}'.format(shared[Share.IP1],shared[Share.IP2],shared[Share.IP3],shared[Share.IP4]))
     print('  Port:    {:d}'.format(shared[Share.PORT]))
     print('  Scan:    {:d}s'.format(shared[Share.SCANTIME]))
     print('  Message: {:d}'.format(shared[Share.SUBMSG]))
     print('  Error:   {:d}'.format(shared[Share.ERROR]))
-    if shared[Share.HOLDCOUNT]>0:
-      print('  Hold:    {:d} registers {:d} to {:d} starting at shared {:d}'.format(shared[Share.HOLDCOUNT],shared[Share.HOLDSTART],shared[Share.HOLDSTOP],shared[Share.HOLDFIRST]))
-      for i in range(shared[Share.HOLDCOUNT]):
-        print('    {:2d}[{:02d}]: {:5d}'.format(i+shared[Share.HOLDSTART],i+shared[Share.HOLDFIRST],shared[i+shared[Share.HOLDFIRST]]))
-    else:
-      print('  No holding regs')
-    if shared[Share.COILCOUNT]>0:
-      print('  Coil:    {:d} coils {:d} to {:d} starting at shared {:d}'.format(shared[Share.COILCOUNT],shared[Share.COILSTART],shared[Share.COILSTOP],shared[Share.COILFIRST]))
-      for i in range(shared[Share.COILCOUNT]):
-        print('    {:2d}[{:02d}]: {}'.format(i+shared[Share.COILSTART],i+shared[Share.COILFIRST],shared[i+shared[Share.COILFIRST]]))
-    else:
-      print('  No coils')
+    holdBlocks,coilBlocks= shareBlocks(shared)
+    if len(holdBlocks)==0: print('  No holding regs')
+    for start,count,first in holdBlocks:
+      print('  Hold:    {:d} registers {:d} to {:d} starting at shared {:d}'.format(count,start,start+count-1,first))
+      for i in range(count):
+        print('    {:2d}[{:02d}]: {:5d}'.format(i+start,i+first,holdData[i+first]))
+    if len(coilBlocks)==0: print('  No coils')
+    for start,count,first in coilBlocks:
+      print('  Coil:    {:d} coils {:d} to {:d} starting at shared {:d}'.format(count,start,start+count-1,first))
+      for i in range(count):
+        print('    {:2d}[{:02d}]: {}'.format(i+start,i+first,coilData[i+first]))
 
   # close all subprocesses
   def close(self):
     print('  Terminating all subprocesses..')
     for ip,dev in self.devList.items():
-      dev['data'][Share.SUBMSG]= -1 #send poison pill
+      if 'data' in dev: dev['data'][Share.SUBMSG]= -1 #send poison pill
+    for ip,dev in self.devList.items():
+      if 'wake' in dev: dev['wake'].set()
+    for ip,dev in self.devList.items():
+      if dev['proc']!=None: dev['proc'].join()
     for ip,dev in self.devList.items():
-      dev['proc'].join()
+      if 'mem' in dev:
+        dev['seqData'].release()
+        dev['holdData'].release()
+        dev['coilData'].release()
+        dev['mem'].close()
+        dev['mem'].unlink()
+      if dev.get('stats')!=None:
+        dev['stats'].release()
+        dev['statMem'].close()
+        dev['statMem'].unlink()
     print('    {:d} subprocesses terminated!'.format(len(self.devList)))
 
 #- test -----------------------------------------------------------------------
@@ -0,0 +1,184 @@
+#------------------------------------------------------------------------------
+#  Prometheus Exporter
+#
+#  - Scanner metrics in the Prometheus text format served over HTTP from a
+#    background thread
+#
+#  External notes...
+#  - server= MetricsServer(collect,host,port) answers GET /metrics with the
+#    text collect() returns, collect is called on the server thread
+#  - server.start() binds and serves from a daemon thread, raises OSError
+#    when the address is unavailable, server.stop() ends it
+#  - parseAddress(text) (host,port) from a '[host:]port' setting, the host
+#    defaults to 127.0.0.1, raises ValueError
+#  - scanText(prefix,devices,names) the metrics of a scanner as text,
+#    devices is the metrics() dict of SymbCtrlScan or MBScan keyed by IP
+#    address, names an optional dict of device names by IP address
+#      {<ipAddr>:{'valid','health','errors':{<type>:count},'age','queue',
+#                 'stats':<ScanStats.read() or None>}}
+#    keys a scanner does not have are left out, so are their metrics
+#  - metrics, labelled by device and name, times in seconds
+#      <prefix>_scans_total                  scans attempted
+#      <prefix>_scan_failures_total          scans that failed
+#      <prefix>_scan_retries_total           scans following a failed one
+#      <prefix>_errors_total{type}           errors by type, com, read,
+#                                            write and full
+#      <prefix>_data_valid                   1 while the data is current
+#      <prefix>_health_state                 0 closed, 1 open, 2 half-open
+#      <prefix>_last_good_scan_age_seconds   time since the last good scan
+#      <prefix>_rtt_seconds{quantile}        read transaction round trip,
+#                                            quantiles 0.5, 0.95 and 0.99
+#      <prefix>_scan_duration_seconds{quantile} whole scan time
+#      <prefix>_write_queue_depth            writes queued, not yet sent
+#
+#  Internal notes...
+#  - the server thread only reads shared memory, it takes no lock the Tk
+#    loop or a scanner holds for longer than one word
+#  - scans, failures, retries, rtt and durations come from ScanStats, the
+#    scanner must be started with timing on
+#  - quantiles are the upper edge of the ScanStats histogram bucket, within
+#    a factor of two, over the recent scans the rolling histogram holds,
+#    _sum and _count cover every scan
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import ScanStats
+
+#-- constants -----------------------------------------------------------------
+CONTENT=   'text/plain; version=0.0.4; charset=utf-8'
+QUANTILES= [0.5,0.95,0.99]
+
+def parseAddress(text,host='127.0.0.1'):
+  text= str(text).strip()
+  addr,sep,port= text.rpartition(':')
+  if sep!='': host= addr
+  try:
+    port= int(port)
+  except ValueError:
+    raise ValueError('Invalid metrics address {}'.format(text))
+  if port<1 or port>65535:
+    raise ValueError('Invalid metrics port {:d}'.format(port))
+  return host,port
+
+#-- text format ---------------------------------------------------------------
+
+def labelText(labels):
+  items= []
+  for key,value in labels.items():
+    value= str(value).replace('\\','\\\\').replace('"','\\"').replace('\n','\\n')
+    items.append('{}="{}"'.format(key,value))
+  return '{'+','.join(items)+'}'
+
+def family(lines,name,kind,text,samples):
+  if len(samples)==0: return
+  lines.append('# HELP {} {}'.format(name,text))
+  lines.append('# TYPE {} {}'.format(name,kind))
+  for suffix,labels,value in samples:
+    if not isinstance(value,int): value= repr(float(value))
+    lines.append('{}{}{} {}'.format(name,suffix,labelText(labels),value))
+
+# quantiles, sum and count of phases merged, no samples if never timed
+def summary(labels,phases):
+  phases= [phase for phase in phases if phase!=None]
+  if len(phases)==0: return []
+  hist= [sum(counts) for counts in zip(*[phase['hist'] for phase in phases])]
+  count= sum(phase['count'] for phase in phases)
+  total= sum(phase['mean']*phase['count'] for phase in phases)/1000
+  samples= []
+  for q in QUANTILES:
+    samples.append(('',dict(labels,quantile=str(q)),ScanStats.percentile(hist,q)/1000000))
+  samples.append(('_sum',labels,total))
+  samples.append(('_count',labels,count))
+  return samples
+
+def scanText(prefix,devices,names={}):
+  counters= {'scans':[],'failures':[],'retries':[],'errors':[]}
+  gauges=   {'valid':[],'health':[],'age':[],'queue':[]}
+  rtt=      []
+  scan=     []
+  for ipAddr,dev in sorted(devices.items()):
+    labels= {'device':ipAddr,'name':names.get(ipAddr,'')}
+    stats= dev.get('stats')
+    if stats!=None:
+      for key in ['scans','failures','retries']:
+        counters[key].append(('',labels,stats[key]))
+      phases= stats['phases']
+      rtt+=  summary(labels,[phases.get('coils'),phases.get('hold')])
+      scan+= summary(labels,[phases.get('scan')])
+    for kind,count in dev.get('errors',{}).items():
+      counters['errors'].append(('',dict(labels,type=kind),count))
+    for key in gauges:
+      if dev.get(key)!=None: gauges[key].append(('',labels,dev[key]))
+  lines= []
+  family(lines,prefix+'_scans_total','counter','Scans attempted.',counters['scans'])
+  family(lines,prefix+'_scan_failures_total','counter','Scans that failed.',counters['failures'])
+  family(lines,prefix+'_scan_retries_total','counter','Scans following a failed scan.',counters['retries'])
+  family(lines,prefix+'_errors_total','counter','Errors by type.',counters['errors'])
+  family(lines,prefix+'_data_valid','gauge','1 while the device data is current.',gauges['valid'])
+  family(lines,prefix+'_health_state','gauge','Circuit state, 0 closed, 1 open, 2 half-open.',gauges['health'])
+  family(lines,prefix+'_last_good_scan_age_seconds','gauge','Time since the last good scan.',gauges['age'])
+  family(lines,prefix+'_rtt_seconds','summary','Read transaction round trip time.',rtt)
+  family(lines,prefix+'_scan_duration_seconds','summary','Whole scan time.',scan)
+  family(lines,prefix+'_write_queue_depth','gauge','Writes queued and not yet sent.',gauges['queue'])
+  return '\n'.join(lines)+'\n'
+
+#------------------------------------------------------------------------------
+#  MetricsServer Class
+#
+#  - HTTP server for the metrics text on a daemon thread
+#
+#------------------------------------------------------------------------------
+class MetricsHandler(BaseHTTPRequestHandler):
+
+  def do_GET(self):
+    if self.path.split('?')[0]!='/metrics':
+      self.send_error(404)
+      return
+    try:
+      body= self.server.collect().encode('utf-8')
+    except Exception as err:
+      self.send_error(500,str(err))
+      return
+    self.send_response(200)
+    self.send_header('Content-Type',CONTENT)
+    self.send_header('Content-Length',str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self,format,*args):
+    pass
+
+class MetricsServer():
+
+  def __init__(self,collect,host='127.0.0.1',port=9108):
+    self.collect= collect
+    self.host=    host
+    self.port=    port
+    self.server=  None
+    self.thread=  None
+
+  def start(self):
+    self.server= ThreadingHTTPServer((self.host,self.port),MetricsHandler)
+    self.server.daemon_threads= True
+    self.server.collect= self.collect
+    self.port= self.server.server_address[1]
+    self.thread= threading.Thread(target=self.server.serve_forever,daemon=True)
+    self.thread.start()
+
+  def stop(self):
+    if self.server==None: return
+    self.server.shutdown()
+    self.server.server_close()
+    self.server= None
+    self.thread= None
+
+#-- end PromExport ------------------------------------------------------------
@@ -0,0 +1,156 @@
+#------------------------------------------------------------------------------
+#  Scan Statistics
+#
+#  - Per phase timing of a scanner loop kept in shared memory, written by the
+#    scanning subprocess and read by the application
+#
+#  External notes...
+#  - mem= newStats() creates the shared memory block for one device, the
+#    owner closes and unlinks it after release()
+#  - stats= ScanStats(mem) views of a block, the scanner and the reader each
+#    make their own
+#  - stats.begin(retry) starts a scan, counts it and counts it as a retry
+#    when the scan before it failed
+#  - stats.lap(phase) records the time since begin(), mark() or the last lap
+#    into phase and restarts the timing, stats.mark() restarts it only
+#  - stats.end(failed) records the whole scan, counts it as failed if so
+#  - stats.read() copy of the statistics as a dict
+#      {'scans','failures','retries',
+#       'phases':{<name>:{'count','last','min','max','mean','p95','hist'}}}
+#    times in ms, p95 is the upper edge of the bucket holding the 95th
+#    percentile, hist the bucket counts, phases never timed are left out
+#  - stats.release() drops the views
+#  - phases
+#      CONNECT  device.open()
+#      COILS    each coil read transaction
+#      HOLD     each holding register read transaction
+#      DECODE   decoding the scan into values, SymbCtrlScan only
+#      PUBLISH  storing the scan in shared memory
+#      SCAN     the whole scan
+#
+#  Internal notes...
+#  - the block is unsigned 64bit words, the counters then for each phase
+#    count, last, min, max, total and BUCKETS histogram buckets, times in us
+#  - bucket n counts times from 2^n to 2^(n+1) us, bucket 0 everything below
+#    2us and the last everything above
+#  - histograms roll, every ROLL samples of a phase its buckets are halved so
+#    old scans fade out, count, min, max and mean cover every scan
+#  - only the scanner writes, a reader may see a sample half recorded, the
+#    numbers are for display
+#  - scanners keep None in place of a ScanStats when timing is off and test
+#    for it before each call, timing then costs nothing
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+#-- constants -----------------------------------------------------------------
+CONNECT,COILS,HOLD,DECODE,PUBLISH,SCAN= range(6)
+PHASES=   ['connect','coils','hold','decode','publish','scan']
+SCANS,FAILURES,RETRIES= range(3)
+COUNTERS= ['scans','failures','retries']
+BUCKETS=  24     # histogram buckets, the last starts at 8.4s
+ROLL=     512    # samples of a phase between halving its histogram
+
+# phase layout
+P_COUNT=  0
+P_LAST=   1
+P_MIN=    2
+P_MAX=    3
+P_TOTAL=  4
+P_HIST=   5
+P_SIZE=   P_HIST+BUCKETS
+
+STATS_WORDS= len(COUNTERS)+len(PHASES)*P_SIZE
+STATS_BYTES= STATS_WORDS*8
+
+def newStats():
+  mem= SharedMemory(create=True,size=STATS_BYTES)
+  mem.buf[:STATS_BYTES]= bytes(STATS_BYTES)
+  return mem
+
+# upper edge in us of the bucket holding fraction p of the samples
+def percentile(hist,p):
+  total= sum(hist)
+  if total==0: return 0
+  run= 0
+  for n,count in enumerate(hist):
+    run+= count
+    if run>=p*total: return 2**(n+1)
+  return 2**len(hist)
+
+#------------------------------------------------------------------------------
+#  ScanStats Class
+#
+#  - views of one statistics block
+#
+#------------------------------------------------------------------------------
+class ScanStats():
+
+  def __init__(self,mem):
+    self.words= mem.buf[:STATS_BYTES].cast('Q')
+    self.first= time.perf_counter()
+    self.start= self.first
+
+  def begin(self,retry=False):
+    self.words[SCANS]+= 1
+    if retry: self.words[RETRIES]+= 1
+    self.first= time.perf_counter()
+    self.start= self.first
+
+  def mark(self):
+    self.start= time.perf_counter()
+
+  def lap(self,phase):
+    now= time.perf_counter()
+    self.record(phase,now-self.start)
+    self.start= now
+
+  def end(self,failed=False):
+    if failed: self.words[FAILURES]+= 1
+    self.record(SCAN,time.perf_counter()-self.first)
+
+  def record(self,phase,seconds):
+    us= int(seconds*1000000)
+    words= self.words
+    base= len(COUNTERS)+phase*P_SIZE
+    count= words[base+P_COUNT]+1
+    words[base+P_LAST]= us
+    if count==1 or us<words[base+P_MIN]: words[base+P_MIN]= us
+    if us>words[base+P_MAX]: words[base+P_MAX]= us
+    words[base+P_TOTAL]+= us
+    words[base+P_COUNT]= count
+    if count%ROLL==0:
+      for n in range(base+P_HIST,base+P_SIZE): words[n]>>= 1
+    words[base+P_HIST+min(BUCKETS-1,max(0,us.bit_length()-1))]+= 1
+
+  def read(self):
+    words= self.words.tolist()
+    stats= {name:words[n] for n,name in enumerate(COUNTERS)}
+    stats['phases']= {}
+    for phase,name in enumerate(PHASES):
+      base= len(COUNTERS)+phase*P_SIZE
+      count= words[base+P_COUNT]
+      if count==0: continue
+      hist= words[base+P_HIST:base+P_SIZE]
+      stats['phases'][name]= {'count':count,
+                              'last': words[base+P_LAST]/1000,
+                              'min':  words[base+P_MIN]/1000,
+                              'max':  words[base+P_MAX]/1000,
+                              'mean': words[base+P_TOTAL]/count/1000,
+                              'p95':  percentile(hist,0.95)/1000,
+                              'hist': hist}
+    return stats
+
+  def release(self):
+    self.words.release()
+
+#-- end ScanStats -------------------------------------------------------------
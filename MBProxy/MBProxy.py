@@ -0,0 +1,275 @@
+#------------------------------------------------------------------------------
+#  MBProxy
+#
+#  - Local Modbus proxy, one connection and one scanner per controller shared
+#    by every desktop tool on the workstation
+#
+#  External notes...
+#  - python MBProxy.py [-c configuration.xml], Ctrl-C stops the proxy
+#  - each controller in the configuration is served on its own listen
+#    address, usually a loopback address such as 127.0.1.1:502, and
+#    optionally a Unix socket, tools are pointed at that address in place
+#    of the controller
+#  - holding registers 0 to holdSize-1 and coils 0 to coilSize-1 are read
+#    by the scanner every scan seconds and reads within them are answered
+#    from the cache, a read waits for the next scan when the cache is older
+#    than fresh seconds
+#  - reads outside the cache and all writes are forwarded one at a time on
+#    the same connection, a write within the cache marks it stale, reads
+#    then wait for a scan after the write, the firmware ignores writes to
+#    read only registers so the value written may not be the one read back
+#  - a controller that does not answer is backed off by CtrlHealth, reads
+#    then answer with exception 11, gateway target failed, device
+#    exceptions are passed back to the tool unchanged
+#  - request counts are printed every stats seconds
+#
+#  Internal notes...
+#  - the scanner and forwarded requests share one asyncio lock per
+#    controller, so the controller sees at most one transaction at a time
+#    and its request rate is set by the scan time however many tools are
+#    connected
+#  - each scan replaces an asyncio Event that readers waiting for fresh
+#    data hold on to, a reader gives up with exception 11 when no scan ends
+#    within scan+fresh+timeout seconds
+#  - a scan that raises counts as a controller failure, the scanner goes on
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026 v0.1
+# - initial version
+# - scan errors no longer end the scanner, reads waiting for a scan time
+#   out, writes mark the cache stale instead of updating it
+#
+#------------------------------------------------------------------------------
+verStr= 'MBProxy v0.1'
+
+#-- constants -----------------------------------------------------------------
+cfgFileName= 'configuration.xml'
+cfgFilePath= 'cfg'
+libFilePath= 'lib'
+blockSize=   100    # most holding registers in one scan read
+
+#-- library -------------------------------------------------------------------
+import sys
+import os
+import time
+import asyncio
+import argparse
+import xml.etree.ElementTree as xml
+
+sys.path.append(libFilePath)
+from MBAsync import AsyncClient
+from MBServer import MBServer,MBError,EX_ADDRESS,EX_GATEWAY
+import CtrlHealth
+
+#-- configuration -------------------------------------------------------------
+
+settings= {'scan':1.0,'fresh':2.0,'timeout':2.0,'stats':60.0,'holdSize':300,'coilSize':70}
+
+# (settings,ctrls), raises ValueError on a bad file
+def loadConfig(path):
+  try:
+    root= xml.parse(path).getroot()
+  except (OSError,xml.ParseError) as err:
+    raise ValueError('Unable to load configuration file {}, {}'.format(path,err))
+  setup= dict(settings)
+  ctrls= []
+  for item in root:
+    if item.tag in setup:
+      try:
+        setup[item.tag]= type(setup[item.tag])(item.text)
+      except (TypeError,ValueError):
+        raise ValueError('Invalid {} setting {}'.format(item.tag,item.text))
+    if item.tag=='ctrl':
+      new= {'name':item.attrib.get('name','?'),'port':'502','unix':None}
+      for entry in item:
+        new[entry.tag]= entry.text
+      if 'address' not in new or 'listen' not in new:
+        raise ValueError('Controller {} needs an address and a listen address'.format(new['name']))
+      host,sep,port= new['listen'].rpartition(':')
+      if sep=='': host,port= new['listen'],'502'
+      try:
+        new['port']=   int(new['port'])
+        new['listen']= (host,int(port))
+      except ValueError:
+        raise ValueError('Invalid port for controller {}'.format(new['name']))
+      ctrls.append(new)
+  if len(ctrls)==0:
+    raise ValueError('No controllers in {}'.format(path))
+  return setup,ctrls
+
+#------------------------------------------------------------------------------
+#  Upstream Class
+#
+#  - one controller, its connection, scanner and cache, the request handler
+#    of the MBServer listening for it
+#
+#------------------------------------------------------------------------------
+class Upstream():
+
+  def __init__(self,ctrl,setup):
+    self.name=     ctrl['name']
+    self.setup=    setup
+    self.client=   AsyncClient(ctrl['address'],ctrl['port'],1,setup['timeout'])
+    self.health=   CtrlHealth.tracker('{}:{}'.format(ctrl['address'],ctrl['port']))
+    self.lock=     asyncio.Lock()
+    self.scanned=  asyncio.Event()
+    self.hold=     [0]*setup['holdSize']
+    self.coil=     [False]*setup['coilSize']
+    self.stamp=    None     # loop time of the last good scan
+    self.down=     False
+    self.hits=     0        # reads answered from the cache
+    self.upstream= 0        # transactions with the controller
+
+  # one transaction with the controller, caller holds the lock
+  async def call(self,func,*args):
+    self.client.exception= 0
+    if not self.client.isOpen():
+      self.client.timeout= self.health.timeout(self.setup['timeout'])
+      ok= await self.client.open()
+      self.client.timeout= self.setup['timeout']
+      if not ok: return None
+    self.upstream+= 1
+    return await func(*args)
+
+  async def scan(self):
+    loop= asyncio.get_running_loop()
+    while True:
+      begin= loop.time()
+      if self.health.allow():
+        coil= None
+        try:
+          async with self.lock:
+            hold= []
+            for addr in range(0,self.setup['holdSize'],blockSize):
+              values= await self.call(self.client.readHold,addr,min(blockSize,self.setup['holdSize']-addr))
+              if values==None: break
+              hold+= values
+            if len(hold)==self.setup['holdSize']:
+              coil= await self.call(self.client.readCoils,0,self.setup['coilSize'])
+        except Exception as err: # a failed scan must not end the scanner
+          print('  {} scan failed, {}'.format(self.name,err))
+          coil= None
+        if coil!=None:
+          self.hold=  hold
+          self.coil=  coil
+          self.stamp= loop.time()
+          self.down=  False
+          self.health.success()
+        else:
+          self.down= True
+          self.health.failure()
+          await self.client.close()
+      else:
+        self.down= True
+      # release the readers waiting on this scan
+      self.scanned.set()
+      self.scanned= asyncio.Event()
+      await asyncio.sleep(max(0,self.setup['scan']-(loop.time()-begin)))
+
+  # wait for a cache no older than fresh
+  async def fresh(self):
+    loop= asyncio.get_running_loop()
+    limit= self.setup['scan']+self.setup['fresh']+self.setup['timeout']
+    while self.stamp==None or loop.time()-self.stamp>self.setup['fresh']:
+      if self.down: raise MBError(EX_GATEWAY)
+      try:
+        await asyncio.wait_for(self.scanned.wait(),limit)
+      except asyncio.TimeoutError:
+        raise MBError(EX_GATEWAY)
+
+  # forward a request, raises MBError with the device exception
+  async def forward(self,func,*args):
+    if not self.health.allow(): raise MBError(EX_GATEWAY)
+    async with self.lock:
+      result= await self.call(func,*args)
+    if result==None or result==False:
+      if self.client.exception!=0:
+        self.health.success()
+        raise MBError(self.client.exception)
+      self.health.failure()
+      raise MBError(EX_GATEWAY)
+    self.health.success()
+    return result
+
+  #-- MBServer handler --
+
+  async def readHold(self,addr,count):
+    if addr+count>self.setup['holdSize']:
+      return await self.forward(self.client.readHold,addr,count)
+    await self.fresh()
+    self.hits+= 1
+    return self.hold[addr:addr+count]
+
+  async def readCoils(self,addr,count):
+    if addr+count>self.setup['coilSize']:
+      return await self.forward(self.client.readCoils,addr,count)
+    await self.fresh()
+    self.hits+= 1
+    return self.coil[addr:addr+count]
+
+  async def writeHold(self,addr,values):
+    if addr+len(values)>0x10000: raise MBError(EX_ADDRESS)
+    await self.forward(self.client.writeHold,addr,values)
+    if addr<len(self.hold): self.stamp= None # read back after the next scan
+    return True
+
+  async def writeCoils(self,addr,bits):
+    if addr+len(bits)>0x10000: raise MBError(EX_ADDRESS)
+    await self.forward(self.client.writeCoils,addr,bits)
+    if addr<len(self.coil): self.stamp= None # read back after the next scan
+    return True
+
+#-- main ----------------------------------------------------------------------
+
+async def serve(setup,ctrls):
+  proxies= []
+  tasks=   []
+  for ctrl in ctrls:
+    upstream= Upstream(ctrl,setup)
+    server= MBServer(upstream)
+    await server.listen(*ctrl['listen'])
+    if ctrl['unix']!=None:
+      await server.listenUnix(ctrl['unix'])
+    proxies.append((upstream,server))
+    tasks.append(asyncio.create_task(upstream.scan()))
+    print('  {:20s} {}:{:d} on {}:{:d}'.format(ctrl['name'],ctrl['address'],ctrl['port'],*ctrl['listen']))
+  try:
+    while True:
+      await asyncio.sleep(setup['stats'])
+      print(time.strftime('%d%b%Y %H:%M:%S'))
+      for upstream,server in proxies:
+        print('  {:20s} {:8d} requests {:8d} cache hits {:8d} upstream {}'.format(
+          upstream.name,server.requests,upstream.hits,upstream.upstream,upstream.health.state))
+  finally:
+    for task in tasks:
+      task.cancel()
+    for upstream,server in proxies:
+      server.close()
+      await upstream.client.close()
+
+def main():
+  parser= argparse.ArgumentParser(description=verStr)
+  parser.add_argument('-c','--config',default=os.path.join(cfgFilePath,cfgFileName),help='configuration file')
+  args= parser.parse_args()
+  print(verStr)
+  try:
+    setup,ctrls= loadConfig(args.config)
+  except ValueError as err:
+    print(err)
+    return 3
+  CtrlHealth.setReport(print)
+  try:
+    asyncio.run(serve(setup,ctrls))
+  except OSError as err:
+    print('Unable to listen, {}'.format(err))
+    return 1
+  except KeyboardInterrupt:
+    print('Stopped')
+  return 0
+
+if __name__=='__main__':
+  sys.exit(main())
+
+#-- end MBProxy ---------------------------------------------------------------
@@ -0,0 +1,143 @@
+#------------------------------------------------------------------------------
+#  ModbusTCP asyncio Server
+#
+#  - Minimal ModbusTCP server built on asyncio streams, serves any number of
+#    clients from one event loop
+#
+#  External notes...
+#  - server= MBServer(handler) creates the server, handler supplies the data
+#  - await server.listen(host,port) accepts ModbusTCP connections
+#  - await server.listenUnix(path) accepts the same framing on a Unix socket
+#  - server.close() stops accepting and closes open connections
+#  - the handler implements four coroutines, each returns the values read
+#    or True when written, or raises MBError with the exception code
+#      readHold(addr,count)     readCoils(addr,count)
+#      writeHold(addr,values)   writeCoils(addr,bits)
+#  - functions served
+#      1, 2    read coils, discrete inputs are read as coils
+#      3, 4    read holding registers, input registers are read as holding
+#      5, 15   write single and multiple coils
+#      6, 16   write single and multiple holding registers
+#    others answer with exception 1, illegal function
+#  - server.requests  count of requests served
+#
+#  Internal notes...
+#  - requests on one connection are answered in order, each connection is
+#    its own task so a slow request only holds up its own client
+#  - the unit id and transaction id are echoed back
+#  - a cancelled connection task ends quietly, connections are leaves with
+#    nothing awaiting them
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import asyncio
+import struct
+
+#-- constants -----------------------------------------------------------------
+EX_FUNCTION= 1      # illegal function
+EX_ADDRESS=  2      # illegal data address
+EX_VALUE=    3      # illegal data value
+EX_FAILURE=  4      # server device failure
+EX_GATEWAY=  11     # gateway target device failed to respond
+
+MAX_HOLD=    125    # most registers in one read
+MAX_COILS=   2000   # most coils in one read
+
+class MBError(Exception):
+  def __init__(self,code):
+    Exception.__init__(self,'Modbus exception {:d}'.format(code))
+    self.code= code
+
+#-- server class --------------------------------------------------------------
+
+class MBServer():
+
+  def __init__(self,handler):
+    self.handler=  handler
+    self.servers=  []
+    self.writers=  set()
+    self.requests= 0
+
+  async def listen(self,host,port):
+    self.servers.append(await asyncio.start_server(self.serve,host,port))
+
+  async def listenUnix(self,path):
+    self.servers.append(await asyncio.start_unix_server(self.serve,path))
+
+  def close(self):
+    for server in self.servers:
+      server.close()
+    self.servers= []
+    for writer in self.writers:
+      writer.close()
+
+  async def serve(self,reader,writer):
+    self.writers.add(writer)
+    try:
+      while True:
+        head= await reader.readexactly(7)
+        tid,pid,length,unit= struct.unpack('>HHHB',head)
+        if length<2 or length>254: break
+        pdu= await reader.readexactly(length-1)
+        if pid!=0: continue
+        resp= await self.dispatch(pdu)
+        self.requests+= 1
+        writer.write(struct.pack('>HHHB',tid,0,len(resp)+1,unit)+resp)
+        await writer.drain()
+    except (OSError,asyncio.IncompleteReadError,asyncio.CancelledError):
+      pass
+    finally:
+      self.writers.discard(writer)
+      writer.close()
+
+  # one request PDU to its response PDU
+  async def dispatch(self,pdu):
+    func= pdu[0]
+    try:
+      if func in (1,2,3,4):
+        if len(pdu)!=5: raise MBError(EX_VALUE)
+        addr,count= struct.unpack('>HH',pdu[1:5])
+        if func in (1,2):
+          if count<1 or count>MAX_COILS: raise MBError(EX_VALUE)
+          bits= await self.handler.readCoils(addr,count)
+          packed= bytearray((count+7)//8)
+          for i,bit in enumerate(bits):
+            if bit: packed[i>>3]|= 1<<(i&7)
+          return bytes([func,len(packed)])+bytes(packed)
+        if count<1 or count>MAX_HOLD: raise MBError(EX_VALUE)
+        words= await self.handler.readHold(addr,count)
+        return struct.pack('>BB{:d}H'.format(count),func,count*2,*words)
+      if func==5:
+        addr,value= struct.unpack('>HH',pdu[1:5])
+        if value not in (0x0000,0xFF00): raise MBError(EX_VALUE)
+        await self.handler.writeCoils(addr,[value==0xFF00])
+        return pdu[:5]
+      if func==6:
+        addr,value= struct.unpack('>HH',pdu[1:5])
+        await self.handler.writeHold(addr,[value])
+        return pdu[:5]
+      if func==15:
+        addr,count,size= struct.unpack('>HHB',pdu[1:6])
+        if count<1 or size!=(count+7)//8 or len(pdu)!=6+size: raise MBError(EX_VALUE)
+        bits= [bool((pdu[6+(i>>3)]>>(i&7))&1) for i in range(count)]
+        await self.handler.writeCoils(addr,bits)
+        return pdu[:5]
+      if func==16:
+        addr,count,size= struct.unpack('>HHB',pdu[1:6])
+        if count<1 or size!=count*2 or len(pdu)!=6+size: raise MBError(EX_VALUE)
+        await self.handler.writeHold(addr,list(struct.unpack('>{:d}H'.format(count),pdu[6:6+size])))
+        return pdu[:5]
+      raise MBError(EX_FUNCTION)
+    except MBError as err:
+      return bytes([func|0x80,err.code])
+    except struct.error:
+      return bytes([func|0x80,EX_VALUE])
+
+#-- end MBServer --------------------------------------------------------------
@@ -13,6 +13,22 @@
 # 17Apr2025 A. Cooper v0.3
 # - removed counter enable and timer enable bits, never used
 # - now performs multiple tries to read a controller's data
+# 17Oct2026
+# - retries wait out the controller backoff and stop once its circuit is
+#   open, a dead unit no longer costs five timeouts on every scan
+# - controller health changes are reported in the event log
+# - units are audited in parallel by a pool of up to <workers> threads, each
+#   with its own controller, results stream to the event log and the report
+#   keeps configuration order, the GUI stays live during a scan
+# - reference files are compiled into raw register masks when loaded, a unit
+#   is checked with a masked comparison of its register blocks and only the
+#   registers that differ are decoded for the report
+# - added batch mode, 'python SyCheck.py --batch' audits every unit without
+#   a display and writes JSON and CSV reports, see batch()
+# - added remediation, the registers that differ are written back to the
+#   reference in as few block writes as possible and verified with one read,
+#   a rollback snapshot is saved first, batch mode has --fix, --dry-run and
+#   --rollback, the GUI a Fix option
 #
 #------------------------------------------------------------------------------
 verStr= 'SyCheck v0.3'
@@ -35,7 +51,12 @@ import string
 import sys
 import os
 import time
+import json
+import csv
+import argparse
+import queue
 import urllib.request
+import concurrent.futures
 import datetime as     dt
 import tkinter  as     tk
 from   tkinter  import ttk, messagebox, filedialog
@@ -53,86 +74,41 @@ sys.path.append(libPath)
 
 #-- local libraries -----------------------------------------------------------
 import symbCtrlModbus
+import CtrlHealth
+from RefMask import RefMask
 
 #------------------------------------------------------------------------------
-#  SyCheck GUI
+#  SyCheck Audit
 #
-#  - setup the GUI
+#  - configuration, references and the audit of one unit, no GUI so it is
+#    shared by the Tk application and batch mode
 #
-#  23Oct2024 A. Cooper
-#  - initial version
+#  17Oct2026
+#  - initial version, split from the GUI
 #
 #------------------------------------------------------------------------------
-class Application(tk.Frame):
-  units= {}
-  refs=  {}
-  report=[]
-  lastLog=  dt.datetime.now()
-  eventNow= dt.datetime.min
-  unitCount= 0
-  commCount= 0
-  failCount= 0
+class Audit():
+  retryWait= 2         # longest backoff in seconds waited for between tries
+  workers=   8         # units audited at once, <workers> in the configuration
 
-  def __init__(self, master=None):
-    tk.Frame.__init__(self, master)
-    self.grid()
-    self.createWidgets()
-    root.resizable(width=False, height=False)
-    root.protocol("WM_DELETE_WINDOW",self.done)
+  def __init__(self):
+    self.snapPath=   os.path.join(rptPath,'rollback')
+    self.units=      []
+    self.refs=       {}
+    self.masks=      {}
+    self.message=    ''
+    self.events=     queue.Queue()
     self.controller= symbCtrlModbus.SymbCtrl()
-    # load units and refs
-    if not self.loadConfig(cfgPath,cfgFileName):
-      sys.exit()
-    if not self.loadRefs(refPath):
-      sys.exit()
-    self.createUnitMenu();
-    #finish
-    self.logEvent('{} started'.format(verStr),True)
-    self.device= ModbusClient(debug=verbose)
-    print('{} running...'.format(verStr))
 
-  def createWidgets(self):
-    spaceX= 5
-    spaceY= 1
-    #buttons
-    self.scanButton=       tk.Button(self,text="Scan",width=10,command=self.scan,font=("Helvetica", "12"))
-    self.scanButton.grid   (column=1,row=2,padx=spaceX,pady=spaceY)
-    self.scanAllButton=    tk.Button(self,text="Scan All",width=10,command=self.scanAll,font=("Helvetica", "12"))
-    self.scanAllButton.grid(column=1,row=3,padx=spaceX,pady=spaceY)
-    self.saveButton=       tk.Button(self,text="Save",width=10,command=self.saveReport,font=("Helvetica", "12"))
-    self.saveButton.grid   (column=1,row=4,padx=spaceX,pady=spaceY)
-    self.quitButton=       tk.Button(self,text="Quit",width=10,command=self.done,font=("Helvetica", "12"))
-    self.quitButton.grid   (column=1,row=5,padx=spaceX,pady=spaceY)
-    #log window
-    self.eventLog=         tk.Text(self,width=80,height=16,bg=colBack)
-    self.eventLog.grid     (column=3,row=1,rowspan=5,padx=0,pady=spaceY,sticky=tk.E+tk.W)
-    self.scrollbar=        tk.Scrollbar(self)
-    self.scrollbar.config  (command=self.eventLog.yview)
-    self.eventLog.config   (yscrollcommand=self.scrollbar.set)
-    self.scrollbar.grid    (column=4,row=1,rowspan=5,padx=0,pady=spaceY,sticky=tk.N+tk.S+tk.W)
-    #spacers
-    self.spacer1=          tk.Label(self,text=' ')
-    self.spacer1.grid      (column=0,row=0)
-    self.spacer2=          tk.Label(self,text=' ')
-    self.spacer2.grid      (column=5,row=6)
-    
-  def createUnitMenu(self):
-    spaceX= 5
-    spaceY= 1
-    self.ctrlList= []
-    for ctrl in self.units:
-      self.ctrlList.append(ctrl['name'])
-    self.ctrlStr= tk.StringVar()
-    self.ctrlStr.set(self.ctrlList[0])
-    self.ctrlMenu= tk.OptionMenu(self,self.ctrlStr,*self.ctrlList)
-    self.ctrlMenu.config (width=14,font=('Helvetica','10'))
-    self.ctrlMenu.grid(column=1,row=1,padx=spaceX,pady=spaceY,sticky=tk.W)
+  # queue a line for the event log, (text,incDate)
+  def log(self,text,incDate=True):
+    self.events.put((text,incDate))
 
   def loadConfig(self,configPath,configFile):
     try:
       tree = xml.parse(os.path.join(configPath,configFile))
     except:
-      messagebox.showerror(title='Startup error...',message='Unable to load configuration file {}\{}'.format(cfgFilePath,configFile))
+      self.message= 'Unable to load configuration file {}\{}'.format(cfgFilePath,configFile)
       return False
     # process top level
     self.units= []
@@ -143,17 +119,23 @@ class Application(tk.Frame):
         for item in ctrl:
           new[item.tag]= item.text
         self.units.append(new)
-    self.logEvent('Controllers loaded',True)
+      if ctrl.tag=='workers':
+        try:
+          self.workers= max(1,int(ctrl.text))
+        except:
+          self.log('Invalid workers setting {}, using {:d}'.format(ctrl.text,self.workers))
+    self.log('Controllers loaded')
     return True
 
   def loadRefs(self,refPath):
-    self.refs= {}
+    self.refs=  {}
+    self.masks= {}
     for unit in self.units:
       if unit['ref'] not in self.refs:
         try:
           tree = xml.parse(os.path.join(refPath,unit['ref']))
         except:
-          messagebox.showerror(title='Startup error...',message='Unable to load reference file {}\{}'.format(cfgFilePath,unit['ref']))
+          self.message= 'Unable to load reference file {}\{}'.format(refFilePath,unit['ref'])
           return False
         #process top level
         new= []
@@ -162,127 +144,334 @@ class Application(tk.Frame):
           if reg.tag=='register':
             new.append({'reg':reg.attrib['name'],'value':reg.text,'type':self.controller.type(reg.attrib['name'])})
         self.refs[unit['ref']]= new
-        self.logEvent('Reference file {} loaded'.format(unit['ref']),True)
+        self.masks[unit['ref']]= RefMask(self.controller,new)
+        self.log('Reference file {} loaded'.format(unit['ref']))
     return True
 
-  #- GUI event handling -------------------------------------------------------
-
-  def scan(self):
-    self.report= []
-    self.report.append('SyCheck Report')
-    self.report.append('  {:%Y-%m-%d %H:%M:%S}'.format(dt.datetime.now()))
-    self.report.append('  ')
-    for unit in self.units:
-      if unit['name']==self.ctrlStr.get():
-        self.scanUnit(unit)
-    self.logEvent('Scan {} complete'.format(self.ctrlStr.get()),True)
-      
-  def scanAll(self):
-    self.report= []
-    self.unitCount= 0
-    self.commCount= 0
-    self.failCount= 0
-    self.report.append('SyCheck Report')
-    self.report.append('  {:%Y-%m-%d %H:%M:%S}'.format(dt.datetime.now()))
-    self.report.append('')
-    for unit in self.units:
-      self.scanUnit(unit)
-      self.eventLog.update_idletasks()
-    self.logEvent('{:d} units scanned'.format(self.unitCount),False)
-    self.logEvent('{:d} units with communications errors'.format(self.commCount),False)
-    self.logEvent('{:d} units with configuration differences'.format(self.failCount),False)
-    self.logEvent('Scan all complete',True)
-    self.report.append('{:d} units scanned'.format(self.unitCount))
-    self.report.append('{:d} units with communications errors'.format(self.commCount))
-    self.report.append('{:d} units with configuration differences'.format(self.failCount))
-    self.report.append('Scan all complete')
-    
-  def scanUnit(self,unit):
+  # audit one unit with its own controller, safe on a worker thread, log
+  # lines go through the event queue, the report lines and findings are
+  # returned, fix 'write' or 'dry' remediates the differences found
+  def auditUnit(self,unit,fix=None):
+      start= time.monotonic()
+      controller= symbCtrlModbus.SymbCtrl()
+      report= []
+      found= []
+      wrong= []
+      ident= None
+      fixed= None
       header= '  Register               Controller   Reference        Description'
       headline= '  -------------------------------------------------------------------------------------------'
-      self.logEvent('{} reconciled against {}...'.format(unit['name'],unit['ref']),True)
-      self.report.append('{} reconciled against {}...'.format(unit['name'],unit['ref']))
+      self.log('{} reconciled against {}...'.format(unit['name'],unit['ref']))
+      report.append('{} reconciled against {}...'.format(unit['name'],unit['ref']))
       diffs= 0
       valid= False
       tries= 0
-      self.unitCount+= 1
       while tries<5:
-        if self.controller.start(unit['address'],502):
-          self.controller.service()
-          if self.controller.error():
-            self.logEvent('  Device read error with {}'.format(unit['name']),True)      
+        if controller.start(unit['address'],502):
+          controller.service()
+          if controller.error():
+            self.log('  Device read error with {}'.format(unit['name']))
           else:
             valid= True
-            self.logEvent('  {} configuration read'.format(unit['name']),True)
+            self.log('  {} configuration read'.format(unit['name']))
             break
-        self.logEvent('  Communications error with {}'.format(unit['name']),True)
-        self.report.append('  Communications error with {}'.format(unit['name']))
+        self.log('  Communications error with {}'.format(unit['name']))
+        report.append('  Communications error with {}'.format(unit['name']))
         tries+= 1
+        if controller.health()!=CtrlHealth.CLOSED: break
+        if controller.retryIn()>self.retryWait: break
+        time.sleep(controller.retryIn())
       if valid:
-        fwHigh= (self.controller.value('FirmwareRev') >> 8) & 0xFF
-        fwLow=  self.controller.value('FirmwareRev') & 0xFF
-        self.report.append('  Name: {}  Model: {}  SN: {:d}  FW ver: {:d}.{:d}'.format(self.controller.value('ControlName'),self.controller.value('ModelName'),self.controller.value('SerialNumber'),fwHigh,fwLow))
+        fwHigh= (controller.value('FirmwareRev') >> 8) & 0xFF
+        fwLow=  controller.value('FirmwareRev') & 0xFF
+        report.append('  Name: {}  Model: {}  SN: {:d}  FW ver: {:d}.{:d}'.format(controller.value('ControlName'),controller.value('ModelName'),controller.value('SerialNumber'),fwHigh,fwLow))
+        ident= {'name':controller.value('ControlName'),'model':controller.value('ModelName'),
+                'serial':controller.value('SerialNumber'),'firmware':'{:d}.{:d}'.format(fwHigh,fwLow)}
         firstErr= True
-        for reg in self.refs[unit['ref']]:
-          regValue= self.controller.value(reg['reg'])
-          refValue= self.controller.convert(reg['reg'],reg['value'])
+        for reg in self.masks[unit['ref']].compare(*controller.rawData()):
+          regValue= controller.value(reg['reg'])
+          refValue= controller.convert(reg['reg'],reg['value'])
           if reg['type']=='str':
             if regValue!=refValue:
               if firstErr:
-                self.report.append(header)
-                self.report.append(headline)
+                report.append(header)
+                report.append(headline)
                 firstErr= False
-              self.logEvent('  {}:\'{}\' ≠ \'{}\' in reference'.format(reg['reg'],regValue,refValue),True)
-              self.report.append('  {:<16} {:>16} ≠ {:<16} {}'.format(reg['reg'],regValue,refValue,self.controller.description(reg['reg'])))
+              self.log('  {}:\'{}\' ≠ \'{}\' in reference'.format(reg['reg'],regValue,refValue))
+              found.append({'reg':reg['reg'],'controller':regValue,'reference':refValue,'desc':controller.description(reg['reg'])})
+              wrong.append(reg)
+              report.append('  {:<16} {:>16} ≠ {:<16} {}'.format(reg['reg'],regValue,refValue,controller.description(reg['reg'])))
               diffs+=1
           if reg['type']=='int' or reg['type']=='uint':
             if regValue!=refValue:
               if firstErr:
-                self.report.append(header)
-                self.report.append(headline)
+                report.append(header)
+                report.append(headline)
                 firstErr= False
-              self.logEvent('  {}:{:d} ≠ {:d} in reference'.format(reg['reg'],regValue,refValue),True)
-              self.report.append('  {:<16} {:>16d} ≠ {:<16d} {}'.format(reg['reg'],regValue,refValue,self.controller.description(reg['reg'])))
+              self.log('  {}:{:d} ≠ {:d} in reference'.format(reg['reg'],regValue,refValue))
+              found.append({'reg':reg['reg'],'controller':regValue,'reference':refValue,'desc':controller.description(reg['reg'])})
+              wrong.append(reg)
+              report.append('  {:<16} {:>16d} ≠ {:<16d} {}'.format(reg['reg'],regValue,refValue,controller.description(reg['reg'])))
               diffs+=1
           if reg['type']=='float':
             if round(regValue,4)!=round(refValue,4):
               if firstErr:
-                self.report.append(header)
-                self.report.append(headline)
+                report.append(header)
+                report.append(headline)
                 firstErr= False
-              self.logEvent('  {}:{:.2f} ≠ {:.2f} in reference'.format(reg['reg'],regValue,refValue),True)
-              self.report.append('  {:<16} {:>16.2f} ≠ {:<16.2f} {}'.format(reg['reg'],regValue,refValue,self.controller.description(reg['reg'])))
+              self.log('  {}:{:.2f} ≠ {:.2f} in reference'.format(reg['reg'],regValue,refValue))
+              found.append({'reg':reg['reg'],'controller':regValue,'reference':refValue,'desc':controller.description(reg['reg'])})
+              wrong.append(reg)
+              report.append('  {:<16} {:>16.2f} ≠ {:<16.2f} {}'.format(reg['reg'],regValue,refValue,controller.description(reg['reg'])))
               diffs+=1
           if reg['type']=='bool':
             if regValue!=refValue:
               if firstErr:
-                self.report.append(header)
-                self.report.append(headline)
+                report.append(header)
+                report.append(headline)
                 firstErr= False
-              self.logEvent('  {}:{} ≠ {} in reference'.format(reg['reg'],regValue,refValue),True)
+              self.log('  {}:{} ≠ {} in reference'.format(reg['reg'],regValue,refValue))
+              found.append({'reg':reg['reg'],'controller':regValue,'reference':refValue,'desc':controller.description(reg['reg'])})
+              wrong.append(reg)
               if regValue: regValue='On'
               else: regValue= 'Off'
               if refValue: refValue='On'
               else: refValue= 'Off'
-              self.report.append('  {:<16} {:>16} ≠ {:<16} {}'.format(reg['reg'],regValue,refValue,self.controller.description(reg['reg'])))
+              report.append('  {:<16} {:>16} ≠ {:<16} {}'.format(reg['reg'],regValue,refValue,controller.description(reg['reg'])))
               diffs+=1
         if diffs==0:
-          self.logEvent('  No differences found'.format(diffs),True)
-          self.report.append('  No differences found'.format(diffs))
+          self.log('  No differences found'.format(diffs))
+          report.append('  No differences found'.format(diffs))
         elif diffs==1:
-          self.logEvent('  {:d} difference found'.format(diffs),True)
-          self.report.append('  {:d} difference found'.format(diffs))
-          self.failCount+= 1
+          self.log('  {:d} difference found'.format(diffs))
+          report.append('  {:d} difference found'.format(diffs))
         else:
-          self.logEvent('  {:d} differences found'.format(diffs),True)
-          self.report.append('  {:d} differences found'.format(diffs))
-          self.failCount+= 1
-        self.report.append('')
+          self.log('  {:d} differences found'.format(diffs))
+          report.append('  {:d} differences found'.format(diffs))
+        if fix!=None and diffs>0:
+          fixed= self.remediate(controller,unit,wrong,fix=='dry',report)
+        report.append('')
       else:
-        self.commCount+= 1
-        self.logEvent('  Error!! Unable to open {}'.format(unit['name']),True)
-        self.report.append('  Error!! Unable to open {}'.format(unit['name']))
-        self.report.append('')
+        self.log('  Error!! Unable to open {}'.format(unit['name']))
+        report.append('  Error!! Unable to open {}'.format(unit['name']))
+        report.append('')
+      controller.close()
+      if not valid:  status= 'comm'
+      elif diffs>0:  status= 'diff'
+      else:          status= 'ok'
+      return {'report':report,'valid':valid,'diffs':diffs,'status':status,'regs':found,
+              'ident':ident,'tries':tries+valid,'seconds':time.monotonic()-start,'fix':fixed}
+
+  # write the differing registers back to the reference, only the words
+  # that differ, contiguous runs in one transaction each, then one block
+  # read to verify, the values replaced are saved first for rollback()
+  def remediate(self,controller,unit,entries,dry,report):
+    mask= self.masks[unit['ref']]
+    holdRuns,coilRuns,holdOld,coilOld= mask.writes(entries,*controller.rawData())
+    result= {'dry':dry,'regs':[entry['reg'] for entry in entries if id(entry) in mask.place],
+             'skipped':[entry['reg'] for entry in entries if id(entry) not in mask.place],
+             'writes':len(holdRuns)+len(coilRuns),'snapshot':None,'verified':False}
+    if len(result['skipped'])>0:
+      self.log('  Not writable, left as is: {}'.format(', '.join(result['skipped'])))
+      report.append('  Not writable, left as is: {}'.format(', '.join(result['skipped'])))
+    if result['writes']==0: return result
+    text= '{:d} registers in {:d} writes'.format(len(result['regs']),result['writes'])
+    if dry:
+      self.log('  Dry run, would fix {}'.format(text))
+      report.append('  Dry run, would fix {}'.format(text))
+      return result
+    os.makedirs(self.snapPath,exist_ok=True)
+    result['snapshot']= os.path.join(self.snapPath,'{}-{:%Y%m%d-%H%M%S}.json'.format(unit['name'].replace(' ',''),dt.datetime.now()))
+    try:
+      with open(result['snapshot'],'w',encoding='utf-8') as file:
+        json.dump({'unit':unit['name'],'address':unit['address'],'time':'{:%Y-%m-%d %H:%M:%S}'.format(dt.datetime.now()),
+                   'regs':result['regs'],'hold':holdOld,'coil':coilOld},file,indent=2)
+    except OSError:
+      self.log('  Error!! Unable to save rollback snapshot, {} not fixed'.format(unit['name']))
+      report.append('  Error!! Unable to save rollback snapshot, not fixed')
+      result['snapshot']= None
+      return result
+    if not controller.writeRaw(holdRuns,coilRuns):
+      self.log('  Error!! {}, rollback with {}'.format(controller.message(),result['snapshot']))
+      report.append('  Error!! {}, rollback with {}'.format(controller.message(),result['snapshot']))
+      return result
+    left= result['regs']
+    if controller.service():
+      left= [entry['reg'] for entry in mask.compare(*controller.rawData()) if entry['reg'] in result['regs'] and not self.same(controller,entry)]
+    result['verified']= len(left)==0
+    if result['verified']:
+      self.log('  Fixed {}, verified'.format(text))
+      report.append('  Fixed {}, verified, rollback snapshot {}'.format(text,os.path.basename(result['snapshot'])))
+    else:
+      self.log('  Error!! Fixed {}, not verified: {}'.format(text,', '.join(left)))
+      report.append('  Error!! Fixed {}, not verified: {}'.format(text,', '.join(left)))
+    return result
+
+  # reference entry matches the controller, floats to 4 places as the audit
+  def same(self,controller,entry):
+    regValue= controller.value(entry['reg'])
+    refValue= controller.convert(entry['reg'],entry['value'])
+    if entry['type']=='float' and regValue!=None and refValue!=None:
+      return round(regValue,4)==round(refValue,4)
+    return regValue==refValue
+
+  # write back the values saved by remediate()
+  def rollback(self,snapFile):
+    try:
+      with open(snapFile,encoding='utf-8') as file:
+        snap= json.load(file)
+    except (OSError,ValueError):
+      self.message= 'Unable to load rollback snapshot {}'.format(snapFile)
+      return False
+    controller= symbCtrlModbus.SymbCtrl()
+    done= controller.start(snap['address'],502) and controller.writeRaw(snap['hold'],snap['coil'])
+    if done:
+      self.message= '{} rolled back to {}'.format(snap['unit'],snap['time'])
+    else:
+      self.message= 'Rollback of {} failed, {}'.format(snap['unit'],controller.message())
+    controller.close()
+    return done
+
+#------------------------------------------------------------------------------
+#  SyCheck GUI
+#
+#  - setup the GUI
+#
+#  23Oct2024 A. Cooper
+#  - initial version
+#
+#------------------------------------------------------------------------------
+class Application(tk.Frame):
+  report=[]
+  lastLog=  dt.datetime.now()
+  eventNow= dt.datetime.min
+  unitCount= 0
+  commCount= 0
+  failCount= 0
+  pool=      None
+  audit=     None
+
+  def __init__(self, master=None):
+    tk.Frame.__init__(self, master)
+    self.grid()
+    self.createWidgets()
+    root.resizable(width=False, height=False)
+    root.protocol("WM_DELETE_WINDOW",self.done)
+    self.checker= Audit()
+    CtrlHealth.setReport(lambda text: self.checker.log('  '+text))
+    # load units and refs
+    if not self.checker.loadConfig(cfgPath,cfgFileName) or not self.checker.loadRefs(refPath):
+      messagebox.showerror(title='Startup error...',message=self.checker.message)
+      sys.exit()
+    self.units= self.checker.units
+    self.flushEvents()
+    self.createUnitMenu();
+    #finish
+    self.logEvent('{} started'.format(verStr),True)
+    self.device= ModbusClient(debug=verbose)
+    print('{} running...'.format(verStr))
+
+  def createWidgets(self):
+    spaceX= 5
+    spaceY= 1
+    #buttons
+    self.scanButton=       tk.Button(self,text="Scan",width=10,command=self.scan,font=("Helvetica", "12"))
+    self.scanButton.grid   (column=1,row=2,padx=spaceX,pady=spaceY)
+    self.scanAllButton=    tk.Button(self,text="Scan All",width=10,command=self.scanAll,font=("Helvetica", "12"))
+    self.scanAllButton.grid(column=1,row=3,padx=spaceX,pady=spaceY)
+    self.saveButton=       tk.Button(self,text="Save",width=10,command=self.saveReport,font=("Helvetica", "12"))
+    self.saveButton.grid   (column=1,row=4,padx=spaceX,pady=spaceY)
+    self.quitButton=       tk.Button(self,text="Quit",width=10,command=self.done,font=("Helvetica", "12"))
+    self.quitButton.grid   (column=1,row=5,padx=spaceX,pady=spaceY)
+    self.fixVar=           tk.IntVar()
+    self.fixCheck=         tk.Checkbutton(self,text="Fix",variable=self.fixVar,font=("Helvetica", "10"))
+    self.fixCheck.grid     (column=1,row=6,padx=spaceX,pady=spaceY,sticky=tk.W)
+    #log window
+    self.eventLog=         tk.Text(self,width=80,height=16,bg=colBack)
+    self.eventLog.grid     (column=3,row=1,rowspan=5,padx=0,pady=spaceY,sticky=tk.E+tk.W)
+    self.scrollbar=        tk.Scrollbar(self)
+    self.scrollbar.config  (command=self.eventLog.yview)
+    self.eventLog.config   (yscrollcommand=self.scrollbar.set)
+    self.scrollbar.grid    (column=4,row=1,rowspan=5,padx=0,pady=spaceY,sticky=tk.N+tk.S+tk.W)
+    #spacers
+    self.spacer1=          tk.Label(self,text=' ')
+    self.spacer1.grid      (column=0,row=0)
+    self.spacer2=          tk.Label(self,text=' ')
+    self.spacer2.grid      (column=5,row=6)
+    
+  def createUnitMenu(self):
+    spaceX= 5
+    spaceY= 1
+    self.ctrlList= []
+    for ctrl in self.units:
+      self.ctrlList.append(ctrl['name'])
+    self.ctrlStr= tk.StringVar()
+    self.ctrlStr.set(self.ctrlList[0])
+    self.ctrlMenu= tk.OptionMenu(self,self.ctrlStr,*self.ctrlList)
+    self.ctrlMenu.config (width=14,font=('Helvetica','10'))
+    self.ctrlMenu.grid(column=1,row=1,padx=spaceX,pady=spaceY,sticky=tk.W)
+
+  #- GUI event handling -------------------------------------------------------
+
+  def scan(self):
+    for unit in self.units:
+      if unit['name']==self.ctrlStr.get():
+        self.startAudit([unit],'Scan {} complete'.format(unit['name']),False)
+
+  def scanAll(self):
+    self.startAudit(self.units,'Scan all complete',True)
+
+  # queue the units on the worker pool, auditPoll collects the results
+  def startAudit(self,units,doneText,summary):
+    if self.audit!=None: return
+    fix= None
+    if self.fixVar.get():
+      if not messagebox.askokcancel('Fix...','Write the reference to controllers with differences?'): return
+      fix= 'write'
+    if self.pool==None:
+      self.pool= concurrent.futures.ThreadPoolExecutor(max_workers=self.checker.workers)
+    self.report= []
+    self.report.append('SyCheck Report')
+    self.report.append('  {:%Y-%m-%d %H:%M:%S}'.format(dt.datetime.now()))
+    self.report.append('')
+    self.audit= {'units':units,'jobs':[self.pool.submit(self.checker.auditUnit,unit,fix) for unit in units],
+                 'done':doneText,'summary':summary,'start':time.monotonic()}
+    self.scanButton.config(state=tk.DISABLED)
+    self.scanAllButton.config(state=tk.DISABLED)
+    self.after(100,self.auditPoll)
+
+  # runs on the Tk thread, moves worker events to the log and builds the
+  # report in configuration order once every unit is done
+  def auditPoll(self):
+    self.flushEvents()
+    if not all(job.done() for job in self.audit['jobs']):
+      self.after(100,self.auditPoll)
+      return
+    self.unitCount= 0
+    self.commCount= 0
+    self.failCount= 0
+    for unit,job in zip(self.audit['units'],self.audit['jobs']):
+      try:
+        result= job.result()
+      except Exception as err:
+        self.logEvent('  Error!! Audit of {} failed, {}'.format(unit['name'],err),True)
+        result= {'report':['  Error!! Unable to open {}'.format(unit['name']),''],'valid':False,'diffs':0}
+      self.unitCount+= 1
+      if not result['valid']: self.commCount+= 1
+      elif result['diffs']>0: self.failCount+= 1
+      self.report+= result['report']
+    if self.audit['summary']:
+      self.logEvent('{:d} units scanned'.format(self.unitCount),False)
+      self.logEvent('{:d} units with communications errors'.format(self.commCount),False)
+      self.logEvent('{:d} units with configuration differences'.format(self.failCount),False)
+      self.report.append('{:d} units scanned'.format(self.unitCount))
+      self.report.append('{:d} units with communications errors'.format(self.commCount))
+      self.report.append('{:d} units with configuration differences'.format(self.failCount))
+      self.report.append(self.audit['done'])
+    self.logEvent('{} in {:.1f}s'.format(self.audit['done'],time.monotonic()-self.audit['start']),True)
+    self.audit= None
+    self.scanButton.config(state=tk.NORMAL)
+    self.scanAllButton.config(state=tk.NORMAL)
 
   def saveReport(self):
       # create reports directory if not present
@@ -308,6 +497,8 @@ class Application(tk.Frame):
   # handle the quit button
   def done(self):
     if messagebox.askokcancel("Quit", "Do you want to quit?"):
+      if self.pool!=None:
+        self.pool.shutdown(wait=False,cancel_futures=True)
       self.quit()
 
   #- Event reporting ----------------------------------------------------------
@@ -325,6 +516,15 @@ class Application(tk.Frame):
     self.eventLog.insert(tk.END,event+'\n')
     self.eventLog.see(tk.END)
 
+  # log events queued by the workers and health reports
+  def flushEvents(self):
+    while True:
+      try:
+        event,incDate= self.checker.events.get_nowait()
+      except queue.Empty:
+        return
+      self.logEvent(event,incDate)
+
   def clearEvents(self):
     self.eventLog.delete('1.0',tk.END)
 
@@ -338,15 +538,121 @@ class Application(tk.Frame):
   def getController(self):
     pass
 
+#------------------------------------------------------------------------------
+#  Batch Mode
+#
+#  - audit every unit in parallel without the GUI, for scheduled audits
+#  - writes SyCheck<date>-<time>.json and .csv to the reports directory and
+#    appends a line per run to SyCheckHistory.csv to track audit duration
+#  - returns the exit code, 0 no differences, 1 differences found, 2 units
+#    that could not be read but no differences, 3 configuration errors
+#
+#  17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+def batch(args):
+  checker= Audit()
+  def flush():
+    while True:
+      try:
+        event,incDate= checker.events.get_nowait()
+      except queue.Empty:
+        return
+      if incDate: print('{:%Y-%m-%d %H:%M:%S} {}'.format(dt.datetime.now(),event))
+      else: print('                    {}'.format(event))
+  CtrlHealth.setReport(lambda text: checker.log('  '+text))
+  checker.log('{} batch audit started'.format(verStr))
+  if not checker.loadConfig(cfgPath,cfgFileName) or not checker.loadRefs(refPath):
+    flush()
+    print(checker.message)
+    return 3
+  if args.rollback!=None:
+    done= checker.rollback(args.rollback)
+    print(checker.message)
+    if done: return 0
+    return 2
+  if args.workers!=None: checker.workers= max(1,args.workers)
+  fix= None
+  if args.fix: fix= 'write'
+  if args.dry_run: fix= 'dry'
+  if args.out!=None: checker.snapPath= os.path.join(args.out,'rollback')
+  units= checker.units
+  if args.unit!=None:
+    units= [unit for unit in units if unit['name'] in args.unit]
+  started= dt.datetime.now()
+  start= time.monotonic()
+  results= []
+  with concurrent.futures.ThreadPoolExecutor(max_workers=checker.workers) as pool:
+    jobs= [pool.submit(checker.auditUnit,unit,fix) for unit in units]
+    while len(concurrent.futures.wait(jobs,timeout=0.2).not_done)>0:
+      flush()
+    for unit,job in zip(units,jobs):
+      try:
+        results.append(job.result())
+      except Exception as err:
+        checker.log('  Error!! Audit of {} failed, {}'.format(unit['name'],err))
+        results.append({'valid':False,'diffs':0,'status':'comm','regs':[],'ident':None,'tries':0,'seconds':0.0,'fix':None})
+  duration= time.monotonic()-start
+  # summary
+  counts= {'units':len(units),'ok':0,'diff':0,'comm':0}
+  for result in results: counts[result['status']]+= 1
+  checker.log('{:d} units scanned'.format(counts['units']),False)
+  checker.log('{:d} units with communications errors'.format(counts['comm']),False)
+  checker.log('{:d} units with configuration differences'.format(counts['diff']),False)
+  checker.log('Batch audit complete in {:.1f}s with {:d} workers'.format(duration,checker.workers))
+  flush()
+  # reports
+  outPath= args.out or rptPath
+  os.makedirs(outPath,exist_ok=True)
+  name= os.path.join(outPath,'SyCheck{:%Y%m%d-%H%M%S}'.format(started))
+  data= {'version':verStr,'start':'{:%Y-%m-%d %H:%M:%S}'.format(started),'seconds':round(duration,3),
+         'workers':checker.workers,'summary':counts,'units':[]}
+  for unit,result in zip(units,results):
+    data['units'].append({'name':unit['name'],'address':unit['address'],'ref':unit['ref'],'status':result['status'],
+                          'seconds':round(result['seconds'],3),'tries':result['tries'],'ident':result['ident'],
+                          'diffs':result['regs'],'fix':result['fix']})
+  with open(name+'.json','w',encoding='utf-8') as file:
+    json.dump(data,file,indent=2)
+  with open(name+'.csv','w',encoding='utf-8',newline='') as file:
+    out= csv.writer(file)
+    out.writerow(['unit','address','ref','status','seconds','register','controller','reference','description'])
+    for entry in data['units']:
+      head= [entry['name'],entry['address'],entry['ref'],entry['status'],entry['seconds']]
+      if len(entry['diffs'])==0: out.writerow(head+['','','',''])
+      for diff in entry['diffs']:
+        out.writerow(head+[diff['reg'],diff['controller'],diff['reference'],diff['desc']])
+  history= os.path.join(outPath,'SyCheckHistory.csv')
+  newFile= not os.path.exists(history)
+  with open(history,'a',encoding='utf-8',newline='') as file:
+    out= csv.writer(file)
+    if newFile: out.writerow(['start','seconds','workers','units','ok','diff','comm'])
+    out.writerow([data['start'],data['seconds'],checker.workers,counts['units'],counts['ok'],counts['diff'],counts['comm']])
+  print('Reports {}.json and .csv written'.format(name))
+  if counts['diff']>0: return 1
+  if counts['comm']>0: return 2
+  return 0
+
 #------------------------------------------------------------------------------
 #  GUI Main
 #
-#  - run the GIU
+#  - run the GIU, or batch mode with --batch
 #
 #  08Feb2010 A. Cooper
 #  - initial version
 #
 #------------------------------------------------------------------------------
+parser= argparse.ArgumentParser(description=verStr)
+parser.add_argument('--batch',action='store_true',help='audit every unit without the GUI and write JSON and CSV reports')
+parser.add_argument('--workers',type=int,help='units audited at once, overrides the configuration')
+parser.add_argument('--unit',action='append',help='audit only this unit, may be repeated')
+parser.add_argument('--out',help='report directory, default reports')
+parser.add_argument('--fix',action='store_true',help='write the reference to units with differences, a rollback snapshot is saved first')
+parser.add_argument('--dry-run',action='store_true',help='report the writes --fix would make without writing')
+parser.add_argument('--rollback',metavar='SNAPSHOT',help='write back the values saved in a rollback snapshot')
+args= parser.parse_args()
+if args.batch:
+  sys.exit(batch(args))
 root= tk.Tk()
 app= Application(master=root)
 app.master.title(verStr)
@@ -0,0 +1,175 @@
+#------------------------------------------------------------------------------
+#  Reference Mask
+#
+#  - Compile a SyCheck reference file into raw register images so a unit is
+#    checked with one masked comparison of its register blocks
+#
+#  External notes...
+#  - RefMask(ctrl,ref) compiles a reference, ctrl is a symbCtrlModbus
+#    SymbCtrl used for the register map and value conversion, ref is a list
+#    of {'reg','value','type'} as built by SyCheck.loadRefs()
+#  - RefMask.compare(hold,coil) returns the reference entries in file order
+#    that may differ from the controller, hold and coil are the raw blocks
+#    from SymbCtrl.rawData(), only these need decoding for the report
+#  - RefMask.loose  entries that could not be compiled, always returned by
+#    compare() so they are checked decoded as before
+#  - RefMask.writes(entries,hold,coil) the writes that set entries to the
+#    reference, returns (holdRuns,coilRuns,holdOld,coilOld), runs of
+#    contiguous addresses as (addr,[values]) with the new values and the
+#    values they replace, loose and read only entries are left out
+#  - types compiled
+#      uint, int:   one word, int in two's complement
+#      float:       two words, low word first, a raw mismatch is returned
+#                   and the caller decides with its rounding rule
+#      str:         the characters and terminating zero, high byte first,
+#                   bytes after the terminator are not compared
+#      bool:        one coil
+#    other types are not compared by SyCheck and are left out
+#
+#  Internal notes...
+#  - expected words and care masks are held as integers over the whole
+#    block image, so the check is one xor and one and per block, the
+#    mismatching words are only located when the result is not zero
+#  - string bytes after the terminator keep their current value when a word
+#    is written
+#  - a reference whose value does not convert, does not fit its register or
+#    conflicts with another reference on the same bits goes into loose
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import math
+import struct
+from array import array
+
+#-- constants -----------------------------------------------------------------
+HOLD_RUN= 123    # most registers in one write_multiple_registers
+COIL_RUN= 1968   # most coils in one write_multiple_coils
+
+# group {addr:value} into runs of contiguous addresses, (addr,[values])
+def runs(values,limit):
+  out= []
+  for addr in sorted(values):
+    if len(out)>0 and out[-1][0]+len(out[-1][1])==addr and len(out[-1][1])<limit:
+      out[-1][1].append(values[addr])
+    else:
+      out.append((addr,[values[addr]]))
+  return out
+
+#------------------------------------------------------------------------------
+#  RefMask Class
+#
+#  - compiled reference for one reference file
+#
+#------------------------------------------------------------------------------
+class RefMask():
+
+  def __init__(self,ctrl,ref):
+    self.holdSize= ctrl.holdSize
+    self.coilSize= ctrl.coilSize
+    self.loose=    []
+    self.index=    {}      # entry id to file order
+    self.words=    {}      # holding register address to entry
+    self.coils=    {}      # coil address to entry
+    self.place=    {}      # writable entry id to (addr,[(want,care)]) or (addr,bit)
+    holdWant= array('H',bytes(2*self.holdSize))
+    holdCare= array('H',bytes(2*self.holdSize))
+    coilWant= bytearray(self.coilSize)
+    coilCare= bytearray(self.coilSize)
+    for n,entry in enumerate(ref):
+      self.index[id(entry)]= n
+      if entry['type'] not in ('str','int','uint','float','bool'): continue
+      words= self.encode(ctrl,entry)
+      if words==None:
+        self.loose.append(entry)
+        continue
+      addr= ctrl.address(entry['reg'])
+      if entry['type']=='bool':
+        if addr>=self.coilSize or coilCare[addr]:
+          self.loose.append(entry)
+          continue
+        coilWant[addr]= words[0][0]
+        coilCare[addr]= 1
+        self.coils[addr]= entry
+        if ctrl.mode(entry['reg'])=='rw': self.place[id(entry)]= (addr,words[0][0])
+        continue
+      if addr+len(words)>self.holdSize or any(holdCare[addr+i]&care for i,(want,care) in enumerate(words)):
+        self.loose.append(entry)
+        continue
+      for i,(want,care) in enumerate(words):
+        holdWant[addr+i]= want
+        holdCare[addr+i]= care
+        self.words[addr+i]= entry
+      if ctrl.mode(entry['reg'])=='rw': self.place[id(entry)]= (addr,words)
+    self.holdWant= int.from_bytes(holdWant.tobytes(),'little')
+    self.holdCare= int.from_bytes(holdCare.tobytes(),'little')
+    self.coilWant= int.from_bytes(coilWant,'little')
+    self.coilCare= int.from_bytes(coilCare,'little')
+
+  # (want,care) per word or coil of a reference value, None if it can't be
+  # represented in the register
+  def encode(self,ctrl,entry):
+    if ctrl.mode(entry['reg']) not in ('r','rw'): return None
+    value= ctrl.convert(entry['reg'],entry['value'])
+    if value==None: return None
+    typ= entry['type']
+    if typ=='bool':
+      return [(int(value),1)]
+    if typ=='uint':
+      if value<0 or value>0xFFFF: return None
+      return [(value,0xFFFF)]
+    if typ=='int':
+      if value<-0x8000 or value>0x7FFF: return None
+      return [(value&0xFFFF,0xFFFF)]
+    if typ=='float':
+      if math.isnan(value): return None
+      try: low,high= struct.unpack('<2H',struct.pack('<f',value))
+      except (OverflowError,struct.error): return None
+      return [(low,0xFFFF),(high,0xFFFF)]
+    try: raw= value.encode('latin-1')
+    except UnicodeEncodeError: return None
+    if len(raw)>16 or b'\0' in raw: return None
+    care= len(raw)+1
+    raw= raw.ljust(16,b'\0')
+    words= []
+    for i in range(0,min(care,16),2):
+      mask= 0xFF00
+      if i+1<care: mask|= 0x00FF
+      words.append(((raw[i]<<8)|raw[i+1],mask))
+    return words
+
+  def compare(self,hold,coil):
+    found= {id(entry):entry for entry in self.loose}
+    diff= (int.from_bytes(array('H',hold).tobytes(),'little')^self.holdWant)&self.holdCare
+    if diff!=0:
+      words= array('H',diff.to_bytes(2*self.holdSize,'little'))
+      for addr,word in enumerate(words):
+        if word: found[id(self.words[addr])]= self.words[addr]
+    diff= (int.from_bytes(bytes(coil),'little')^self.coilWant)&self.coilCare
+    if diff!=0:
+      for addr in self.coils:
+        if (diff>>(8*addr))&1: found[id(self.coils[addr])]= self.coils[addr]
+    return sorted(found.values(),key=lambda entry: self.index[id(entry)])
+
+  def writes(self,entries,hold,coil):
+    holdNew= {}
+    coilNew= {}
+    for entry in entries:
+      if id(entry) not in self.place: continue
+      addr,want= self.place[id(entry)]
+      if entry['type']=='bool':
+        coilNew[addr]= want==1
+        continue
+      for i,(word,care) in enumerate(want):
+        holdNew[addr+i]= (hold[addr+i]&~care&0xFFFF)|word
+    holdOld= {addr:hold[addr] for addr in holdNew}
+    coilOld= {addr:bool(coil[addr]) for addr in coilNew}
+    return runs(holdNew,HOLD_RUN),runs(coilNew,COIL_RUN),runs(holdOld,HOLD_RUN),runs(coilOld,COIL_RUN)
+
+#-- end RefMask ---------------------------------------------------------------
@@ -30,6 +30,19 @@
 #  - alterations all through code to support new controller handler
 #  - fixed read only mode on logic gate output -> rw
 #  - added support for echo mode on logic gate
+#  17Oct2026
+#  - send configuration through the controller write queue, completion is
+#    polled per register instead of blocking the GUI
+#  - each display update reads values from a single controller scan
+#  - controller health changes reported by the scanner are logged
+#  - fleet mode, with <fleet>yes</fleet> in the configuration every listed
+#    controller is scanned by one subprocess and changing controllers only
+#    selects another one
+#  - scan timing, with <scanStats>yes</scanStats> in the configuration the
+#    scanner times each phase of its scans, shown on the misc tab
+#  - metrics exporter, with <metrics>[host:]port</metrics> in the
+#    configuration scanner health and latency of every scanned controller
+#    are served in the Prometheus text format at /metrics
 #
 # Known issues:
 # - missing units for internal temp on status screen
@@ -71,6 +84,7 @@ sys.path.append(libPath)
 #-- includes ------------------------------------------------------------------
 from config import loadConfig
 import SymbCtrlScan as SyScan
+import PromExport
 import status,inputs,outputs,control,misc,registers,events
 
 # -- constants ----------------------------------------------------------------
@@ -93,6 +107,10 @@ class Application(tk.Frame):
   scanning=  False
   heartbeat= 0
   unitCfg=   {}
+  cfgTickets= {}
+  cfgProb=   False
+  ctrlHealth= None
+  exporter=  None
 
   def __init__(self, master=None):
     tk.Frame.__init__(self, master)
@@ -100,12 +118,14 @@ class Application(tk.Frame):
     self.config= loadConfig(configPath,configFile)
     #print(self.config)
     self.controller= SyScan.SymbCtrl()
+    self.controller.timing= self.scanStats() or self.config.get('metrics')!=None
     self.createWidgets()
     root.resizable(width=False, height=False)
     root.protocol("WM_DELETE_WINDOW",self.done)
     self.eventNow= dt.datetime(2021,6,2)
     self.update()
     self.eventsTab.log('{} started'.format(verStr),True)
+    self.startExporter()
     print('{} running...'.format(verStr))
 
   def createWidgets(self):
@@ -247,6 +267,7 @@ class Application(tk.Frame):
   def done(self):
     if messagebox.askokcancel("Quit", "Do you want to quit?"):
       if self.scanning: self.controller.close()
+      if self.exporter!=None: self.exporter.stop()
       root.after_cancel(self.dispUpdate)
       self.quit()
 
@@ -284,7 +305,16 @@ class Application(tk.Frame):
           self.IPaddr.delete (0,tk.END)
           self.IPaddr.insert (0,self.currCtrl['address'])
     self.ipLabel.config(text=self.currCtrl['address'])
-    self.controller.start(self.currCtrl['address'])
+    if self.currCtrl['address'] in self.controller.fleet():
+      self.controller.select(self.currCtrl['address'])
+    else:
+      if len(self.controller.fleet())>0: self.controller.close() # replaced, not orphaned
+      if self.fleetMode() and self.currCtrl['name']!='Manual':
+        fleet= [ctrl['address'] for ctrl in self.config['ctrlList'] if ctrl['name']!='Manual']
+        if self.controller.startFleet(fleet):
+          self.controller.select(self.currCtrl['address'])
+      else:
+        self.controller.start(self.currCtrl['address'])
     if self.controller.error:
       self.eventsTab.log('Controller error: {}'.format(self.controller.message),True)
       self.online= False
@@ -295,9 +325,32 @@ class Application(tk.Frame):
       self.online= True
   
   def changeControl(self,param):
-    if self.controller.connected():
+    if self.scanning and param!='Manual' and self.fleetMode() and len(self.controller.fleet())>0:
+      self.openControl()
+      self.ctrlHealth= None
+    elif self.controller.connected():
       self.controller.close()
       self.openControl()
+
+  def fleetMode(self):
+    return str(self.config.get('fleet','no')).strip().lower() in ['yes','true','1']
+
+  def scanStats(self):
+    return str(self.config.get('scanStats','no')).strip().lower() in ['yes','true','1']
+
+  # serve scanner metrics from a background thread, never touches Tk
+  def startExporter(self):
+    if self.config.get('metrics')==None: return
+    names= {ctrl['address']:ctrl['name'] for ctrl in self.config['ctrlList'] if ctrl['name']!='Manual'}
+    try:
+      host,port= PromExport.parseAddress(self.config['metrics'])
+      self.exporter= PromExport.MetricsServer(lambda: PromExport.scanText('syview',self.controller.metrics(),names),host,port)
+      self.exporter.start()
+    except (ValueError,OSError) as err:
+      self.exporter= None
+      self.eventsTab.log('Metrics exporter not started: {}'.format(err),True)
+      return
+    self.eventsTab.log('Metrics served at http://{}:{:d}/metrics'.format(host,self.exporter.port),True)
   
   def update(self):
     # read all values from the controller
@@ -312,7 +365,14 @@ class Application(tk.Frame):
       self.statLabel.config(bg=colOn)
     else:
       self.statLabel.config(bg=colOff)
-    # update the various tabs
+    # report controller health changes
+    health= self.controller.health()
+    if health!=None and health['state']!=self.ctrlHealth:
+      if self.ctrlHealth!=None:
+        self.eventsTab.log('Controller {} {} after {:d} failures'.format(self.controller.ipAddr,health['state'],health['fails']),True)
+      self.ctrlHealth= health['state']
+    # update the various tabs from one scan
+    self.controller.freeze()
     tab= self.allTabs.index(self.allTabs.select())
     if tab==0: self.statusTab.update()
     if tab==1: self.inputsTab.update()
@@ -323,6 +383,7 @@ class Application(tk.Frame):
     if tab==6: self.control4Tab.update()
     if tab==7: self.miscTab.update()
     if tab==8: self.registersTab.update()
+    self.controller.thaw()
     # heartbeat
     if self.online:
       self.heartbeat+= 1
@@ -358,13 +419,30 @@ class Application(tk.Frame):
     prob= False
     if len(self.unitCfg)<1:
       messagebox.showwarning(title='Send error...', message='No configuration data to send!')
-    else:
-      for reg in self.unitCfg.keys():
-        self.controller.write(reg,self.unitCfg[reg])
-        if self.controller.error:
-          self.eventsTab.log('Send error for register {}!'.format(reg),True)
-          prob= True
-    if prob:
+      return
+    self.cfgTickets= {}
+    for reg in self.unitCfg.keys():
+      if self.controller.write(reg,self.unitCfg[reg]):
+        self.cfgTickets[reg]= self.controller.ticket
+      else:
+        self.eventsTab.log('Send error for register {}! {}'.format(reg,self.controller.message),True)
+        prob= True
+    self.cfgProb= prob
+    self.checkCfg()
+
+  # poll the queued configuration writes until all have completed
+  def checkCfg(self):
+    for reg,ticket in list(self.cfgTickets.items()):
+      status= self.controller.writeStatus(ticket)
+      if status=='pending': continue
+      if status not in ['done','superseded']:
+        self.eventsTab.log('Send error for register {}!'.format(reg),True)
+        self.cfgProb= True
+      del self.cfgTickets[reg]
+    if len(self.cfgTickets)>0:
+      root.after(100,self.checkCfg)
+      return
+    if self.cfgProb:
       messagebox.showwarning(title='Send error...', message='Errors during send! See log')
       self.eventsTab.log('Problems sending unit configuration!',True)
     else:
@@ -0,0 +1,233 @@
+#------------------------------------------------------------------------------
+#  Register Codec
+#
+#  - Decode a whole SymbCtrl register map in a few struct operations
+#
+#  External notes...
+#  - RegCodec(regs,holdSize,coilSize) compiles a register map into a decode
+#    plan, regs is a dict of name:{'addr','mode','type'} as kept in ctrlRegs
+#    by the controller classes, registers with mode 'w', of an unknown type
+#    or reaching past holdSize or coilSize are left out
+#  - RegCodec.decode(hold,coil) decodes every register in the plan and
+#    returns a dict of name:value
+#      hold:  holding registers by address, a list, or an array('H') or
+#             memoryview cast to 'H'
+#      coil:  coils by address, a list of bools, bytes or memoryview
+#  - RegCodec.names  set of register names in the plan
+#  - RegCodec.store(buf,hold,coil) decodes every register in the plan into
+#    typed slots in buf, a writable buffer of at least RegCodec.slotSize bytes
+#  - RegCodec.views(buf) typed views of the slots in buf as a dict
+#      'int':   signed 64bit, uint, int and dint registers
+#      'float': 32bit floating point
+#      'bool':  coils
+#      'text':  TEXT_SIZE bytes per register, latin-1 padded with zeros
+#  - RegCodec.slot[name] (kind,index) of a register in the views, text is
+#    at index*TEXT_SIZE
+#  - RegCodec.load(views,name) the value of a register from the views
+#  - types decoded
+#      uint, int:   16bit unsigned and signed integer
+#      dint:        32bit unsigned integer, low word first
+#      float:       IEEE-754 32bit floating point, low word first
+#      bool:        coil
+#      str:         up to 16 characters, high byte first, ends at a zero
+#      time, hour:  hh:mm:ss and hh:mm from consecutive words
+#      date, dattm: ddMmmyy and ddMmmyy hh:mm:ss, the month word is 0 to 11
+#
+#  Internal notes...
+#  - registers of one type are sorted by address and packed into a single
+#    struct format with pad bytes over the addresses between them, so one
+#    unpack_from decodes every register of that type, overlapping registers
+#    go into another pass
+#  - numeric types unpack from the little-endian image of the holding
+#    registers, strings from the big-endian image so the high byte of each
+#    word comes first
+#  - values from every pass are collected in one flat list in plan order
+#    and zipped with the register names into the result
+#  - only strings and the multi-word text types are formatted per register
+#  - each pass also has a slot packer, the registers of a pass take adjacent
+#    slots of one kind, so store() is one pack_into per pass, slots use
+#    native byte order to match the views
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import struct
+import sys
+from array import array
+
+#-- constants -----------------------------------------------------------------
+MONTHS= ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+# struct code, bytes and source image for each type
+TYPE_CODE= {'uint': ('H',  2, 'le'),
+            'int':  ('h',  2, 'le'),
+            'dint': ('I',  4, 'le'),
+            'float':('f',  4, 'le'),
+            'str':  ('16s',16,'be'),
+            'time': ('3H', 6, 'le'),
+            'hour': ('2H', 4, 'le'),
+            'date': ('3H', 6, 'le'),
+            'dattm':('6H',12, 'le'),
+            'bool': ('?',  1, 'coil')}
+
+#-- formatting ----------------------------------------------------------------
+
+def fmtStr(raw):
+  return raw.split(b'\0',1)[0].decode('latin-1')
+
+def fmtTime(w):
+  return '{:02d}:{:02d}:{:02d}'.format(w[0],w[1],w[2])
+
+def fmtHour(w):
+  return '{:02d}:{:02d}'.format(w[0],w[1])
+
+def fmtDate(w):
+  m= w[1]
+  if m>11: m= 0
+  return '{:02d}{}{:02d}'.format(w[2],MONTHS[m],w[0])
+
+def fmtDattm(w):
+  m= w[1]
+  if m>11: m= 0
+  return '{:02d}{}{:02d} {:02d}:{:02d}:{:02d}'.format(w[2],MONTHS[m],w[0],w[3],w[4],w[5])
+
+# per register formatting and the number of values each register unpacks to
+TYPE_FMT= {'str':(fmtStr,1),'time':(fmtTime,3),'hour':(fmtHour,2),'date':(fmtDate,3),'dattm':(fmtDattm,6)}
+
+# decoded value slots, kinds in layout order with the struct code and bytes
+TEXT_SIZE= 32  # widest text, a dattm of five digit words, is 31 characters
+SLOT_KINDS= ['int','float','bool','text']
+SLOT_CODE=  {'int':('q',8),'float':('f',4),'bool':('?',1),'text':('{:d}s'.format(TEXT_SIZE),TEXT_SIZE)}
+TYPE_KIND=  {'uint':'int','int':'int','dint':'int','float':'float','bool':'bool',
+             'str':'text','time':'text','hour':'text','date':'text','dattm':'text'}
+
+#------------------------------------------------------------------------------
+#  RegCodec Class
+#
+#  - compiled decode plan for one register map
+#
+#------------------------------------------------------------------------------
+class RegCodec():
+
+  def __init__(self,regs,holdSize,coilSize):
+    self.holdSize= holdSize
+    self.coilSize= coilSize
+    self.names=    set()
+    self.order=    []
+    self.strings=  False
+    # group readable registers by type
+    groups= {}
+    for name,reg in regs.items():
+      if reg['mode']=='w' or reg['type'] not in TYPE_CODE: continue
+      code,size,src= TYPE_CODE[reg['type']]
+      if src=='coil': start,limit= reg['addr'],coilSize
+      else:           start,limit= reg['addr']*2,holdSize*2
+      if start<0 or start+size>limit: continue
+      groups.setdefault(reg['type'],[]).append((start,name))
+      self.names.add(name)
+      if src=='be': self.strings= True
+    # one struct per type, more where registers overlap
+    passes= []
+    for typ,items in groups.items():
+      code,size,src= TYPE_CODE[typ]
+      items.sort()
+      while len(items)>0:
+        fmt=   '<'
+        names= []
+        rest=  []
+        end=   0
+        for start,name in items:
+          if start<end:
+            rest.append((start,name))
+            continue
+          if start>end: fmt+= '{:d}x'.format(start-end)
+          fmt+= code
+          names.append(name)
+          end= start+size
+        passes.append((typ,struct.Struct(fmt),src,names))
+        self.order+= names
+        items= rest
+    # slot layout, kinds follow each other in SLOT_KINDS order
+    counts= dict.fromkeys(SLOT_KINDS,0)
+    for typ,st,src,names in passes:
+      counts[TYPE_KIND[typ]]+= len(names)
+    self.offset= {}
+    pos= 0
+    for kind in SLOT_KINDS:
+      self.offset[kind]= pos
+      pos+= counts[kind]*SLOT_CODE[kind][1]
+    self.slotSize= pos
+    # decode and store plans
+    self.plans=  []
+    self.stores= []
+    self.slot=   {}
+    used= dict.fromkeys(SLOT_KINDS,0)
+    for typ,st,src,names in passes:
+      kind= TYPE_KIND[typ]
+      code,size= SLOT_CODE[kind]
+      for i,name in enumerate(names): self.slot[name]= (kind,used[kind]+i)
+      if kind=='text': pack= struct.Struct('='+code*len(names))
+      else:            pack= struct.Struct('={:d}{}'.format(len(names),code))
+      self.plans.append((st,src,TYPE_FMT.get(typ)))
+      self.stores.append((pack,self.offset[kind]+used[kind]*size,typ))
+      used[kind]+= len(names)
+
+  # holding register images, little-endian and big-endian words
+  def images(self,hold):
+    if isinstance(hold,(memoryview,array)): native= hold.tobytes()
+    else: native= array('H',hold).tobytes()
+    swapped= None
+    if self.strings or sys.byteorder=='big':
+      words= array('H',native)
+      words.byteswap()
+      swapped= words.tobytes()
+    if sys.byteorder=='little': return native,swapped
+    return swapped,native
+
+  # raw values of each pass
+  def unpack(self,hold,coil):
+    le,be= self.images(hold)
+    bufs= {'le':le,'be':be,'coil':bytes(coil)}
+    return [st.unpack_from(bufs[src]) for st,src,post in self.plans]
+
+  def decode(self,hold,coil):
+    out= []
+    for vals,(st,src,post) in zip(self.unpack(hold,coil),self.plans):
+      if post==None:
+        out+= vals
+        continue
+      func,count= post
+      if count==1: out+= map(func,vals)
+      else:        out+= map(func,zip(*[iter(vals)]*count))
+    return dict(zip(self.order,out))
+
+  # strings are stored as read, text types formatted first
+  def store(self,buf,hold,coil):
+    for vals,(pack,offset,typ),(st,src,post) in zip(self.unpack(hold,coil),self.stores,self.plans):
+      if post!=None and typ!='str':
+        func,count= post
+        vals= [func(w).encode('latin-1') for w in zip(*[iter(vals)]*count)]
+      pack.pack_into(buf,offset,*vals)
+
+  def views(self,buf):
+    mv= memoryview(buf)
+    views= {}
+    for n,kind in enumerate(SLOT_KINDS):
+      end= self.slotSize
+      if n+1<len(SLOT_KINDS): end= self.offset[SLOT_KINDS[n+1]]
+      if kind=='text': views[kind]= mv[self.offset[kind]:end]
+      else: views[kind]= mv[self.offset[kind]:end].cast(SLOT_CODE[kind][0])
+    return views
+
+  def load(self,views,name):
+    kind,index= self.slot[name]
+    if kind=='text': return fmtStr(views['text'][index*TEXT_SIZE:(index+1)*TEXT_SIZE].tobytes())
+    return views[kind][index]
+
+#-- end RegCodec --------------------------------------------------------------
@@ -6,16 +6,74 @@
 #
 #  External notes...
 #  - SyScan.start(ip)           start subprocess and initiate scanning
+#  - SyScan.startFleet(ipList)  start one subprocess scanning every controller
+#                               in the list, the first is selected, start()
+#                               and startFleet() fail while a scanner is
+#                               open, close() it first
+#  - SyScan.select(ip)          make another controller of the fleet the one
+#                               all other calls use, data is already current
+#  - SyScan.fleet()             IP addresses of the controllers being scanned
+#  - SyScan.readCtrl(ip,regName) read a register of any fleet controller
+#                               without changing the selection
 #  - SyScan.connected()         return True if scanning a controller
-#  - SyScan.scanInt(interval)   set the controller scan interval, default is 2s
+#  - SyScan.scanInterval(time) set the controller scan interval in seconds,
+#                               0.1 to 60, default is 1s, for the selected
+#                               controller only
 #  - SyScan.read(regName)       retrieve a specific datum by name
 #                               will return None if an error occurs
-#  - SyScan.write(regName,value) write a specific datum to the controller
+#  - SyScan.write(regName,value) queue a write of a specific datum to the
+#                               controller, returns without waiting, the
+#                               ticket for the write is left in SyScan.ticket
+#  - SyScan.writeStatus(ticket) completion status of a queued write
+#                                 'pending': queued, not yet written
+#                                 'done':    written to the controller
+#                                 'failed':  dropped after WRITE_TRIES attempts
+#                                 'superseded': replaced by a newer write to
+#                                            the same register before sent
+#                                 None:      unknown or expired ticket
+#  - SyScan.queueStats()        write queue metrics as a dict
+#                               {'depth','size','written','failed','merged',
+#                                'dropped','latency','maxLatency'}, latency
+#                               in ms
 #  - SyScan.status()            connection status, true= good
 #  - SyScan.error()             get the result of the last operation
 #                               true= error occurred
 #  - SyScan.message()           get error message in text form
 #  - SyScan.close()             kill the subprocesses and end scanning
+#  - SyScan.view()              read only live memoryviews of the register
+#                               data, not synchronized with the scan
+#                               {'hold':<uint16 by address>,
+#                                'coil':<uint8 by address>}
+#  - SyScan.snapshot()          consistent copy of the register data,
+#                               {'seq','hold','coil','vals'}, vals are the
+#                               decoded values as RegCodec views, None if
+#                               unavailable
+#  - SyScan.raw(regName)        raw holding register words of a register, or
+#                               [0] or [1] for a coil, from the read() snapshot
+#  - SyScan.freeze()            hold one snapshot for every read() until
+#                               SyScan.thaw(), values read in between are all
+#                               from the same scan
+#  - SyScan.cpuTime()           processor time used by the subprocess in
+#                               seconds, wraps after about 24 days, the whole
+#                               fleet in fleet mode
+#  - SyScan.health()            controller health as a dict {'state','fails'},
+#                               state is 'closed', 'open' or 'half-open'
+#  - SyScan.scanPlan()          block reads for each scan class as a dict
+#                               {'fast':{'hold':[[start,count],...],'coil':[...]},
+#                                'slow':{'hold':[...],'coil':[...]}}
+#  - SyScan.scanClass(regName)  scan class of a register, 'fast' or 'slow'
+#  - SyScan.timing              set True before start() or startFleet() to
+#                               time each phase of the scan loop
+#  - SyScan.scanStats()         scan timing of the selected controller as
+#                               ScanStats.read() gives it, None when timing
+#                               is off
+#  - SyScan.metrics()           scanner metrics of every controller for
+#                               PromExport, safe to call from another thread
+#                               {<ip>:{'valid','health','errors','age',
+#                                      'queue','stats'}}
+#                               errors counts by type 'com', 'read', 'write'
+#                               and 'full', age seconds since the last good
+#                               scan or None, queue the write queue depth
 #  - SyScan.registers()         return all register names as a list
 #  - SyScan.type(regName)       return the register type by name
 #                                 int:    signed 16bit integer
@@ -34,24 +92,86 @@
 #        1:  command to subprocess
 #              0:none
 #             -1:kill
-#              1:write coil
-#              2:write hold
-#              3:scan time
+#              3:scan time in ms
 #        2:  subprocess error
 #              0:none
 #              1:com error
 #              2:read error
 #              3:write error
-#              4:write buffer full
 #        3:  IP address byte 1
 #        4:  IP address byte 2
 #        5:  IP address byte 3
 #        6:  IP address byte 4
-#        7:  write address
-#        8:  write count
-#        9 to 16:   write data
-#        17 to 86:  coil register data
-#        87 to 306: holding register data
+#        7:  command data, scan time in ms
+#        8:  write queue head, next slot to fill, only moved by write()
+#        9:  write queue tail, next slot to write, only moved by the subprocess
+#        10: drain latency of the last write in ms
+#        11: maximum drain latency in ms
+#        12: writes completed
+#        13: writes failed
+#        14: writes sent merged with another write
+#        15: writes dropped as superseded
+#        16: processor time used by the subprocess in ms
+#        17: controller health, 0:closed, 1:open, 2:half-open
+#        18: consecutive communication failures
+#        19: com errors, scans that could not connect
+#        20: read errors
+#        21: write errors, write drains with a failed write
+#        22: writes refused with the write queue full, counted by write()
+#        23: ms time stamp of the last good scan, -1 before the first
+#        24 to 3351:  write queue, QUE_SIZE slots of SLOT_SIZE words
+#                       0:command, 1:write coil, 2:write hold
+#                       1:address
+#                       2:count
+#                       3:ticket
+#                       4:time queued in ms
+#                       5 to 12: data
+#        3352 to 5399: write status, STAT_SIZE pairs of ticket and status
+#  - register data is kept in a separate shared memory block without a lock,
+#    a 32bit publish sequence, holding registers as unsigned 16bit words,
+#    one byte per coil and the decoded value slots, the hold and coil views
+#    index the data by register address
+#  - the subprocess reads all due blocks, then publishes them with one slice
+#    assignment each between two increments of the sequence, a reader copies
+#    the data and keeps the copy only if the sequence was even and unchanged,
+#    so multi-word values are never torn and a copy is from a single scan
+#  - the subprocess keeps a local copy of the register data, decodes the
+#    whole map once per scan into typed slots with the RegCodec plan compiled
+#    from ctrlRegs at import, and publishes the slots after the raw data in
+#    the same shared memory block and sequence window
+#  - read() loads a register's slot from a snapshot, taken again when the
+#    sequence moves or after a local coil write, unless held by freeze(),
+#    nothing is decoded in the GUI process
+#  - the write queue is a single producer single consumer ring, write() fills
+#    the slot at the head and then advances it, the subprocess writes the slot
+#    at the tail and then advances it, neither side waits on the other, the
+#    queue is full when advancing the head would reach the tail
+#  - the subprocess moves queued writes into a local write buffer and drains
+#    it over one connection, only the newest value for each address is sent,
+#    adjacent holding registers go out in one write_multiple_registers call,
+#    holding registers are written before coils
+#  - the subprocess blocks on the wake event until the next scan or data
+#    expiry is due, write(), scanInterval() and close() set the event so
+#    commands are handled at once without polling the shared array
+#  - the subprocess keeps a CtrlHealth tracker for the controller, after
+#    consecutive failures scans and writes back off and then stop while the
+#    circuit is open, queued writes stay buffered without using their tries,
+#    a probe connects with a short timeout, only a lost link counts as a
+#    failure, a write the controller answers with an exception does not
+#  - in fleet mode each controller has its own shared array, data block and
+#    wake event, the subprocess runs scanSub() in a thread per controller,
+#    select() only rebinds the object to another controller's shared memory,
+#    close() stops every thread
+#  - only addresses in ctrlRegs are scanned, they are planned into block
+#    reads by MBPlan, unused addresses are read through when the gap is no
+#    more than HOLD_GAP or COIL_GAP
+#  - registers are split into two scan classes, fast registers (coils and
+#    read only process data) are read every scan, slow registers (names,
+#    units, calibration and settings) every SLOW_TIME seconds, a slow block
+#    is also read on the next scan after a write to any of its addresses
+#  - with timing on each controller has a ScanStats block the subprocess
+#    records connect, block read, decode and publish times into, with
+#    timing off the subprocess holds None and skips every call
 #
 #  Symbrosia
 #  Copyright 2021-2025, all rights reserved
@@ -63,6 +183,38 @@
 #  - added a buffer in subprocess for write commands
 #  - reverted convert module, it really was needed;)
 #  - fixed read only mode on logic gate output -> rw
+# 17Oct2026
+#  - scan planned block reads covering the register map instead of reading
+#    every holding register and coil, fixes the last block reading past the
+#    end of the holding registers
+#  - create the client with constructor arguments, works with pyModbusTCP 0.1
+#    through 0.3
+#  - fast and slow scan classes, configuration is only read every SLOW_TIME
+#    seconds or after it is written
+#  - scan interval may be set below one second, fixed scanInterval()
+#  - write commands go through a ring buffer in shared memory instead of a
+#    single command slot, write() no longer waits, completion status is kept
+#    per ticket and queue depth and drain latency are reported
+#  - superseded writes are dropped, adjacent holding register writes merged
+#    and all pending writes sent over one connection
+#  - the subprocess sleeps on an event between scans instead of polling,
+#    added cpuTime()
+#  - register data moved from the locked shared array to a shared memory
+#    block, added view()
+#  - seqlock on the register data, reads decode from a consistent snapshot,
+#    added snapshot(), freeze() and thaw()
+#  - backoff and circuit breaker on communication failures, added health()
+#  - read() decodes through a compiled RegCodec plan instead of a type chain
+#    per register
+#  - the subprocess decodes each scan and publishes typed values, read() is
+#    an indexed load, added raw()
+#  - fleet mode, one subprocess keeps every controller in a list scanned,
+#    added startFleet(), select(), fleet() and readCtrl()
+#  - per phase scan timing when timing is set, added scanStats()
+#  - error counts by type and the time of the last good scan are kept in
+#    the shared array, added metrics()
+#  - the scanner pickles without its memoryviews, the subprocess starts
+#    with the spawn start method
 #
 #------------------------------------------------------------------------------
 
@@ -71,15 +223,40 @@ import os
 import datetime as dt
 import time
 import ipaddress
+import threading
 from enum import IntEnum
-from multiprocessing import Process, Array
+from array import array
+from multiprocessing import Process, Array, Event
+from multiprocessing.shared_memory import SharedMemory
 from pyModbusTCP.client import ModbusClient
 from pyModbusTCP import utils
+from pyModbusTCP.constants import MB_NO_ERR, MB_EXCEPT_ERR
+from MBPlan import planBlocks, planText, HOLD_LIMIT, COIL_LIMIT, WRITE_LIMIT
+from RegCodec import RegCodec
+import CtrlHealth
+import ScanStats
 
 #-- constants -----------------------------------------------------------------
 debugScan= False
 debugSub=  False
 
+#-- functions -----------------------------------------------------------------
+# millisecond time stamp shared between processes, wraps at 31 bits
+def msStamp():
+  return int(time.monotonic()*1000)&0x7fffffff
+
+# timeout is a method in pyModbusTCP 0.1.x and a property from 0.2 on
+def mbTimeout(client,timeout):
+  if callable(client.timeout): client.timeout(timeout)
+  else: client.timeout= timeout
+
+# True when the last request failed on the link rather than with a device
+# exception reply, last_error is a method in pyModbusTCP 0.1.x
+def mbLinkLost(client):
+  error= client.last_error
+  if callable(error): error= error()
+  return error not in (MB_NO_ERR,MB_EXCEPT_ERR)
+
 #------------------------------------------------------------------------------
 #  SyScan Class
 #
@@ -89,7 +266,18 @@ debugSub=  False
 class SymbCtrl():
   ctrl=     None   # controller subprocess
   shared=   None   # controller subprocess shared array
+  wake=     None   # event to wake the subprocess for a command
+  data=     None   # controller register data shared memory
+  hold=     None   # holding register view of the data
+  coil=     None   # coil view of the data
+  seq=      None   # publish sequence view of the data
+  vals=     None   # decoded value view of the data
+  slots=    None   # typed views of the decoded values
+  snap=     None   # snapshot read() loads from
+  fleetUnits= {}   # controllers scanned by the subprocess by IP address
+  frozen=   False  # True while a snapshot is held by freeze()
   ipAddr=   ''     # controller IP address
+  ticket=   0      # ticket of the last queued write
   name=     None   # controller name read from controller
   error=    False  # error status of last call
   message=  ''     # text description of last call result
@@ -321,6 +509,22 @@ class SymbCtrl():
   COIL_SIZE = 80  # number of SymbCtrl coil registers
   HOLD_SIZE = 300 # number of SymbCtrl holding regs
   DATA_EXP=   10  # expiration time for valid data in seconds
+  TIMEOUT=    5   # Modbus timeout in seconds
+  HOLD_GAP=   16  # unused holding registers read to join two blocks
+  COIL_GAP=   64  # unused coils read to join two blocks
+  SLOW_TIME=  30  # scan period for the slow scan class in seconds
+  QUE_SIZE=   256 # write queue slots, one is always left empty
+  STAT_SIZE=  1024 # write status entries kept before tickets expire
+  WRITE_TRIES= 3  # attempts at a queued write before it is dropped
+  SNAP_TRIES= 1000 # attempts at a consistent copy of the register data
+
+  timing= False   # time the scan phases, set before start()
+
+  # decode plan for the register map, compiled once at import
+  codec= RegCodec(ctrlRegs,HOLD_SIZE,COIL_SIZE)
+
+  # holding registers used by each register type
+  TYPE_WORDS= {'float':2,'dint':2,'str':8,'date':3,'time':3,'dattm':6,'hour':2}
 
   # data valid codes
   DAT_VALID  = 1  # current data is valid
@@ -331,7 +535,7 @@ class SymbCtrl():
   ERR_COM    = 1  # unable to open controller session
   ERR_READ   = 2  # unable to read a register
   ERR_WRITE  = 3  # unable to write a register
-  ERR_FULL   = 4  # write buffer full
+  ERR_FULL   = 4  # write queue full, only counted, never the current error
 
   # command codes
   CMD_KILL   =-1  # terminate subprocess
@@ -340,6 +544,26 @@ class SymbCtrl():
   CMD_HOLD   = 2  # write holding registers
   CMD_SCAN   = 3  # update scan time
 
+  # controller health codes
+  HEALTH_CODE= {CtrlHealth.CLOSED:0,CtrlHealth.OPEN:1,CtrlHealth.HALF:2}
+  HEALTH_TEXT= {0:CtrlHealth.CLOSED,1:CtrlHealth.OPEN,2:CtrlHealth.HALF}
+
+  # write status codes
+  WR_PENDING = 1  # queued, not yet written
+  WR_DONE    = 2  # written to the controller
+  WR_FAILED  = 3  # dropped after WRITE_TRIES attempts
+  WR_DROPPED = 4  # superseded by a newer write to the same registers
+  WR_TEXT    = {1:'pending',2:'done',3:'failed',4:'superseded'}
+
+  # write queue slot offsets
+  SLOT_CMD   = 0  # write command, CMD_COIL or CMD_HOLD
+  SLOT_ADDR  = 1  # register address
+  SLOT_COUNT = 2  # number of registers
+  SLOT_TICKET= 3  # ticket returned to the caller
+  SLOT_STAMP = 4  # time queued in ms
+  SLOT_DATA  = 5  # register contents (up to eight words)
+  SLOT_SIZE  = 13 # words in each slot
+
   # shared array indices (see header comments)
   SHR_VALID  = 0  # valid data?  See code above
   SHR_CMD    = 1  # command to subprocess
@@ -348,12 +572,37 @@ class SymbCtrl():
   SHR_IP2    = 4
   SHR_IP3    = 5
   SHR_IP4    = 6
-  SHR_ADDR   = 7  # register address for write
-  SHR_COUNT  = 8  # number of bytes to write
-  SHR_DATA   = 9  # register contents to write (up to eight bytes)
-  SHR_COIL   = 17 # current coil register contents
-  SHR_HOLD   = 17+COIL_SIZE  # current holding register contents
-  SHR_SIZE   = 17+COIL_SIZE+HOLD_SIZE  # number of bytes in shared memory
+  SHR_DATA   = 7  # command data
+  SHR_HEAD   = 8  # write queue head
+  SHR_TAIL   = 9  # write queue tail
+  SHR_LAT    = 10 # drain latency of the last write in ms
+  SHR_LATMAX = 11 # maximum drain latency in ms
+  SHR_WDONE  = 12 # writes completed
+  SHR_WFAIL  = 13 # writes failed
+  SHR_WMERGE = 14 # writes sent merged with another write
+  SHR_WDROP  = 15 # writes dropped as superseded
+  SHR_CPU    = 16 # processor time used by the subprocess in ms
+  SHR_HEALTH = 17 # controller health code
+  SHR_FAILS  = 18 # consecutive communication failures
+  SHR_ECOM   = 19 # com errors
+  SHR_EREAD  = 20 # read errors
+  SHR_EWRITE = 21 # write errors
+  SHR_EFULL  = 22 # writes refused with the queue full
+  SHR_GOOD   = 23 # ms time stamp of the last good scan
+  SHR_QUE    = 24 # write queue slots
+  SHR_STAT   = SHR_QUE+QUE_SIZE*SLOT_SIZE  # write status ticket and code pairs
+  SHR_SIZE   = SHR_STAT+STAT_SIZE*2  # number of words in shared memory
+
+  # error counters by error code
+  ERR_COUNT  = {ERR_COM:SHR_ECOM,ERR_READ:SHR_EREAD,ERR_WRITE:SHR_EWRITE,ERR_FULL:SHR_EFULL}
+  ERR_NAME   = {ERR_COM:'com',ERR_READ:'read',ERR_WRITE:'write',ERR_FULL:'full'}
+
+  # shared data block layout in bytes
+  SEQ_BYTES  = 4  # publish sequence, odd while the subprocess is storing
+  HOLD_BYTES = HOLD_SIZE*2 # holding registers as unsigned 16bit words
+  DATA_BASE  = SEQ_BYTES+HOLD_SIZE*2+COIL_SIZE # followed by coils, one byte each
+  VALS_BASE  = (DATA_BASE+7)&~7 # decoded values, codec slots 8 byte aligned
+  DATA_SIZE  = VALS_BASE+codec.slotSize
 
   def __init__(self, master=None):
     self.ctrl=     None
@@ -361,55 +610,202 @@ class SymbCtrl():
     self.name=     None
     self.error=    False
     self.message=  ''
+    self.ticket=   0
+    self.fleetUnits= {}
+    self.plan=     self.planScan()
+    self.stats=    None
+
+  # the subprocess gets a copy without the shared memory bindings of this
+  # process, memoryviews can not be pickled for the spawn start method
+  def __getstate__(self):
+    state= self.__dict__.copy()
+    for key in ['ctrl','shared','wake','data','seq','hold','coil','vals','slots','snap','stats','fleetUnits']:
+      state.pop(key,None)
+    return state
+
+  # coils and read only process values are fast, everything else is slow
+  def scanClass(self,reg):
+    if reg not in self.ctrlRegs: return None
+    if self.ctrlRegs[reg]['type']=='bool': return 'fast'
+    if self.ctrlRegs[reg]['mode']=='r' and self.ctrlRegs[reg]['type']!='str': return 'fast'
+    return 'slow'
+
+  # plan the block reads needed to cover the register map for each class
+  def planScan(self):
+    addrs= {'fast':{'hold':[],'coil':[]},'slow':{'hold':[],'coil':[]}}
+    for name,reg in self.ctrlRegs.items():
+      if reg['mode']=='w': continue
+      cls= self.scanClass(name)
+      if reg['type']=='bool':
+        addrs[cls]['coil'].append(reg['addr'])
+      else:
+        for i in range(self.TYPE_WORDS.get(reg['type'],1)):
+          addrs[cls]['hold'].append(reg['addr']+i)
+    plan= {}
+    plan['fast']= {'hold':planBlocks(addrs['fast']['hold'],HOLD_LIMIT,self.HOLD_GAP),
+                   'coil':planBlocks(addrs['fast']['coil'],COIL_LIMIT,self.COIL_GAP)}
+    # slow addresses already read through by a fast block are not read again
+    for kind in ['hold','coil']:
+      slow= []
+      for addr in addrs['slow'][kind]:
+        inFast= False
+        for pos,count in plan['fast'][kind]:
+          if addr>=pos and addr<pos+count: inFast= True
+        if not inFast: slow.append(addr)
+      addrs['slow'][kind]= slow
+    plan['slow']= {'hold':planBlocks(addrs['slow']['hold'],HOLD_LIMIT,self.HOLD_GAP),
+                   'coil':planBlocks(addrs['slow']['coil'],COIL_LIMIT,self.COIL_GAP)}
+    return plan
+
+  def scanPlan(self):
+    return self.plan
 
   def start(self,ipAddr):
-    # parse ip address
-    try:
-      ipaddress.ip_address(ipAddr)
-    except ValueError:
-      self.error= True
-      self.message= 'Illegal IP address'
-      self.ctrl= None
-      self.name=  ''
-      return False
-    ipArr= ipAddr.split(".")
-    # check for open controller
-    if (self.ctrl!=None):
-      self.error= True
-      self.message= 'Controller already open'
-      self.ctrl= None
-      self.name=  ''
-      return False
-    # make and load shared array
-    self.shared= Array('i',self.SHR_SIZE)
-    self.shared[self.SHR_CMD]=   0
-    self.shared[self.SHR_ERROR]= 0
-    for i in range(4):
-      self.shared[i+self.SHR_IP1]= int(ipArr[i])
+    if not self.checkStart([ipAddr]): return False
     # spawn the process
     print('  Starting subprocess for {}'.format(ipAddr))
-    self.ctrl= Process(target=self.scanSub,args=(self.shared,))
+    unit= self.attach(ipAddr)
+    self.fleetUnits= {ipAddr:unit}
+    self.bind(unit)
+    self.ctrl= Process(target=self.scanSub,args=(unit['shared'],unit['data'],self.plan,unit['wake'],unit['statMem']))
     self.ctrl.start()
     # start status
     self.error= False
     self.message= 'No error'
     return True
 
-  def scanInterval(time):
+  # scan every controller in ipList from one subprocess, the first is selected
+  def startFleet(self,ipList):
+    if len(ipList)<1:
+      self.error= True
+      self.message= 'No controllers in fleet'
+      return False
+    if not self.checkStart(ipList): return False
+    print('  Starting fleet subprocess for {:d} controllers'.format(len(ipList)))
+    self.fleetUnits= {}
+    for ipAddr in ipList:
+      self.fleetUnits[ipAddr]= self.attach(ipAddr)
+    self.bind(self.fleetUnits[ipList[0]])
+    args= [(unit['shared'],unit['data'],self.plan,unit['wake'],unit['statMem']) for unit in self.fleetUnits.values()]
+    self.ctrl= Process(target=self.fleetSub,args=(args,))
+    self.ctrl.start()
+    self.error= False
+    self.message= 'No error'
+    return True
+
+  # switch read(), write() and the rest to another controller of the fleet
+  def select(self,ipAddr):
+    if self.ctrl==None or ipAddr not in self.fleetUnits:
+      self.error= True
+      self.message= 'Controller {} not in fleet'.format(ipAddr)
+      return False
+    if ipAddr!=self.ipAddr:
+      self.bind(self.fleetUnits[ipAddr])
+    self.error= False
+    self.message= 'Controller {} selected'.format(ipAddr)
+    return True
+
+  def fleet(self):
+    if self.ctrl==None: return []
+    return list(self.fleetUnits.keys())
+
+  # read a register of any controller in the fleet, the selection is kept
+  def readCtrl(self,ipAddr,reg):
+    current= self.ipAddr
+    if not self.select(ipAddr): return None
+    value= self.read(reg)
+    error,message= self.error,self.message
+    self.select(current)
+    self.error,self.message= error,message
+    return value
+
+  def checkStart(self,ipList):
+    # parse ip address
+    for ipAddr in ipList:
+      try:
+        ipaddress.ip_address(ipAddr)
+      except ValueError:
+        self.error= True
+        self.message= 'Illegal IP address'
+        return False
+    # check for open controller, it keeps running and must be closed first
+    if (self.ctrl!=None):
+      self.error= True
+      self.message= 'Controller already open'
+      return False
+    return True
+
+  # shared array, data block and wake event for one controller
+  def attach(self,ipAddr):
+    ipArr= ipAddr.split(".")
+    shared= Array('i',self.SHR_SIZE)
+    shared[self.SHR_CMD]=   0
+    shared[self.SHR_ERROR]= 0
+    shared[self.SHR_HEAD]=  0
+    shared[self.SHR_TAIL]=  0
+    shared[self.SHR_GOOD]=  -1
+    for i in range(4):
+      shared[i+self.SHR_IP1]= int(ipArr[i])
+    data= SharedMemory(create=True,size=self.DATA_SIZE)
+    seq,hold,coil,vals= self.dataViews(data)
+    statMem= None
+    stats=   None
+    if self.timing:
+      statMem= ScanStats.newStats()
+      stats=   ScanStats.ScanStats(statMem)
+    return {'ipAddr':ipAddr,'shared':shared,'wake':Event(),'data':data,'seq':seq,'hold':hold,'coil':coil,
+            'vals':vals,'slots':self.codec.views(vals),'snap':None,'frozen':False,'statMem':statMem,'stats':stats}
+
+  # make a controller the current one, its snapshot state is kept with it
+  def bind(self,unit):
+    if self.ipAddr in self.fleetUnits:
+      self.fleetUnits[self.ipAddr]['snap']=   self.snap
+      self.fleetUnits[self.ipAddr]['frozen']= self.frozen
+    self.ipAddr= unit['ipAddr']
+    self.shared= unit['shared']
+    self.wake=   unit['wake']
+    self.data=   unit['data']
+    self.seq=    unit['seq']
+    self.hold=   unit['hold']
+    self.coil=   unit['coil']
+    self.vals=   unit['vals']
+    self.slots=  unit['slots']
+    self.snap=   unit['snap']
+    self.frozen= unit['frozen']
+    self.stats=  unit['stats']
+
+  def detach(self,unit):
+    for view in unit['slots'].values(): view.release()
+    unit['seq'].release()
+    unit['hold'].release()
+    unit['coil'].release()
+    unit['vals'].release()
+    try:
+      unit['data'].close()
+    except BufferError: # a view() is still held, the block goes with it
+      pass
+    unit['data'].unlink()
+    if unit['stats']!=None:
+      unit['stats'].release()
+      unit['statMem'].close()
+      unit['statMem'].unlink()
+
+  def scanInterval(self,interval):
     if self.ctrl==None:
       self.error= True
       self.message= 'Controller is not open'
       return False
-    if not isinstance(value,int):
+    if not isinstance(interval,(int,float)):
       self.error= True
       self.message= 'Illegal parameter type for scan time'
       return False
-    if time<1 or time>60:
+    if interval<0.1 or interval>60:
       self.error= True
       self.message= 'Illegal value for scan time'
       return False
-    self.shared[self.SHR_DATA]= time
+    self.shared[self.SHR_DATA]= int(interval*1000)
     self.shared[self.SHR_CMD]=  self.CMD_SCAN
+    self.wake.set()
     self.error= False
     self.message= 'No error'
     return True
@@ -422,8 +818,17 @@ class SymbCtrl():
   def close(self):
     print('  Terminating controller subprocess..')
     if self.ctrl!=None:
-      self.shared[self.SHR_CMD]= self.CMD_KILL
+      for unit in self.fleetUnits.values():
+        unit['shared'][self.SHR_CMD]= self.CMD_KILL
+        unit['wake'].set()
       self.ctrl.join()
+      self.snap= None
+      self.frozen= False
+      for unit in self.fleetUnits.values():
+        self.detach(unit)
+      self.fleetUnits= {}
+      self.data= None
+      self.stats= None
       self.error= False
       self.message= 'No Error'
       self.ctrl= None
@@ -436,84 +841,202 @@ class SymbCtrl():
       self.name=  ''
       return False
       
-  def scanSub(self,shared):
+  # holding register, coil and decoded value views of a shared data block
+  def dataViews(self,data):
+    seq=  data.buf[:self.SEQ_BYTES].cast('I')
+    hold= data.buf[self.SEQ_BYTES:self.SEQ_BYTES+self.HOLD_BYTES].cast('H')
+    coil= data.buf[self.SEQ_BYTES+self.HOLD_BYTES:self.DATA_BASE]
+    vals= data.buf[self.VALS_BASE:self.DATA_SIZE]
+    return seq,hold,coil,vals
+
+  # read only views of the register data, indexed by register address
+  def view(self):
+    if self.ctrl==None: return None
+    return {'hold':self.hold.toreadonly(),'coil':self.coil.toreadonly()}
+
+  # consistent copy of the register data, copied again if a scan was being
+  # published while copying
+  def snapshot(self):
+    if self.ctrl==None: return None
+    for i in range(self.SNAP_TRIES):
+      seq= self.seq[0]
+      if seq&1: continue
+      hold= memoryview(self.hold.tobytes()).cast('H')
+      coil= self.coil.tobytes()
+      vals= self.vals.tobytes()
+      if self.seq[0]==seq: return {'seq':seq,'hold':hold,'coil':coil,'vals':self.codec.views(vals)}
+    return None
+
+  # hold one snapshot for all reads until thaw()
+  def freeze(self):
+    self.snap= self.snapshot()
+    self.frozen= True
+
+  def thaw(self):
+    self.frozen= False
+
+  # reduce buffered writes to the transactions needed, the newest write to an
+  # address supersedes older ones and adjacent holding registers are merged,
+  # returns the transactions and the indices of the writes still live
+  def coalesce(self,writeBuffer):
+    newest= {self.CMD_COIL:{},self.CMD_HOLD:{}}
+    for n,wCmd in enumerate(writeBuffer):
+      for i in range(wCmd['size']):
+        newest[wCmd['cmd']][wCmd['addr']+i]= (n,wCmd['data'][i])
+    blocks= []
+    for pos,count in planBlocks(newest[self.CMD_HOLD].keys(),WRITE_LIMIT):
+      block= {'cmd':self.CMD_HOLD,'addr':pos,'data':[],'writes':set()}
+      for addr in range(pos,pos+count):
+        n,val= newest[self.CMD_HOLD][addr]
+        block['data'].append(val)
+        block['writes'].add(n)
+      blocks.append(block)
+    for addr in sorted(newest[self.CMD_COIL]):
+      n,val= newest[self.CMD_COIL][addr]
+      blocks.append({'cmd':self.CMD_COIL,'addr':addr,'data':[val],'writes':{n}})
+    live= set()
+    for block in blocks: live|= block['writes']
+    return blocks,live
+
+  # fleet subprocess, one scanning thread per controller
+  def fleetSub(self,units):
+    threads= []
+    for shared,data,plan,wake,statMem in units:
+      thread= threading.Thread(target=self.scanSub,args=(shared,data,plan,wake,statMem))
+      thread.start()
+      threads.append(thread)
+    for thread in threads:
+      thread.join()
+
+  def scanSub(self,shared,data,plan,wake,statMem=None):
     ipAddr= '{}.{}.{}.{}'.format(shared[self.SHR_IP1],shared[self.SHR_IP2],shared[self.SHR_IP3],shared[self.SHR_IP4])
-    writeBuffer= []
+    seq,hold,coil,vals= self.dataViews(data)
+    stats= None # None unless timing, every call is skipped
+    if statMem!=None: stats= ScanStats.ScanStats(statMem)
+    retry= False # last scan attempt failed
+    # local copy of the register data, decoded before it is published
+    holdLocal= array('H',bytes(self.HOLD_BYTES))
+    coilLocal= bytearray(self.COIL_SIZE)
+    valsLocal= bytearray(self.codec.slotSize)
     # create a Modbus client object
-    device= ModbusClient(debug=False,timeout=5)
-    device.host(ipAddr)
-    device.port(self.PORT)
+    device= ModbusClient(host=ipAddr,port=self.PORT,timeout=self.TIMEOUT)
+    health= CtrlHealth.CtrlHealth(ipAddr)
+    if debugSub:
+      for cls in ['fast','slow']:
+        print('  {} hold plan {}'.format(cls,planText(plan[cls]['hold'])))
+        print('  {} coil plan {}'.format(cls,planText(plan[cls]['coil'])))
+    # block reads for each scan, slow blocks are flagged when due
+    holdBlocks= []
+    for pos,count in plan['fast']['hold']: holdBlocks.append([pos,count,False])
+    for pos,count in plan['slow']['hold']: holdBlocks.append([pos,count,True])
+    coilBlocks= []
+    for pos,count in plan['fast']['coil']: coilBlocks.append([pos,count,False])
+    for pos,count in plan['slow']['coil']: coilBlocks.append([pos,count,True])
+    holdDue= [True]*len(holdBlocks)
+    coilDue= [True]*len(coilBlocks)
     # initialize vars
     scanTime= 1
     shared[self.SHR_VALID]= self.DAT_INVALID
     shared[self.SHR_ERROR]= self.ERR_COM
     scan= dt.datetime.now()-dt.timedelta(seconds=scanTime+1)
+    slowScan= dt.datetime.now()
     last= dt.datetime.now()-dt.timedelta(seconds=self.DATA_EXP+1)
-    idle= dt.datetime.now()
+    writeBuffer= []
     # scanning loop
     while True:
+      wake.clear()
       now= dt.datetime.now()
       # swallow poison pill and die
       if shared[self.SHR_CMD]==self.CMD_KILL: 
         print('    Scanner for {:15s} terminated!'.format(ipAddr))
+        seq.release()
+        hold.release()
+        coil.release()
+        vals.release()
+        if stats!=None: stats.release()
         break
-      # check for write command and move to queue
-      if shared[self.SHR_CMD]==self.CMD_COIL or shared[self.SHR_CMD]==self.CMD_HOLD:
-        if len(writeBuffer)>100: shared[self.SHR_ERROR]= self.ERR_FULL
-        else:
-          wCmd= {'cmd':shared[self.SHR_CMD],'addr':shared[self.SHR_ADDR],'size':shared[self.SHR_COUNT],'data':[]}
-          for i in range(shared[self.SHR_COUNT]): wCmd['data'].append(shared[self.SHR_DATA+i])
-          shared[self.SHR_CMD]= self.CMD_NONE
-          writeBuffer.append(wCmd)
-          continue
-      # process write buffer
-      if len(writeBuffer)>0:
+      # move queued writes from the ring to the write buffer
+      tail= shared[self.SHR_TAIL]
+      head= shared[self.SHR_HEAD]
+      while tail!=head:
+        slot= self.SHR_QUE+tail*self.SLOT_SIZE
+        wCmd= {'cmd':shared[slot+self.SLOT_CMD],'addr':shared[slot+self.SLOT_ADDR],'size':shared[slot+self.SLOT_COUNT],
+               'ticket':shared[slot+self.SLOT_TICKET],'stamp':shared[slot+self.SLOT_STAMP],'tries':0,'data':[]}
+        for i in range(wCmd['size']): wCmd['data'].append(shared[slot+self.SLOT_DATA+i])
+        writeBuffer.append(wCmd)
+        tail= (tail+1)%self.QUE_SIZE
+      shared[self.SHR_TAIL]= tail
+      # drain the write buffer over one connection, unless backing off
+      if len(writeBuffer)>0 and health.allow():
         if debugSub: print('    Buffered commands {}'.format(len(writeBuffer)))
-        wCmd= writeBuffer[0]
-        # check for write coil command
-        if wCmd['cmd']==self.CMD_COIL:
-          if debugSub: print('  Write coil...')
-          if device.open():
-            val= wCmd['data'][0]==1
-            if device.write_single_coil(wCmd['addr'],val):
-              writeBuffer.remove(wCmd)
-            else:
-              shared[self.SHR_ERROR]= self.ERR_WRITE
-              if debugSub: print('    Write error!')
-            device.close()
-            if debugSub: print('    Coil {:d} written with {}'.format(wCmd['addr'],val))
-          else:
-            shared[self.SHR_ERROR]= self.ERR_WRITE
-            if debugSub: print('    Write error!')
-        # check for write hold command
-        if wCmd['cmd']==self.CMD_HOLD:
-          if debugSub: print('  Write holding reg...')
-          if device.open():
-            if device.write_multiple_registers(wCmd['addr'],wCmd['data']):
-              writeBuffer.remove(wCmd)
-            else:
-              shared[self.SHR_ERROR]= self.ERR_WRITE
-              if debugSub: print('    Write error!')
-            device.close()
-            if debugSub: print('    {} holding regs written at {:d}'.format(wCmd['size'],wCmd['addr']))
+        blocks,live= self.coalesce(writeBuffer)
+        failed= set()
+        linkLost= False # a device exception reply still counts as healthy
+        mbTimeout(device,health.timeout(self.TIMEOUT))
+        if device.open():
+          for block in blocks:
+            if block['cmd']==self.CMD_COIL:
+              if debugSub: print('  Write coil {:d} with {}'.format(block['addr'],block['data'][0]==1))
+              if device.write_single_coil(block['addr'],block['data'][0]==1):
+                for i,rBlock in enumerate(coilBlocks): # refresh slow block
+                  if rBlock[2] and block['addr']>=rBlock[0] and block['addr']<rBlock[0]+rBlock[1]: coilDue[i]= True
+              else:
+                failed|= block['writes']
+                linkLost|= mbLinkLost(device)
+            if block['cmd']==self.CMD_HOLD:
+              size= len(block['data'])
+              if debugSub: print('  Write {:d} holding regs at {:d}'.format(size,block['addr']))
+              if device.write_multiple_registers(block['addr'],block['data']):
+                for i,rBlock in enumerate(holdBlocks): # refresh slow block
+                  if rBlock[2] and block['addr']<rBlock[0]+rBlock[1] and block['addr']+size>rBlock[0]: holdDue[i]= True
+              else:
+                failed|= block['writes']
+                linkLost|= mbLinkLost(device)
+            if len(block['writes'])>1: shared[self.SHR_WMERGE]+= len(block['writes'])
+          device.close()
+        else:
+          failed= live
+          linkLost= True
+        if len(failed)>0:
+          if debugSub: print('    Write error!')
+          shared[self.SHR_ERROR]= self.ERR_WRITE
+          shared[self.SHR_EWRITE]+= 1
+        if linkLost: health.failure()
+        else: health.success()
+        shared[self.SHR_HEALTH]= self.HEALTH_CODE[health.state]
+        shared[self.SHR_FAILS]= health.fails
+        # record the results, failed writes stay buffered until out of tries
+        remaining= []
+        for n,wCmd in enumerate(writeBuffer):
+          if n not in live:
+            status= self.WR_DROPPED
+            shared[self.SHR_WDROP]+= 1
+          elif n in failed:
+            wCmd['tries']+= 1
+            if wCmd['tries']<self.WRITE_TRIES:
+              remaining.append(wCmd)
+              continue
+            status= self.WR_FAILED
+            shared[self.SHR_WFAIL]+= 1
           else:
-            shared[self.SHR_ERROR]= self.ERR_WRITE
-            if debugSub: print('    Write error!')
-        idle= now
+            status= self.WR_DONE
+            shared[self.SHR_WDONE]+= 1
+          stat= self.SHR_STAT+(wCmd['ticket']%self.STAT_SIZE)*2
+          if shared[stat]==wCmd['ticket']: shared[stat+1]= status
+          latency= (msStamp()-wCmd['stamp'])&0x7fffffff
+          shared[self.SHR_LAT]= latency
+          if latency>shared[self.SHR_LATMAX]: shared[self.SHR_LATMAX]= latency
+        writeBuffer= remaining
         continue
       # set scantime
       if shared[self.SHR_CMD]==self.CMD_SCAN: 
         shared[self.SHR_CMD]= self.CMD_NONE
-        if debugSub: print('  Set scan time to {:d}'.format(shared[self.SHR_DATA]))
-        if shared[self.SHR_DATA]>=1 and shared[self.SHR_DATA]<=60:
-          scanTime= shared[self.SHR_DATA]
+        if debugSub: print('  Set scan time to {:d}ms'.format(shared[self.SHR_DATA]))
+        if shared[self.SHR_DATA]>=100 and shared[self.SHR_DATA]<=60000:
+          scanTime= shared[self.SHR_DATA]/1000
         else:
           shared[self.SHR_ERROR]= self.ERR_WRITE
           if debugSub: print('    Bad value for scan time!')
-        idle= now
-      # low power idle if no activity besides regular scan
-      if now-idle>dt.timedelta(seconds=1):
-        time.sleep(0.01)
       # check last valid data
       if (now-last)<dt.timedelta(seconds=self.DATA_EXP):
         shared[self.SHR_VALID]= self.DAT_VALID
@@ -524,52 +1047,88 @@ class SymbCtrl():
         scan= now
         error= self.ERR_NONE
         if debugSub: print('Scanning controller {}...'.format(ipAddr))
-        # get new data from controller
-        if device.open():
+        # slow blocks are all due each slow period
+        if (now-slowScan)>dt.timedelta(seconds=self.SLOW_TIME):
+          slowScan= now
+          for i,block in enumerate(holdBlocks):
+            if block[2]: holdDue[i]= True
+          for i,block in enumerate(coilBlocks):
+            if block[2]: coilDue[i]= True
+        # get new data from controller, blocks are published together
+        coilNew= []
+        holdNew= []
+        attempt= health.allow() # False while backing off or circuit open
+        if attempt: mbTimeout(device,health.timeout(self.TIMEOUT))
+        if attempt and stats!=None: stats.begin(retry)
+        opened= attempt and device.open()
+        if attempt and stats!=None: stats.lap(ScanStats.CONNECT)
+        if opened:
           # coils
-          if debugSub: print('  Read coils')
-          values= device.read_coils(0,self.COIL_SIZE)
-          if values!=None: # place data in shared
-            for i,val in enumerate(values):
-              if val:
-                shared[self.SHR_COIL+i]= 1
-              else:
-                shared[self.SHR_COIL+i]= 0
-          else:
-            if debugSub: print('    Read error!')
-            error= self.ERR_READ #set read failed error flag
-          # holding registers
-          if debugSub: print('  Read holding regs')
-          values= []
-          for pos in range(0,self.HOLD_SIZE,100): # get data in blocks of 100
-            if pos+100>self.HOLD_SIZE:
-              count= self.HOLD_SIZE-pos+1
+          for i,(pos,count,slow) in enumerate(coilBlocks):
+            if slow and not coilDue[i]: continue
+            if debugSub: print('  Read coils {:3d} to {:3d}'.format(pos,pos+count-1))
+            values= device.read_coils(pos,count)
+            if stats!=None: stats.lap(ScanStats.COILS)
+            if values!=None:
+              coilNew.append((pos,bytes(values)))
+              coilDue[i]= False
             else:
-              count= 100
-            if debugSub: print('    Read holding regs {:3d} to {:3d}'.format(pos,pos+count-1))
-            val= device.read_holding_registers(pos,count)
-            if val==None:
-              values= None
+              if debugSub: print('    Read error!')
+              error= self.ERR_READ #set read failed error flag
               break
-            values= values+val
-          # place in shared array
-          if values!=None:
-            for i,val in enumerate(values):
-              shared[self.SHR_HOLD+i]= val
-          else:
-            goodData= False
-            if debugScan: print('    Read error!')
-            error= self.ERR_READ #set read failed error flag
+          # holding registers
+          for i,(pos,count,slow) in enumerate(holdBlocks):
+            if error!=self.ERR_NONE: break
+            if slow and not holdDue[i]: continue
+            if debugSub: print('  Read holding regs {:3d} to {:3d}'.format(pos,pos+count-1))
+            values= device.read_holding_registers(pos,count)
+            if stats!=None: stats.lap(ScanStats.HOLD)
+            if values!=None:
+              holdNew.append((pos,array('H',values)))
+              holdDue[i]= False
+            else:
+              if debugScan: print('    Read error!')
+              error= self.ERR_READ #set read failed error flag
           device.close()
         else:
           if debugScan: print('  Com error!')
           error= self.ERR_COM #set com error flag
+        # decode the whole map, then publish raw and decoded data in shared
+        # memory, the sequence is odd while data changes
+        if len(coilNew)+len(holdNew)>0:
+          if stats!=None: stats.mark()
+          for pos,values in coilNew: coilLocal[pos:pos+len(values)]= values
+          for pos,values in holdNew: holdLocal[pos:pos+len(values)]= values
+          self.codec.store(valsLocal,holdLocal,coilLocal)
+          if stats!=None: stats.lap(ScanStats.DECODE)
+          seq[0]= (seq[0]+1)&0xffffffff
+          for pos,values in coilNew: coil[pos:pos+len(values)]= values
+          for pos,values in holdNew: hold[pos:pos+len(values)]= values
+          vals[:]= valsLocal
+          seq[0]= (seq[0]+1)&0xffffffff
+          if stats!=None: stats.lap(ScanStats.PUBLISH)
         # handle errors
         shared[self.SHR_ERROR]= error
+        if attempt:
+          if error==self.ERR_NONE: health.success()
+          else: health.failure()
+          retry= error!=self.ERR_NONE
+          if retry: shared[self.ERR_COUNT[error]]+= 1
+          if stats!=None: stats.end(retry)
+        shared[self.SHR_HEALTH]= self.HEALTH_CODE[health.state]
+        shared[self.SHR_FAILS]= health.fails
         if error==self.ERR_NONE: # keep data valid flag set if com good
           shared[self.SHR_VALID]= self.DAT_VALID
+          shared[self.SHR_GOOD]= msStamp()
           last= now
           if debugSub: print('  Good scan!')
+      # sleep until the next scan or data expiry unless woken by a command
+      shared[self.SHR_CPU]= int(time.process_time()*1000)&0x7fffffff
+      due= scan+dt.timedelta(seconds=scanTime)
+      if (now-last)<dt.timedelta(seconds=self.DATA_EXP):
+        due= min(due,last+dt.timedelta(seconds=self.DATA_EXP))
+      wait= (due-dt.datetime.now()).total_seconds()
+      if wait>0: wake.wait(wait)
 
 #-- controller information ----------------------------------------------------
   def name(self):
@@ -674,56 +1233,45 @@ class SymbCtrl():
       self.error= True
       self.message= 'No recent data from controller'
       return None
+    if self.snap==None or (not self.frozen and self.snap['seq']!=self.seq[0]):
+      self.snap= self.snapshot()
+    if self.snap==None:
+      self.error= True
+      self.message= 'No consistent data from controller'
+      return None
+    if reg not in self.codec.slot:
+      self.error= True
+      self.message= 'Register {} cannot be decoded, type {}'.format(reg,self.ctrlRegs[reg]['type'])
+      return None
+    self.error= False
+    self.message= 'No error'
+    return self.codec.load(self.snap['vals'],reg)
+
+  # raw words of a register from the same snapshot as read(), one 0 or 1
+  # for a coil
+  def raw(self,reg):
+    if self.ctrl==None or reg not in self.ctrlRegs:
+      self.error= True
+      self.message= 'Bad register name {}'.format(reg)
+      return None
+    if self.snap==None or (not self.frozen and self.snap['seq']!=self.seq[0]):
+      self.snap= self.snapshot()
+    if self.snap==None:
+      self.error= True
+      self.message= 'No consistent data from controller'
+      return None
     addr= self.ctrlRegs[reg]['addr']
     typ=  self.ctrlRegs[reg]['type']
     self.error= False
     self.message= 'No error'
-    if typ=='float':
-      val= [self.shared[self.SHR_HOLD+addr],self.shared[self.SHR_HOLD+addr+1]]
-      val= utils.word_list_to_long(val,big_endian=False)
-      val= utils.decode_ieee(val[0])
-      return val
-    if typ=='uint':
-      return self.shared[self.SHR_HOLD+addr]
-    if typ=='int':
-      val= self.shared[self.SHR_HOLD+addr]
-      if (val>>15) & 1: val= val-65536
-      return val
-    if typ=='dint':
-      return self.shared[self.SHR_HOLD+addr]+self.shared[self.SHR_HOLD+addr+1]*65536
-    if typ=='bool':
-      return self.shared[self.SHR_COIL+addr]==1
-    if typ=='str':
-      st= ''
-      for c in range(8):
-        chs= self.shared[self.SHR_HOLD+addr+c]
-        ch= chs>>8
-        if ch==0: return st
-        st= st+chr(ch)
-        ch= chs&0xFF
-        if ch==0: return st
-        st= st+chr(ch)
-      return st
-    if typ=='dattm':
-      m= self.shared[self.SHR_HOLD+addr+1]
-      if m<0 or m>11: m= 0
-      month= ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'][m]
-      return '{:02d}{}{:02d} {:02d}:{:02d}:{:02d}'.format(self.shared[self.SHR_HOLD+addr+2],month,self.shared[self.SHR_HOLD+addr],self.shared[self.SHR_HOLD+addr+3],self.shared[self.SHR_HOLD+addr+4],self.shared[self.SHR_HOLD+addr+5])
-    if typ=='date':
-      m= self.shared[self.SHR_HOLD+addr+1]
-      if m<0 or m>11: m= 0
-      month= ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'][m]
-      return '{:02d}{}{:02d}'.format(self.shared[self.SHR_HOLD+addr+2],month,self.shared[self.SHR_HOLD+addr])
-    if typ=='time':
-      return '{:02d}:{:02d}:{:02d}'.format(self.shared[self.SHR_HOLD+addr],self.shared[self.SHR_HOLD+addr+1],self.shared[self.SHR_HOLD+addr+2])
-    if typ=='hour':
-      return '{:02d}:{:02d}'.format(self.shared[self.SHR_HOLD+addr],self.shared[self.SHR_HOLD+addr+1])
-    # if no implemented type
-    self.error= True
-    self.message= 'No such type {}'.format(typ)
-    return None
+    if typ=='bool': return [self.snap['coil'][addr]]
+    return self.snap['hold'][addr:addr+self.TYPE_WORDS.get(typ,1)].tolist()
 
   def write(self,reg,value):
+    if self.ctrl==None:
+      self.error= True
+      self.message= 'Controller is not open'
+      return False
     if not reg in self.ctrlRegs:
       self.error= True
       self.message= 'Bad register name {}'.format(reg)
@@ -732,12 +1280,6 @@ class SymbCtrl():
       self.error= True
       self.message= 'Register {} not writable'.format(reg)
       return False
-    for w in range(50):
-      if self.shared[self.SHR_CMD]!=self.CMD_NONE: time.sleep(0.01)
-    if self.shared[self.SHR_CMD]!=self.CMD_NONE:
-      self.error= True
-      self.message= 'Controller write queue busy'
-      return False
     typ=  self.ctrlRegs[reg]['type']
     addr= self.ctrlRegs[reg]['addr']
     if typ=='bool':
@@ -745,16 +1287,13 @@ class SymbCtrl():
         self.error= True
         self.message= 'Value not boolean for {}'.format(reg)
         return False
-      self.shared[self.SHR_ADDR]=  addr
-      self.shared[self.SHR_COUNT]= 1
-      if value: self.shared[self.SHR_DATA]=  1
-      else:     self.shared[self.SHR_DATA]=  0
-      self.shared[self.SHR_CMD]= self.CMD_COIL
+      if value: data= [1]
+      else:     data= [0]
+      if not self.queueWrite(self.CMD_COIL,addr,data): return False
       # write into shared data to show immediate change
-      if value: self.shared[self.SHR_COIL+addr]=  1
-      else:     self.shared[self.SHR_COIL+addr]=  0
-      self.error= False
-      self.message= 'No error'
+      self.coil[addr]= data[0]
+      if reg in self.codec.slot: self.slots['bool'][self.codec.slot[reg][1]]= value
+      if not self.frozen: self.snap= None
       return True
     if typ=='int':
       if not isinstance(value,int):
@@ -766,13 +1305,7 @@ class SymbCtrl():
         self.message= 'Value {:d} out of range for 16bit integer'.format(value)
         return False
       if (value & (1<<15))!=0: value= (value-(1<<16)) & 65535 #convert to two's complement
-      self.shared[self.SHR_ADDR]=  addr
-      self.shared[self.SHR_COUNT]= 1
-      self.shared[self.SHR_DATA]=  value
-      self.shared[self.SHR_CMD]=   self.CMD_HOLD
-      self.error= False
-      self.message= 'No error'
-      return True
+      return self.queueWrite(self.CMD_HOLD,addr,[value])
     if typ=='uint':
       if not isinstance(value,int):
         self.error= True
@@ -782,13 +1315,7 @@ class SymbCtrl():
         self.error= True
         self.message= 'Value {:d} out of range for unsigned integer'.format(value)
         return False
-      self.shared[self.SHR_ADDR]=  addr
-      self.shared[self.SHR_COUNT]= 1
-      self.shared[self.SHR_DATA]=  value
-      self.shared[self.SHR_CMD]=   self.CMD_HOLD
-      self.error= False
-      self.message= 'No error'
-      return True
+      return self.queueWrite(self.CMD_HOLD,addr,[value])
     if typ=='dint':
       if not isinstance(value,int):
         self.error= True
@@ -798,48 +1325,109 @@ class SymbCtrl():
         self.error= True
         self.message= 'Value {:d} out of range for 32bit integer'.format(value)
         return False
-      self.shared[self.SHR_ADDR]=   addr
-      self.shared[self.SHR_COUNT]=  2
-      self.shared[self.SHR_DATA]=  (value>>16)&0xffff
-      self.shared[self.SHR_DATA+1]= value&0xffff
-      self.shared[self.SHR_CMD]=    self.CMD_HOLD
-      self.error= False
-      self.message= 'No error'
-      return True
+      return self.queueWrite(self.CMD_HOLD,addr,[(value>>16)&0xffff,value&0xffff])
     if typ=='float':
       if not (isinstance(value,(float,int))):
         self.error= True
         self.message= 'Value not float for {}'.format(reg)
         return False
       vals= utils.long_list_to_word([utils.encode_ieee(value)],big_endian=False)
-      self.shared[self.SHR_ADDR]=    addr
-      self.shared[self.SHR_COUNT]=   2
-      self.shared[self.SHR_DATA]=    vals[0]
-      self.shared[self.SHR_DATA+1]=  vals[1]
-      self.shared[self.SHR_CMD]=     self.CMD_HOLD
-      self.error= False
-      self.message= 'No error'
-      return True
+      return self.queueWrite(self.CMD_HOLD,addr,vals)
     if typ=='str':
       if not isinstance(value,str):
         self.error= True
         self.message= 'Value not str for {}'.format(reg)
         return False
-      self.shared[self.SHR_ADDR]=  addr
-      self.shared[self.SHR_COUNT]= 8
+      data= []
       for pos in range(8):
         word= 0
         if pos*2<len(value):   word= ord(value[pos*2])*256
         if pos*2+1<len(value): word= word+ord(value[pos*2+1])
-        self.shared[self.SHR_DATA+pos]= word
-      self.shared[self.SHR_CMD]= self.CMD_HOLD
-      self.error= False
-      self.message= 'No error'
-      return True
+        data.append(word)
+      return self.queueWrite(self.CMD_HOLD,addr,data)
     self.error= True
     self.message= 'Unknown type for writing'
     return False
 
+  # fill the slot at the head of the write queue, then advance the head
+  def queueWrite(self,cmd,addr,data):
+    head= self.shared[self.SHR_HEAD]
+    if (head+1)%self.QUE_SIZE==self.shared[self.SHR_TAIL]:
+      self.shared[self.SHR_EFULL]+= 1
+      self.error= True
+      self.message= 'Controller write queue full'
+      return False
+    self.ticket= self.ticket%0x7fffffff+1
+    slot= self.SHR_QUE+head*self.SLOT_SIZE
+    self.shared[slot+self.SLOT_CMD]=    cmd
+    self.shared[slot+self.SLOT_ADDR]=   addr
+    self.shared[slot+self.SLOT_COUNT]=  len(data)
+    self.shared[slot+self.SLOT_TICKET]= self.ticket
+    self.shared[slot+self.SLOT_STAMP]=  msStamp()
+    for i,word in enumerate(data):
+      self.shared[slot+self.SLOT_DATA+i]= word
+    stat= self.SHR_STAT+(self.ticket%self.STAT_SIZE)*2
+    self.shared[stat]=   self.ticket
+    self.shared[stat+1]= self.WR_PENDING
+    self.shared[self.SHR_HEAD]= (head+1)%self.QUE_SIZE
+    self.wake.set()
+    self.error= False
+    self.message= 'No error'
+    return True
+
+  def cpuTime(self):
+    if self.ctrl==None: return None
+    return self.shared[self.SHR_CPU]/1000
+
+  def health(self):
+    if self.ctrl==None: return None
+    return {'state':self.HEALTH_TEXT[self.shared[self.SHR_HEALTH]],
+            'fails':self.shared[self.SHR_FAILS]}
+
+  def scanStats(self):
+    if self.ctrl==None or self.stats==None: return None
+    return self.stats.read()
+
+  # metrics of every controller, reads each unit without selecting it so an
+  # exporter thread never disturbs the GUI
+  def metrics(self):
+    devices= {}
+    if self.ctrl==None: return devices
+    for unit in list(self.fleetUnits.values()):
+      shared= unit['shared']
+      try:
+        stats= None
+        if unit['stats']!=None: stats= unit['stats'].read()
+      except ValueError: # released by close() meanwhile
+        continue
+      age= None
+      if shared[self.SHR_GOOD]>=0: age= ((msStamp()-shared[self.SHR_GOOD])&0x7fffffff)/1000
+      devices[unit['ipAddr']]= {
+        'valid': int(shared[self.SHR_VALID]==self.DAT_VALID),
+        'health':shared[self.SHR_HEALTH],
+        'errors':{name:shared[self.ERR_COUNT[code]] for code,name in self.ERR_NAME.items()},
+        'age':   age,
+        'queue': (shared[self.SHR_HEAD]-shared[self.SHR_TAIL])%self.QUE_SIZE,
+        'stats': stats}
+    return devices
+
+  def writeStatus(self,ticket):
+    if self.ctrl==None: return None
+    stat= self.SHR_STAT+(ticket%self.STAT_SIZE)*2
+    if self.shared[stat]!=ticket: return None
+    return self.WR_TEXT.get(self.shared[stat+1])
+
+  def queueStats(self):
+    if self.ctrl==None: return None
+    return {'depth':     (self.shared[self.SHR_HEAD]-self.shared[self.SHR_TAIL])%self.QUE_SIZE,
+            'size':      self.QUE_SIZE-1,
+            'written':   self.shared[self.SHR_WDONE],
+            'failed':    self.shared[self.SHR_WFAIL],
+            'merged':    self.shared[self.SHR_WMERGE],
+            'dropped':   self.shared[self.SHR_WDROP],
+            'latency':   self.shared[self.SHR_LAT],
+            'maxLatency':self.shared[self.SHR_LATMAX]}
+
   def textValue(self,chan,size,unit):
     if size<8: size= 8
     if unit: width= size-4
@@ -10,6 +10,8 @@
 #  - alterations all through code to support new controller handler
 #  - added support for echo mode on logic gate
 #  - added support for time limited command
+#  17Oct2026
+#  - scan timing summary and a window with the timing of each scan phase
 #
 #-- includes ------------------------------------------------------------------
 import os
@@ -77,6 +79,8 @@ class Misc(tk.Frame):
       {'reg':'ToDOutput4',      'form':'ochan', 'col':9, 'row':3, 'span':1, 'width':0, 'font':1,'just':'l','value':None               },
       {'reg':None,              'form':'label', 'col':10,'row':2, 'span':1, 'width':1, 'font':1,'just':'l','value':'Active'           },
       {'reg':'ToDActive',       'form':'indtf', 'col':10,'row':3, 'span':1, 'width':48,'font':0,'just':'l','value':False              },
+      {'reg':None,              'form':'stats', 'col':1, 'row':4, 'span':4, 'width':0, 'font':1,'just':'l','value':'Scan timing off'  },
+      {'reg':None,              'form':'timing','col':5, 'row':4, 'span':2, 'width':6, 'font':1,'just':'l','value':'Timing'           },
       {'reg':None,              'form':'space', 'col':8, 'row':4, 'span':1, 'width':12,'font':1,'just':'l','value':None               },
       {'reg':None,              'form':'space', 'col':9, 'row':4, 'span':1, 'width':12,'font':1,'just':'l','value':None               },
       {'reg':None,              'form':'sephz', 'col':1, 'row':5, 'span':10,'width':0, 'font':0,'just':'n','value':None               },
@@ -111,6 +115,7 @@ class Misc(tk.Frame):
       {'reg':'LogicGateResult', 'form':'indtf', 'col':9, 'row':11,'span':1, 'width':0, 'font':0,'just':'r','value':False              }]
     tk.Frame.__init__(self,master=parent)
     self.controller= controller
+    self.timingWin=  None
     self.grid()  
     self.createWidgets()
 
@@ -130,7 +135,7 @@ class Misc(tk.Frame):
     #place widgets
     for wid in self.widgets:
       newWid= None
-      if wid['form']=='label' or wid['form']=='time':
+      if wid['form']=='label' or wid['form']=='time' or wid['form']=='stats':
         newWid= tk.Label(self,text=wid['value'],width=wid['width'])
         newWid.grid (column=wid['col'],row=wid['row'],columnspan=wid['span'],padx=padX,pady=padY,sticky=tk.W+tk.E)
       if wid['form']=='sephz':
@@ -154,6 +159,9 @@ class Misc(tk.Frame):
       if wid['form']=='button':
         newWid= tk.Button(self,image=self.setButton,command=partial(self.set,wid['reg']),height=16,width=wid['width'],relief=tk.FLAT,state=tk.DISABLED)
         newWid.grid (column=wid['col'],row=wid['row'],columnspan=wid['span'],padx=padX,pady=padY,sticky=tk.W+tk.E)
+      if wid['form']=='timing':
+        newWid= tk.Button(self,text=wid['value'],command=self.showTiming,width=wid['width'],state=tk.DISABLED)
+        newWid.grid (column=wid['col'],row=wid['row'],columnspan=wid['span'],padx=padX,pady=padY,sticky=tk.W)
       if wid['form']=='entry':
         newWid= tk.Entry(self,width=wid['width'],state=tk.DISABLED)
         newWid.grid (column=wid['col'],row=wid['row'],columnspan=wid['span'],padx=padX,pady=padY,sticky=tk.W+tk.E)
@@ -288,13 +296,36 @@ class Misc(tk.Frame):
             else:
               self.delegates['EventLog']('Write error to {}! {}'.format(reg,self.controller.message),True)
 
+  # scan timing window, refreshed with the tab
+  def showTiming(self):
+    if self.timingWin!=None and self.timingWin.winfo_exists():
+      self.timingWin.lift()
+      return
+    self.timingWin= ScanTiming(self)
+    self.timingWin.show(self.controller.scanStats())
+
   #-- external methods --------------------------------------------------------
 
   def setDelegates(self,funcList):
     self.delegates= funcList
 
   def update(self):
+    stats= self.controller.scanStats()
+    if self.timingWin!=None and self.timingWin.winfo_exists():
+      self.timingWin.show(stats)
     for wid in self.widgets:
+      if wid['form']=='stats':
+        if stats==None:
+          wid['widget'].configure(text='Scan timing off')
+        elif 'scan' not in stats['phases']:
+          wid['widget'].configure(text='Scan --')
+        else:
+          wid['widget'].configure(text='Scan {:.1f}ms, {:d} failed'.format(stats['phases']['scan']['last'],stats['failures']))
+      if wid['form']=='timing':
+        if stats==None:
+          wid['widget'].configure(state=tk.DISABLED)
+        else:
+          wid['widget'].configure(state=tk.NORMAL)
       if wid['form']=='int' or wid['form']=='dint':
         if not self.controller.valid():
           wid['widget'].configure(text='--',state=tk.DISABLED)
@@ -418,4 +449,30 @@ class Misc(tk.Frame):
         else:
           wid['widget'].configure(state=tk.DISABLED)
 
+#------------------------------------------------------------------------------
+#  Scan Timing Window
+#
+#  - timing of each phase of the controller scan, times in ms
+#
+#------------------------------------------------------------------------------
+class ScanTiming(tk.Toplevel):
+
+  def __init__(self, parent):
+    tk.Toplevel.__init__(self,parent)
+    self.title('Scan Timing')
+    self.resizable(width=False, height=False)
+    self.text= tk.Label(self,text='',font=('Courier','10'),justify=tk.LEFT,anchor=tk.W)
+    self.text.grid (column=0,row=0,padx=8,pady=8)
+
+  def show(self,stats):
+    if stats==None:
+      self.text.configure(text='Scan timing off')
+      return
+    lines= ['{:d} scans  {:d} failed  {:d} retries'.format(stats['scans'],stats['failures'],stats['retries']),'',
+            '{:8s} {:>8s} {:>8s} {:>8s} {:>8s} {:>8s} {:>8s}'.format('Phase','Count','Last','Min','Mean','P95','Max')]
+    for name,phase in stats['phases'].items():
+      lines.append('{:8s} {:8d} {:8.2f} {:8.2f} {:8.2f} {:8.2f} {:8.2f}'.format(
+        name,phase['count'],phase['last'],phase['min'],phase['mean'],phase['p95'],phase['max']))
+    self.text.configure(text='\n'.join(lines))
+
 #-- End misc.py ---------------------------------------------------------------
@@ -9,6 +9,8 @@
 #
 # 25Aug2024 A. Cooper v0.1
 #  - initial version
+# 17Oct2026
+#  - controller health changes are reported in the event log
 #
 #------------------------------------------------------------------------------
 verStr= 'Weather v0.1'   
@@ -58,6 +60,7 @@ sys.path.append(libPath)
 #-- includes ------------------------------------------------------------------
 from config import loadConfig
 import symbCtrlModbus
+import CtrlHealth
 
 #------------------------------------------------------------------------------
 #  Weather GUI
@@ -86,6 +89,7 @@ class Application(tk.Frame):
     root.protocol("WM_DELETE_WINDOW",self.done)
     # setup modbus
     self.controller= symbCtrlModbus.SymbCtrl()
+    CtrlHealth.setReport(lambda text: self.logEvent(text,True))
     # running
     self.logEvent('{} started'.format(verStr),True)
     self.device= ModbusClient(debug=verbose)
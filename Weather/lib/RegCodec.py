@@ -0,0 +1,163 @@
+#------------------------------------------------------------------------------
+#  Register Codec
+#
+#  - Decode a whole SymbCtrl register map in a few struct operations
+#
+#  External notes...
+#  - RegCodec(regs,holdSize,coilSize) compiles a register map into a decode
+#    plan, regs is a dict of name:{'addr','mode','type'} as kept in ctrlRegs
+#    by the controller classes, registers with mode 'w', of an unknown type
+#    or reaching past holdSize or coilSize are left out
+#  - RegCodec.decode(hold,coil) decodes every register in the plan and
+#    returns a dict of name:value
+#      hold:  holding registers by address, a list, or an array('H') or
+#             memoryview cast to 'H'
+#      coil:  coils by address, a list of bools, bytes or memoryview
+#  - RegCodec.names  set of register names in the plan
+#  - types decoded
+#      uint, int:   16bit unsigned and signed integer
+#      dint:        32bit unsigned integer, low word first
+#      float:       IEEE-754 32bit floating point, low word first
+#      bool:        coil
+#      str:         up to 16 characters, high byte first, ends at a zero
+#      time, hour:  hh:mm:ss and hh:mm from consecutive words
+#      date, dattm: ddMmmyy and ddMmmyy hh:mm:ss, the month word is 0 to 11
+#
+#  Internal notes...
+#  - registers of one type are sorted by address and packed into a single
+#    struct format with pad bytes over the addresses between them, so one
+#    unpack_from decodes every register of that type, overlapping registers
+#    go into another pass
+#  - numeric types unpack from the little-endian image of the holding
+#    registers, strings from the big-endian image so the high byte of each
+#    word comes first
+#  - values from every pass are collected in one flat list in plan order
+#    and zipped with the register names into the result
+#  - only strings and the multi-word text types are formatted per register
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import struct
+import sys
+from array import array
+
+#-- constants -----------------------------------------------------------------
+MONTHS= ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+# struct code, bytes and source image for each type
+TYPE_CODE= {'uint': ('H',  2, 'le'),
+            'int':  ('h',  2, 'le'),
+            'dint': ('I',  4, 'le'),
+            'float':('f',  4, 'le'),
+            'str':  ('16s',16,'be'),
+            'time': ('3H', 6, 'le'),
+            'hour': ('2H', 4, 'le'),
+            'date': ('3H', 6, 'le'),
+            'dattm':('6H',12, 'le'),
+            'bool': ('?',  1, 'coil')}
+
+#-- formatting ----------------------------------------------------------------
+
+def fmtStr(raw):
+  return raw.split(b'\0',1)[0].decode('latin-1')
+
+def fmtTime(w):
+  return '{:02d}:{:02d}:{:02d}'.format(w[0],w[1],w[2])
+
+def fmtHour(w):
+  return '{:02d}:{:02d}'.format(w[0],w[1])
+
+def fmtDate(w):
+  m= w[1]
+  if m>11: m= 0
+  return '{:02d}{}{:02d}'.format(w[2],MONTHS[m],w[0])
+
+def fmtDattm(w):
+  m= w[1]
+  if m>11: m= 0
+  return '{:02d}{}{:02d} {:02d}:{:02d}:{:02d}'.format(w[2],MONTHS[m],w[0],w[3],w[4],w[5])
+
+# per register formatting and the number of values each register unpacks to
+TYPE_FMT= {'str':(fmtStr,1),'time':(fmtTime,3),'hour':(fmtHour,2),'date':(fmtDate,3),'dattm':(fmtDattm,6)}
+
+#------------------------------------------------------------------------------
+#  RegCodec Class
+#
+#  - compiled decode plan for one register map
+#
+#------------------------------------------------------------------------------
+class RegCodec():
+
+  def __init__(self,regs,holdSize,coilSize):
+    self.holdSize= holdSize
+    self.coilSize= coilSize
+    self.names=    set()
+    self.order=    []
+    self.strings=  False
+    # group readable registers by type
+    groups= {}
+    for name,reg in regs.items():
+      if reg['mode']=='w' or reg['type'] not in TYPE_CODE: continue
+      code,size,src= TYPE_CODE[reg['type']]
+      if src=='coil': start,limit= reg['addr'],coilSize
+      else:           start,limit= reg['addr']*2,holdSize*2
+      if start<0 or start+size>limit: continue
+      groups.setdefault(reg['type'],[]).append((start,name))
+      self.names.add(name)
+      if src=='be': self.strings= True
+    # one struct per type, more where registers overlap
+    self.plans= []
+    for typ,items in groups.items():
+      code,size,src= TYPE_CODE[typ]
+      items.sort()
+      while len(items)>0:
+        fmt=   '<'
+        names= []
+        rest=  []
+        end=   0
+        for start,name in items:
+          if start<end:
+            rest.append((start,name))
+            continue
+          if start>end: fmt+= '{:d}x'.format(start-end)
+          fmt+= code
+          names.append(name)
+          end= start+size
+        self.plans.append((struct.Struct(fmt),src,TYPE_FMT.get(typ)))
+        self.order+= names
+        items= rest
+
+  # holding register images, little-endian and big-endian words
+  def images(self,hold):
+    if isinstance(hold,(memoryview,array)): native= hold.tobytes()
+    else: native= array('H',hold).tobytes()
+    swapped= None
+    if self.strings or sys.byteorder=='big':
+      words= array('H',native)
+      words.byteswap()
+      swapped= words.tobytes()
+    if sys.byteorder=='little': return native,swapped
+    return swapped,native
+
+  def decode(self,hold,coil):
+    le,be= self.images(hold)
+    bufs= {'le':le,'be':be,'coil':bytes(coil)}
+    out= []
+    for st,src,post in self.plans:
+      vals= st.unpack_from(bufs[src])
+      if post==None:
+        out+= vals
+        continue
+      func,count= post
+      if count==1: out+= map(func,vals)
+      else:        out+= map(func,zip(*[iter(vals)]*count))
+    return dict(zip(self.order,out))
+
+#-- end RegCodec --------------------------------------------------------------
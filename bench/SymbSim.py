@@ -0,0 +1,327 @@
+#------------------------------------------------------------------------------
+#  SymbCtrl Simulator
+#
+#  - Loopback Modbus TCP stand-in for a fleet of SymbCtrl controllers, many
+#    simulated controllers served from one process for benchmarks and tests
+#    without hardware
+#
+#  Usage...
+#  - python SymbSim.py [-n count] [--base 127.1.0.1] [--port 5020]
+#                      [--latency ms] [--jitter ms] [--error rate]
+#                      [--drop rate] [--close rate] [--down count] [--seed n]
+#      count:    controllers simulated, each on its own address counting up
+#                from base, default 1
+#      port:     Modbus port of every controller, 502 needs root on Linux
+#      latency:  response time of each request in ms
+#      jitter:   random extra response time up to jitter ms
+#      error:    fraction of requests answered with exception 4
+#      drop:     fraction of requests never answered, the connection is
+#                closed after hangTime seconds
+#      close:    fraction of requests that close the connection at once
+#      down:     controllers at the end of the range that are not served,
+#                connecting to them is refused
+#    Ctrl-C stops the simulator, request counts are printed every 10s
+#
+#  External notes...
+#  - fleet= SimFleet(count,...) takes the same settings as keywords,
+#    fleet.start() serves the fleet from a background thread and returns
+#    once every controller is listening, fleet.stop() ends it
+#  - fleet.ctrls     the SimCtrl of every served controller
+#  - fleet.hosts     (host,port) of every controller, down ones included
+#  - SimCtrl.hold, SimCtrl.coil  the register image, may be changed while
+#    served, SimCtrl.set(reg,value) sets one register by name
+#  - SimCtrl.requests, SimCtrl.faults  requests answered and faults injected
+#  - the register map is SymbCtrlScan.SymbCtrl.ctrlRegs, the full mk2 map,
+#    with HOLD_SIZE holding registers and COIL_SIZE coils as in the firmware
+#      'r' registers ignore writes, 'w' registers read as zero, as the
+#      controller firmware does, addresses past the map answer exception 2
+#      addresses not in the map read and write as plain memory
+#  - registers start at fixed values by type, strings hold the register
+#    name and ControlName the controller name, so every decode is checkable
+#
+#  Internal notes...
+#  - each controller is an MBServer from MBProxy/lib with a SimCtrl as its
+#    handler, all share one event loop
+#  - a controller answers one request at a time, the latency is awaited
+#    under its lock so concurrent clients queue as on the hardware
+#  - the open file limit is raised to the hard limit at start, every
+#    listener and connection takes a descriptor
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import os
+import sys
+import time
+import random
+import struct
+import asyncio
+import argparse
+import ipaddress
+import threading
+
+#-- globals -------------------------------------------------------------------
+localDir= os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(localDir,'..','MBProxy','lib'))
+sys.path.append(os.path.join(localDir,'..','SyView','lib'))
+
+#-- local libraries -----------------------------------------------------------
+from MBServer import MBServer,MBError,EX_ADDRESS,EX_FAILURE
+import SymbCtrlScan
+
+#-- constants -----------------------------------------------------------------
+hangTime= 30    # seconds a dropped request holds its connection
+statTime= 10    # seconds between request count reports
+
+# words taken by each register type
+TYPE_WORDS= {'uint':1,'int':1,'dint':2,'float':2,'str':8,'time':3,'hour':2,'date':3,'dattm':6}
+
+# register words of a value
+def encode(typ,value):
+  if typ in ('uint','int'):
+    return [int(value)&0xFFFF]
+  if typ=='dint':
+    return [int(value)&0xFFFF,(int(value)>>16)&0xFFFF]
+  if typ=='float':
+    return list(struct.unpack('<2H',struct.pack('<f',value)))
+  if typ=='str':
+    raw= str(value).encode('latin-1','replace')[:15].ljust(16,b'\0')
+    return list(struct.unpack('>8H',raw))
+  return [int(part) for part in value]
+
+#------------------------------------------------------------------------------
+#  SimCtrl Class
+#
+#  - one simulated controller, the MBServer handler
+#
+#------------------------------------------------------------------------------
+class SimCtrl():
+  regs=     SymbCtrlScan.SymbCtrl.ctrlRegs
+  holdSize= SymbCtrlScan.SymbCtrl.HOLD_SIZE
+  coilSize= SymbCtrlScan.SymbCtrl.COIL_SIZE
+
+  def __init__(self,name,settings,rand):
+    self.name=     name
+    self.settings= settings
+    self.rand=     rand
+    self.lock=     asyncio.Lock()
+    self.requests= 0
+    self.faults=   0
+    # read and write permission of each word, unmapped words are plain memory
+    self.holdRead=  [True]*self.holdSize
+    self.holdWrite= [True]*self.holdSize
+    self.coilRead=  [True]*self.coilSize
+    self.coilWrite= [True]*self.coilSize
+    mapped= set()
+    for reg in self.regs.values():
+      if reg['type']=='bool':
+        span,read,write= [reg['addr']],self.coilRead,self.coilWrite
+      elif reg['type'] in TYPE_WORDS:
+        span,read,write= range(reg['addr'],reg['addr']+TYPE_WORDS[reg['type']]),self.holdRead,self.holdWrite
+      else: continue
+      for addr in span:
+        if addr>=len(read): continue
+        key= (id(read),addr)
+        if key not in mapped:
+          read[addr]=  False
+          write[addr]= False
+          mapped.add(key)
+        read[addr]=  read[addr] or reg['mode'] in ('r','rw')
+        write[addr]= write[addr] or reg['mode'] in ('w','rw')
+    # starting values
+    self.hold= [0]*self.holdSize
+    self.coil= [False]*self.coilSize
+    for reg,entry in self.regs.items():
+      typ= entry['type']
+      addr= entry['addr']
+      if typ=='bool':   value= addr%3==0
+      elif typ=='str':  value= reg
+      elif typ=='float':value= addr*0.25
+      elif typ=='dint': value= addr*1000
+      elif typ=='time': value= (12,34,56)
+      elif typ=='hour': value= (6,30)
+      elif typ=='date': value= (26,9,17)
+      elif typ=='dattm':value= (26,9,17,12,34,56)
+      else:             value= addr
+      self.set(reg,value)
+    self.set('ControlName',name)
+
+  def set(self,reg,value):
+    entry= self.regs[reg]
+    if entry['type']=='bool':
+      if entry['addr']<self.coilSize: self.coil[entry['addr']]= bool(value)
+      return
+    if entry['type'] not in TYPE_WORDS: return
+    words= encode(entry['type'],value)
+    addr= entry['addr']
+    if addr+len(words)<=self.holdSize: self.hold[addr:addr+len(words)]= words
+
+  # response time and injected faults of one request, caller holds the lock
+  async def respond(self):
+    self.requests+= 1
+    settings= self.settings
+    delay= settings['latency']
+    if settings['jitter']>0: delay+= self.rand.uniform(0,settings['jitter'])
+    if delay>0: await asyncio.sleep(delay)
+    roll= self.rand.random()
+    if roll<settings['error']:
+      self.faults+= 1
+      raise MBError(EX_FAILURE)
+    roll-= settings['error']
+    if roll<settings['drop']:
+      self.faults+= 1
+      await asyncio.sleep(hangTime)
+      raise ConnectionResetError()
+    roll-= settings['drop']
+    if roll<settings['close']:
+      self.faults+= 1
+      raise ConnectionResetError()
+
+  #-- MBServer handler --
+
+  async def readHold(self,addr,count):
+    async with self.lock:
+      await self.respond()
+      if addr+count>self.holdSize: raise MBError(EX_ADDRESS)
+      return [value if read else 0 for value,read in zip(self.hold[addr:addr+count],self.holdRead[addr:addr+count])]
+
+  async def readCoils(self,addr,count):
+    async with self.lock:
+      await self.respond()
+      if addr+count>self.coilSize: raise MBError(EX_ADDRESS)
+      return [value and read for value,read in zip(self.coil[addr:addr+count],self.coilRead[addr:addr+count])]
+
+  async def writeHold(self,addr,values):
+    async with self.lock:
+      await self.respond()
+      if addr+len(values)>self.holdSize: raise MBError(EX_ADDRESS)
+      for i,value in enumerate(values):
+        if self.holdWrite[addr+i]: self.hold[addr+i]= value
+      return True
+
+  async def writeCoils(self,addr,bits):
+    async with self.lock:
+      await self.respond()
+      if addr+len(bits)>self.coilSize: raise MBError(EX_ADDRESS)
+      for i,bit in enumerate(bits):
+        if self.coilWrite[addr+i]: self.coil[addr+i]= bit
+      return True
+
+#------------------------------------------------------------------------------
+#  SimFleet Class
+#
+#  - the simulated controllers and the event loop serving them
+#
+#------------------------------------------------------------------------------
+class SimFleet():
+
+  def __init__(self,count,base='127.1.0.1',port=5020,latency=0.0,jitter=0.0,error=0.0,drop=0.0,close=0.0,down=0,seed=None):
+    self.settings= {'latency':latency,'jitter':jitter,'error':error,'drop':drop,'close':close}
+    self.port=     port
+    self.down=     down
+    self.rand=     random.Random(seed)
+    self.hosts=    []
+    self.ctrls=    []
+    self.servers=  []
+    self.loop=     None
+    self.thread=   None
+    self.ready=    threading.Event()
+    self.failed=   None
+    addr= ipaddress.IPv4Address(base)
+    while len(self.hosts)<count:
+      if str(addr).split('.')[-1] not in ('0','255'):
+        self.hosts.append((str(addr),port))
+      addr+= 1
+
+  async def bind(self):
+    served= self.hosts[:len(self.hosts)-self.down]
+    for host,port in served:
+      ctrl= SimCtrl('Sim {}'.format(host),self.settings,self.rand)
+      server= MBServer(ctrl)
+      await server.listen(host,port)
+      self.ctrls.append(ctrl)
+      self.servers.append(server)
+
+  def close(self):
+    for server in self.servers:
+      server.close()
+    self.servers= []
+
+  # serve until cancelled, the command line entry
+  async def run(self):
+    await self.bind()
+    try:
+      while True:
+        await asyncio.sleep(statTime)
+        requests= sum(ctrl.requests for ctrl in self.ctrls)
+        faults=   sum(ctrl.faults for ctrl in self.ctrls)
+        print('{} {:10d} requests {:8d} faults'.format(time.strftime('%H:%M:%S'),requests,faults))
+    finally:
+      self.close()
+
+  def start(self):
+    raiseLimit()
+    self.thread= threading.Thread(target=self.serve,daemon=True)
+    self.thread.start()
+    self.ready.wait()
+    if self.failed!=None: raise self.failed
+
+  def serve(self):
+    self.loop= asyncio.new_event_loop()
+    try:
+      self.loop.run_until_complete(self.bind())
+    except OSError as err:
+      self.failed= err
+    self.ready.set()
+    if self.failed==None: self.loop.run_forever()
+    self.close()
+    self.loop.run_until_complete(asyncio.sleep(0))
+    self.loop.close()
+
+  def stop(self):
+    if self.thread==None: return
+    self.loop.call_soon_threadsafe(self.loop.stop)
+    self.thread.join()
+    self.thread= None
+
+# allow as many sockets as the system does
+def raiseLimit():
+  try:
+    import resource
+    soft,hard= resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft<hard: resource.setrlimit(resource.RLIMIT_NOFILE,(hard,hard))
+  except (ImportError,ValueError,OSError):
+    pass
+
+#-- main ----------------------------------------------------------------------
+
+if __name__=='__main__':
+  parser= argparse.ArgumentParser(description='SymbCtrl Modbus simulator')
+  parser.add_argument('-n','--count',type=int,default=1,help='controllers simulated')
+  parser.add_argument('--base',default='127.1.0.1',help='address of the first controller')
+  parser.add_argument('--port',type=int,default=5020,help='Modbus port')
+  parser.add_argument('--latency',type=float,default=0.0,help='response time in ms')
+  parser.add_argument('--jitter',type=float,default=0.0,help='random extra response time in ms')
+  parser.add_argument('--error',type=float,default=0.0,help='fraction of requests answered with an exception')
+  parser.add_argument('--drop',type=float,default=0.0,help='fraction of requests never answered')
+  parser.add_argument('--close',type=float,default=0.0,help='fraction of requests closing the connection')
+  parser.add_argument('--down',type=int,default=0,help='controllers not served')
+  parser.add_argument('--seed',type=int,default=None,help='random seed')
+  args= parser.parse_args()
+  fleet= SimFleet(args.count,args.base,args.port,args.latency/1000,args.jitter/1000,args.error,args.drop,args.close,args.down,args.seed)
+  print('Simulating {:d} controllers, {}:{:d} to {}:{:d}'.format(args.count,*fleet.hosts[0],*fleet.hosts[-1]))
+  raiseLimit()
+  try:
+    asyncio.run(fleet.run())
+  except OSError as err:
+    print('Unable to listen, {}'.format(err))
+  except KeyboardInterrupt:
+    print('Stopped')
+
+#-- end SymbSim ---------------------------------------------------------------
@@ -0,0 +1,166 @@
+#------------------------------------------------------------------------------
+#  Register Codec Benchmark
+#
+#  - Compare decoding a full SymbCtrl register map register by register, as
+#    SymbCtrlScan.read() and symbCtrlModbus.service() did, against the
+#    compiled RegCodec plan
+#  - also checks that both give the same values
+#
+#  Usage...
+#  - python codecBench.py [repeat]
+#      repeat:  number of full map decodes timed, default 2000
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import os
+import sys
+import math
+import timeit
+from array import array
+
+#-- globals -------------------------------------------------------------------
+localDir= os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(localDir,'..','SyView','lib'))
+sys.path.append(os.path.join(localDir,'..','SyCheck','lib'))
+
+#-- local libraries -----------------------------------------------------------
+from pyModbusTCP import utils
+from RegCodec import RegCodec
+import SymbCtrlScan
+import symbCtrlModbus
+
+#-- previous decoders ---------------------------------------------------------
+
+# SymbCtrlScan.read() type chain, one register
+def oldRead(regs,reg,hold,coil):
+  addr= regs[reg]['addr']
+  typ=  regs[reg]['type']
+  if typ=='float':
+    val= [hold[addr],hold[addr+1]]
+    val= utils.word_list_to_long(val,big_endian=False)
+    val= utils.decode_ieee(val[0])
+    return val
+  if typ=='uint':
+    return hold[addr]
+  if typ=='int':
+    val= hold[addr]
+    if (val>>15) & 1: val= val-65536
+    return val
+  if typ=='dint':
+    return hold[addr]+hold[addr+1]*65536
+  if typ=='bool':
+    return coil[addr]==1
+  if typ=='str':
+    st= ''
+    for c in range(8):
+      chs= hold[addr+c]
+      ch= chs>>8
+      if ch==0: return st
+      st= st+chr(ch)
+      ch= chs&0xFF
+      if ch==0: return st
+      st= st+chr(ch)
+    return st
+  if typ=='dattm':
+    m= hold[addr+1]
+    if m<0 or m>11: m= 0
+    month= ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'][m]
+    return '{:02d}{}{:02d} {:02d}:{:02d}:{:02d}'.format(hold[addr+2],month,hold[addr],hold[addr+3],hold[addr+4],hold[addr+5])
+  if typ=='date':
+    m= hold[addr+1]
+    if m<0 or m>11: m= 0
+    month= ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'][m]
+    return '{:02d}{}{:02d}'.format(hold[addr+2],month,hold[addr])
+  if typ=='time':
+    return '{:02d}:{:02d}:{:02d}'.format(hold[addr],hold[addr+1],hold[addr+2])
+  if typ=='hour':
+    return '{:02d}:{:02d}'.format(hold[addr],hold[addr+1])
+  return None
+
+# symbCtrlModbus.service() decode loop
+def oldService(regs,hold,coil):
+  for reg in regs.keys():
+    if regs[reg]['mode']=='w': continue
+    if regs[reg]['type']=='bool':
+      regs[reg]['value']= coil[regs[reg]['addr']]
+    if regs[reg]['type']=='int':
+      regs[reg]['value']= utils.get_list_2comp([hold[regs[reg]['addr']]],16)[0]
+    if regs[reg]['type']=='uint':
+      regs[reg]['value']= hold[regs[reg]['addr']]
+    if regs[reg]['type']=='dint':
+      regs[reg]['value']= hold[regs[reg]['addr']]+(hold[regs[reg]['addr']+1]*65536)
+    if regs[reg]['type']=='float':
+      regs[reg]['value']= utils.decode_ieee(utils.word_list_to_long([hold[regs[reg]['addr']],hold[regs[reg]['addr']+1]],big_endian=False)[0])
+    if regs[reg]['type']=='str':
+      st= ''
+      addr= regs[reg]['addr']
+      for pos in range(8):
+        ch= hold[addr+pos]>>8
+        if ch==0: break
+        st= st+chr(ch)
+        ch= hold[addr+pos]&0xFF
+        if ch==0: break
+        st= st+chr(ch)
+      regs[reg]['value']= st
+    if regs[reg]['type']=='time':
+      regs[reg]['value']= '{:02d}:{:02d}:{:02d}'.format(hold[regs[reg]['addr']],hold[regs[reg]['addr']+1],hold[regs[reg]['addr']+2])
+    if regs[reg]['type']=='hour':
+      regs[reg]['value']= '{:02d}:{:02d}'.format(hold[regs[reg]['addr']],hold[regs[reg]['addr']+1])
+
+#-- benchmark -----------------------------------------------------------------
+
+def same(a,b):
+  if isinstance(a,float) and isinstance(b,float):
+    return a==b or (math.isnan(a) and math.isnan(b))
+  return a==b
+
+def run(repeat):
+  results= []
+  # scanner map, snapshot shaped data
+  scan= SymbCtrlScan.SymbCtrl
+  holdVals= [(i*7919+0x4100)&0xffff for i in range(scan.HOLD_SIZE)]
+  for i in range(0,scan.HOLD_SIZE,9): holdVals[i]&= 0x7f7f # strings end inside the block
+  hold= memoryview(array('H',holdVals).tobytes()).cast('H')
+  coil= bytes([i%3==0 for i in range(scan.COIL_SIZE)])
+  readable= [reg for reg in scan.ctrlRegs if reg in scan.codec.names]
+  new= scan.codec.decode(hold,coil)
+  bad= [reg for reg in readable if not same(oldRead(scan.ctrlRegs,reg,hold,coil),new[reg])]
+  if len(bad)>0: print('  SymbCtrlScan mismatch {}'.format(bad))
+  def scanOld():
+    for reg in readable: oldRead(scan.ctrlRegs,reg,hold,coil)
+  def scanNew():
+    scan.codec.decode(hold,coil)
+  results.append(('read() chain, {:d} regs'.format(len(readable)),scanOld))
+  results.append(('RegCodec.decode()',scanNew))
+  # service map, pyModbusTCP list shaped data
+  ctrl= symbCtrlModbus.SymbCtrl
+  holdList= holdVals[:ctrl.holdSize]
+  coilList= [i%3==0 for i in range(ctrl.coilSize)]
+  oldService(ctrl.ctrlRegs,holdList,coilList)
+  new= ctrl.codec.decode(holdList,coilList)
+  bad= [reg for reg in new if not same(ctrl.ctrlRegs[reg]['value'],new[reg])]
+  if len(bad)>0: print('  symbCtrlModbus mismatch {}'.format(bad))
+  def serviceOld():
+    oldService(ctrl.ctrlRegs,holdList,coilList)
+  def serviceNew():
+    for reg,value in ctrl.codec.decode(holdList,coilList).items():
+      ctrl.ctrlRegs[reg]['value']= value
+  results.append(('service() loop, {:d} regs'.format(len(new)),serviceOld))
+  results.append(('service() with RegCodec',serviceNew))
+  return [(name,min(timeit.repeat(func,number=repeat,repeat=3))/repeat) for name,func in results]
+
+if __name__=='__main__':
+  repeat= 2000
+  if len(sys.argv)>1: repeat= int(sys.argv[1])
+  print('Register decode benchmark, full map per pass')
+  for name,secs in run(repeat):
+    print('  {:28s} {:8.2f}us'.format(name,secs*1e6))
+
+#-- end codecBench ------------------------------------------------------------
@@ -0,0 +1,347 @@
+#------------------------------------------------------------------------------
+#  Scanner Benchmark
+#
+#  - Measure the scanners against simulated controllers from SymbSim
+#      scan:    full map scans per second of SymbCtrlScan in fleet mode and
+#               MBScanner with both engines, for each device count
+#      read:    SymbCtrlScan.read() cost per call by register type
+#      write:   time from SymbCtrlScan.write() until read() returns the
+#               value written
+#      service: symbCtrlModbus.service() duration
+#  - results are written as JSON with the machine and commit, so runs can be
+#    compared across commits
+#
+#  Usage...
+#  - python scanBench.py [--only scan,read,write,service] [--counts 1,10,...]
+#                        [--window s] [--latency ms] [--port n] [--sims n]
+#                        [--out file] [--baseline file] [--tolerance t]
+#      counts:     device counts for the scan rates, default 1,10,50,100,500
+#      window:     seconds each scan rate is measured over, default 5
+#      latency:    simulated controller response time in ms, default 0
+#      sims:       processes serving the simulated controllers, default the
+#                  number of processors
+#      out:        result file, default scanBench-<commit>.json
+#      baseline:   earlier result file, metrics worse than it by more than
+#                  tolerance (default 0.1, 10%) are listed and the exit code
+#                  is 1
+#
+#  Notes...
+#  - SymbCtrlScan scans every 0.1s and MBScanner every 1s, their fastest,
+#    each rate is also given as a fraction of that ideal
+#  - the process engine of MBScanner runs one subprocess per device and is
+#    only measured up to PROC_MAX devices
+#  - the simulators share the machine with the scanners, at high device
+#    counts the rates include their load
+#  - result file layout
+#      {'machine':{...},'settings':{...},
+#       'metrics':{<name>:{'value','unit','better'}}}
+#    better is 'higher' or 'lower'
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import timeit
+import platform
+import argparse
+import subprocess
+import statistics
+import datetime as dt
+from multiprocessing import Process,Event
+
+#-- globals -------------------------------------------------------------------
+localDir= os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(localDir,'..','SyView','lib'))
+sys.path.append(os.path.join(localDir,'..','MBMon','lib'))
+sys.path.append(os.path.join(localDir,'..','SyCheck','lib'))
+
+#-- local libraries -----------------------------------------------------------
+import SymbSim
+import SymbCtrlScan
+import MBScan
+import symbCtrlModbus
+
+#-- constants -----------------------------------------------------------------
+COUNTS=    [1,10,50,100,500]
+PROC_MAX=  50     # most devices scanned by the MBScanner process engine
+SCAN_FAST= 0.1    # SymbCtrlScan scan interval in seconds
+SCAN_MB=   1      # MBScanner scan interval in seconds
+WARM_TIME= 60     # longest wait in seconds for every device to have data
+
+#-- simulated controllers -----------------------------------------------------
+
+def simServe(count,base,port,latency,ready,stop):
+  fleet= SymbSim.SimFleet(count,base,port,latency)
+  fleet.start()
+  ready.set()
+  stop.wait()
+  fleet.stop()
+
+#------------------------------------------------------------------------------
+#  Sims Class
+#
+#  - a SymbSim fleet split over several processes
+#
+#------------------------------------------------------------------------------
+class Sims():
+
+  def __init__(self,count,port,latency,procs):
+    self.hosts= [host for host,port in SymbSim.SimFleet(count,port=port).hosts]
+    self.stop=  Event()
+    self.procs= []
+    size= -(-count//max(1,min(procs,count)))
+    for first in range(0,count,size):
+      ready= Event()
+      proc= Process(target=simServe,args=(min(size,count-first),self.hosts[first],port,latency,ready,self.stop),daemon=True)
+      proc.start()
+      self.procs.append((proc,ready))
+    for proc,ready in self.procs:
+      if not ready.wait(30): raise RuntimeError('Simulator did not start')
+
+  def close(self):
+    self.stop.set()
+    for proc,ready in self.procs:
+      proc.join(10)
+
+#-- measurements --------------------------------------------------------------
+
+def metric(results,name,value,unit,better):
+  results[name]= {'value':value,'unit':unit,'better':better}
+  print('  {:36s} {:12.3f} {}'.format(name,value,unit))
+
+def percentile(values,p):
+  values= sorted(values)
+  return values[min(len(values)-1,int(p*len(values)))]
+
+# wait for func(host) to be true for every host
+def warm(hosts,func):
+  end= time.monotonic()+WARM_TIME
+  while time.monotonic()<end:
+    if all(func(host) for host in hosts): return True
+    time.sleep(0.1)
+  return False
+
+# full map scans per second from the publish sequence of each device
+def seqRate(hosts,seqFunc,window):
+  start= {host:seqFunc(host) for host in hosts}
+  begin= time.monotonic()
+  time.sleep(window)
+  end= {host:seqFunc(host) for host in hosts}
+  return sum((end[host]-start[host])//2 for host in hosts)/(time.monotonic()-begin)
+
+def scanSymb(hosts,args):
+  scan= SymbCtrlScan.SymbCtrl()
+  scan.PORT= args.port
+  scan.startFleet(hosts)
+  try:
+    for host in hosts:
+      scan.select(host)
+      scan.scanInterval(SCAN_FAST)
+    def seq(host):
+      scan.select(host)
+      return scan.seq[0]
+    if not warm(hosts,lambda host: seq(host)>0): return None,None
+    cpu= scan.cpuTime()
+    rate= seqRate(hosts,seq,args.window)
+    cpu= scan.cpuTime()-cpu
+    return rate,cpu*1000/max(1,rate*args.window)
+  finally:
+    scan.close()
+
+# the SymbCtrl map as an MBScanner register list
+def mbMap(hosts,port):
+  kinds= {'float':'float','uint':'uint','int':'int','dint':'long','bool':'coil'}
+  data= []
+  for name,reg in SymbCtrlScan.SymbCtrl.ctrlRegs.items():
+    if reg['mode']=='w' or reg['type'] not in kinds and reg['type'] not in SymbSim.TYPE_WORDS: continue
+    if reg['type'] in kinds: items= [(name,reg['addr'],kinds[reg['type']])]
+    else: items= [('{}{:d}'.format(name,i),reg['addr']+i,'hold') for i in range(SymbSim.TYPE_WORDS[reg['type']])]
+    for host in hosts:
+      for item,addr,typ in items:
+        data.append({'ipAddr':host,'port':port,'name':item,'register':addr,'type':typ})
+  return data
+
+def scanMB(hosts,args,engine):
+  scan= MBScan.MBScanner()
+  scan.start(mbMap(hosts,args.port),SCAN_MB,engine)
+  try:
+    def seq(host):
+      snap= scan.snapshot(host)
+      if snap==None: return 0
+      return snap['seq']
+    if not warm(hosts,lambda host: seq(host)>0): return None
+    return seqRate(hosts,seq,args.window)
+  finally:
+    scan.close()
+
+def benchScan(results,args):
+  for count in args.counts:
+    print('Scan rates, {:d} devices'.format(count))
+    sims= Sims(count,args.port,args.latency/1000,args.sims)
+    try:
+      rate,cpu= scanSymb(sims.hosts,args)
+      if rate!=None:
+        metric(results,'scan.symbctrl.{:d}.rate'.format(count),rate,'scans/s','higher')
+        metric(results,'scan.symbctrl.{:d}.ideal'.format(count),rate*SCAN_FAST/count,'ratio','higher')
+        metric(results,'scan.symbctrl.{:d}.cpu'.format(count),cpu,'ms/scan','lower')
+      else: print('  SymbCtrlScan had no data')
+      engines= ['async']
+      if count<=PROC_MAX: engines.append('process')
+      for engine in engines:
+        rate= scanMB(sims.hosts,args,engine)
+        if rate==None:
+          print('  MBScanner {} had no data'.format(engine))
+          continue
+        metric(results,'scan.mbscan.{}.{:d}.rate'.format(engine,count),rate,'scans/s','higher')
+        metric(results,'scan.mbscan.{}.{:d}.ideal'.format(engine,count),rate*SCAN_MB/count,'ratio','higher')
+    finally:
+      sims.close()
+
+def benchRead(results,args,host):
+  print('SymbCtrlScan.read() by register type')
+  scan= SymbCtrlScan.SymbCtrl()
+  scan.PORT= args.port
+  scan.start(host)
+  try:
+    if not warm([host],lambda host: scan.read('ModelName')!=None): return
+    types= {}
+    for name,reg in scan.ctrlRegs.items():
+      if reg['mode']!='w' and name in scan.codec.slot: types.setdefault(reg['type'],[]).append(name)
+    for typ,names in sorted(types.items()):
+      def readAll():
+        for name in names: scan.read(name)
+      loops= max(1,args.repeat//len(names))
+      secs= min(timeit.repeat(readAll,number=loops,repeat=3))/(loops*len(names))
+      metric(results,'read.{}'.format(typ),secs*1e6,'us','lower')
+  finally:
+    scan.close()
+
+def benchWrite(results,args,host):
+  print('SymbCtrlScan write until read back')
+  scan= SymbCtrlScan.SymbCtrl()
+  scan.PORT= args.port
+  scan.start(host)
+  try:
+    scan.scanInterval(SCAN_FAST)
+    if not warm([host],lambda host: scan.read('ModelName')!=None): return
+    reg= [name for name,entry in scan.ctrlRegs.items() if entry['mode']=='rw' and entry['type']=='float'][0]
+    times= []
+    for i in range(args.trials):
+      value= 1.0+(i%2)*0.5
+      begin= time.monotonic()
+      scan.write(reg,value)
+      while time.monotonic()-begin<5:
+        if scan.read(reg)==value: break
+        time.sleep(0.002)
+      else: continue
+      times.append(time.monotonic()-begin)
+    if len(times)==0: return
+    metric(results,'write.visible.median',statistics.median(times)*1000,'ms','lower')
+    metric(results,'write.visible.p95',percentile(times,0.95)*1000,'ms','lower')
+  finally:
+    scan.close()
+
+def benchService(results,args,host):
+  print('symbCtrlModbus.service()')
+  ctrl= symbCtrlModbus.SymbCtrl()
+  if not ctrl.start(host,args.port):
+    print('  {}'.format(ctrl.message()))
+    return
+  times= []
+  for i in range(args.trials*10):
+    begin= time.perf_counter()
+    ctrl.service()
+    times.append(time.perf_counter()-begin)
+  ctrl.close()
+  metric(results,'service.median',statistics.median(times)*1000,'ms','lower')
+  metric(results,'service.p95',percentile(times,0.95)*1000,'ms','lower')
+
+#-- results -------------------------------------------------------------------
+
+def git(*args):
+  try:
+    return subprocess.run(['git']+list(args),cwd=localDir,capture_output=True,text=True,timeout=10).stdout.strip()
+  except (OSError,subprocess.SubprocessError):
+    return ''
+
+def machine():
+  return {'time':       dt.datetime.now().isoformat(timespec='seconds'),
+          'commit':     git('rev-parse','--short','HEAD'),
+          'dirty':      git('status','--porcelain','--untracked-files=no')!='',
+          'python':     platform.python_version(),
+          'implementation':platform.python_implementation(),
+          'platform':   platform.platform(),
+          'machine':    platform.machine(),
+          'processor':  platform.processor(),
+          'cpus':       os.cpu_count(),
+          'pyModbusTCP':getattr(sys.modules.get('pyModbusTCP.constants'),'VERSION','')}
+
+# metrics worse than the baseline by more than tolerance
+def regressions(metrics,baseline,tolerance):
+  found= []
+  for name,entry in metrics.items():
+    if name not in baseline: continue
+    old= baseline[name]['value']
+    new= entry['value']
+    if entry['better']=='higher' and new<old*(1-tolerance) or entry['better']=='lower' and new>old*(1+tolerance):
+      found.append((name,old,new,entry['unit']))
+  return found
+
+#-- main ----------------------------------------------------------------------
+
+if __name__=='__main__':
+  parser= argparse.ArgumentParser(description='Scanner benchmark against simulated controllers')
+  parser.add_argument('--only',default='scan,read,write,service',help='measurements to run')
+  parser.add_argument('--counts',default=','.join(str(n) for n in COUNTS),help='device counts for scan rates')
+  parser.add_argument('--window',type=float,default=5,help='seconds each scan rate is measured')
+  parser.add_argument('--latency',type=float,default=0,help='simulated response time in ms')
+  parser.add_argument('--port',type=int,default=5020,help='simulated Modbus port')
+  parser.add_argument('--sims',type=int,default=os.cpu_count() or 1,help='simulator processes')
+  parser.add_argument('--repeat',type=int,default=20000,help='read() calls timed per type')
+  parser.add_argument('--trials',type=int,default=20,help='writes timed, ten times as many service() calls')
+  parser.add_argument('--out',default=None,help='result file')
+  parser.add_argument('--baseline',default=None,help='earlier result file to compare')
+  parser.add_argument('--tolerance',type=float,default=0.1,help='allowed regression as a fraction')
+  args= parser.parse_args()
+  args.counts= [int(n) for n in args.counts.split(',')]
+  only= args.only.split(',')
+  info= machine()
+  print('Scanner benchmark, commit {} on {}'.format(info['commit'] or '?',info['platform']))
+  SymbSim.raiseLimit()
+  results= {}
+  if 'scan' in only: benchScan(results,args)
+  if len({'read','write','service'} & set(only))>0:
+    sims= Sims(1,args.port,args.latency/1000,1)
+    try:
+      if 'read' in only:    benchRead(results,args,sims.hosts[0])
+      if 'write' in only:   benchWrite(results,args,sims.hosts[0])
+      if 'service' in only: benchService(results,args,sims.hosts[0])
+    finally:
+      sims.close()
+  out= args.out or 'scanBench-{}.json'.format(info['commit'] or 'local')
+  settings= {key:value for key,value in vars(args).items() if key not in ('out','baseline')}
+  with open(out,'w') as file:
+    json.dump({'machine':info,'settings':settings,'metrics':results},file,indent=2)
+  print('Results written to {}'.format(out))
+  if args.baseline!=None:
+    with open(args.baseline) as file:
+      base= json.load(file)
+    found= regressions(results,base['metrics'],args.tolerance)
+    print('Compared with {}, commit {}'.format(args.baseline,base['machine'].get('commit','?')))
+    for name,old,new,unit in found:
+      print('  {:36s} {:12.3f} -> {:12.3f} {}'.format(name,old,new,unit))
+    if len(found)>0:
+      print('{:d} metrics regressed more than {:.0%}'.format(len(found),args.tolerance))
+      sys.exit(1)
+    print('No regressions')
+
+#-- end scanBench -------------------------------------------------------------
@@ -0,0 +1,74 @@
+#------------------------------------------------------------------------------
+#  Shared Data Benchmark
+#
+#  - Compare the cost of publishing and reading scanner data through a locked
+#    multiprocessing Array against a shared memory block with memoryviews
+#  - sized for a SymbCtrl mk2 map, 300 holding registers and 80 coils
+#
+#  Usage...
+#  - python sharedBench.py [repeat]
+#      repeat:  number of publish and read passes timed, default 2000
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import sys
+import timeit
+from array import array
+from multiprocessing import Array
+from multiprocessing.shared_memory import SharedMemory
+
+#-- constants -----------------------------------------------------------------
+HOLD_SIZE= 300
+COIL_SIZE= 80
+
+#-- benchmark -----------------------------------------------------------------
+
+def run(repeat):
+  holdVals= [i*211&0xffff for i in range(HOLD_SIZE)]
+  coilVals= [i%3==0 for i in range(COIL_SIZE)]
+  # current path, one locked int per register
+  shared= Array('i',COIL_SIZE+HOLD_SIZE)
+  def arrPublish():
+    for j,val in enumerate(coilVals):
+      if val: shared[j]= 1
+      else:   shared[j]= 0
+    for j,val in enumerate(holdVals):
+      shared[COIL_SIZE+j]= val
+  def arrRead():
+    hold= [shared[COIL_SIZE+j] for j in range(HOLD_SIZE)]
+    coil= [shared[j]==1 for j in range(COIL_SIZE)]
+  # shared memory path, typed views and slice operations
+  mem= SharedMemory(create=True,size=HOLD_SIZE*2+COIL_SIZE)
+  holdData= mem.buf[:HOLD_SIZE*2].cast('H')
+  coilData= mem.buf[HOLD_SIZE*2:]
+  def memPublish():
+    coilData[:]= bytes(coilVals)
+    holdData[:]= array('H',holdVals)
+  def memRead():
+    hold= holdData.tolist()
+    coil= coilData.tolist()
+  results= []
+  for name,func in [('Array publish',arrPublish),('Array read',arrRead),
+                    ('SharedMemory publish',memPublish),('SharedMemory read',memRead)]:
+    results.append((name,min(timeit.repeat(func,number=repeat,repeat=3))/repeat))
+  holdData.release()
+  coilData.release()
+  mem.close()
+  mem.unlink()
+  return results
+
+if __name__=='__main__':
+  repeat= 2000
+  if len(sys.argv)>1: repeat= int(sys.argv[1])
+  print('Shared data benchmark, {:d} holding registers and {:d} coils'.format(HOLD_SIZE,COIL_SIZE))
+  for name,secs in run(repeat):
+    print('  {:22s} {:8.2f}us'.format(name,secs*1e6))
+
+#-- end sharedBench -----------------------------------------------------------
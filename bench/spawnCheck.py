@@ -0,0 +1,83 @@
+#------------------------------------------------------------------------------
+#  Spawn Start Check
+#
+#  - Start SymbCtrlScan with the spawn start method, the Windows default,
+#    single and in fleet mode against SymbSim controllers, each must bring
+#    valid data and close again
+#
+#  Usage...
+#  - python spawnCheck.py [--port n]
+#      port:  simulated Modbus port, default 5020
+#    the exit code is 1 if any start failed
+#
+#  Symbrosia
+#  Copyright 2021-2026, all rights reserved
+#
+# 17Oct2026
+#  - initial version
+#
+#------------------------------------------------------------------------------
+
+#-- library -------------------------------------------------------------------
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+#-- globals -------------------------------------------------------------------
+localDir= os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(localDir,'..','SyView','lib'))
+
+#-- local libraries -----------------------------------------------------------
+import SymbSim
+import SymbCtrlScan
+
+#-- constants -----------------------------------------------------------------
+WARM_TIME= 20     # longest wait in seconds for valid data
+
+#-- checks --------------------------------------------------------------------
+
+# wait for the selected controller to have valid data
+def warm(scan):
+  end= time.monotonic()+WARM_TIME
+  while time.monotonic()<end:
+    if scan.valid() and scan.read('ControlName')!=None: return True
+    time.sleep(0.1)
+  return False
+
+def check(start,hosts,port):
+  scan= SymbCtrlScan.SymbCtrl()
+  scan.PORT=   port
+  scan.timing= True
+  try:
+    if not start(scan): return scan.message
+    for host in hosts:
+      scan.select(host)
+      if not warm(scan): return 'no data from {}'.format(host)
+    return None
+  except Exception as err:
+    return str(err)
+  finally:
+    if scan.ctrl!=None and scan.ctrl.is_alive(): scan.close()
+
+if __name__=='__main__':
+  parser= argparse.ArgumentParser(description='SymbCtrlScan start with the spawn start method')
+  parser.add_argument('--port',type=int,default=5020,help='simulated Modbus port')
+  args= parser.parse_args()
+  multiprocessing.set_start_method('spawn')
+  fleet= SymbSim.SimFleet(2,port=args.port)
+  fleet.start()
+  hosts= [host for host,port in fleet.hosts]
+  failed= []
+  try:
+    for name,start,scanned in [('start',lambda scan: scan.start(hosts[0]),hosts[:1]),
+                               ('startFleet',lambda scan: scan.startFleet(hosts),hosts)]:
+      error= check(start,scanned,args.port)
+      print('  {:12s} {}'.format(name,error or 'ok'))
+      if error!=None: failed.append(error)
+  finally:
+    fleet.stop()
+  sys.exit(1 if len(failed)>0 else 0)
+
+#-- end spawnCheck ------------------------------------------------------------